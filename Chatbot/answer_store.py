@@ -0,0 +1,314 @@
+import csv
+import hashlib
+import json
+import mmap
+import os
+import sys
+
+import numpy as np
+
+# ============================
+# Columnar FAQ answer store
+# ============================
+# The serving path only ever needs "text of column X at row i". The FAQ
+# dataset is loaded once into a read-only store: question and answer strings
+# as one UTF-8 blob plus an int64 offset array each, intents interned to
+# int32 codes into a small name table. Row ids are plain positions, shared
+# with the embedding matrix and the search index.
+#
+# Column names are normalized on load (case, surrounding whitespace and a few
+# common aliases), so "Question"/"question"/"query" all map to ``question``.
+# Stores load from CSV, from the {"questions": [...]} JSON dataset, or from a
+# prebuilt binary file that is memory-mapped without parsing:
+#
+#     python answer_store.py data/faq_with_intent.csv data/faq.store
+
+STORE_MAGIC = b"FAQSTORE"
+STORE_FORMAT_VERSION = 1
+
+COLUMN_ALIASES = {
+    "question": ("question", "questions", "query", "q"),
+    "answer": ("answer", "answers", "response", "reply", "a"),
+    "intent": ("intent", "category", "tag", "label"),
+}
+
+
+class StringColumn:
+    """Read-only list of strings stored as one UTF-8 blob plus offsets."""
+
+    def __init__(self, blob, offsets):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return bytes(self._blob[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def nbytes(self):
+        return len(self._blob) + self._offsets.nbytes
+
+
+def encode_strings(values):
+    encoded = [str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return b"".join(encoded), offsets
+
+
+def normalize_column(name):
+    """Canonical column name for ``name``, or None if it is not one we use."""
+    key = str(name).strip().lower()
+    for canonical, aliases in COLUMN_ALIASES.items():
+        if key in aliases:
+            return canonical
+    return None
+
+
+def _is_missing(value):
+    # None, empty/blank strings and float NaN (pandas' missing value)
+    if value is None:
+        return True
+    if isinstance(value, float) and value != value:
+        return True
+    return isinstance(value, str) and not value.strip()
+
+
+class AnswerStore:
+    """
+    Read-only FAQ table keyed by row id: ``questions`` and ``answers`` are
+    StringColumns, ``intent_at(row)`` resolves the interned intent.
+    ``source_rows[row]`` is the row's position in the input records when
+    some were skipped, else None (row ids equal input positions).
+    """
+
+    def __init__(self, questions, answers, intent_codes=None, intent_names=(), source_rows=None):
+        self.questions = questions
+        self.answers = answers
+        self.intent_codes = intent_codes
+        self.intent_names = list(intent_names)
+        self.source_rows = source_rows
+
+    # ----------------------------
+    # Builders
+    # ----------------------------
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build from an iterable of dicts with any casing/alias of question,
+        answer and intent. Rows without a question or answer are skipped, so
+        row ids are dense; ``source_rows`` maps them back to the input.
+        """
+        questions, answers, codes, kept = [], [], [], []
+        intern = {}
+        skipped = 0
+        for position, record in enumerate(records):
+            row = {}
+            for key, value in record.items():
+                column = normalize_column(key)
+                if column is not None and column not in row:
+                    row[column] = value
+            if _is_missing(row.get("question")) or _is_missing(row.get("answer")):
+                skipped += 1
+                continue
+            kept.append(position)
+            questions.append(str(row["question"]))
+            answers.append(str(row["answer"]))
+            intent = row.get("intent")
+            codes.append(-1 if _is_missing(intent) else intern.setdefault(str(intent), len(intern)))
+        if skipped:
+            print(f"⚠️ Skipped {skipped} FAQ rows without a question or answer")
+
+        q_blob, q_offsets = encode_strings(questions)
+        a_blob, a_offsets = encode_strings(answers)
+        return cls(
+            StringColumn(q_blob, q_offsets),
+            StringColumn(a_blob, a_offsets),
+            np.asarray(codes, dtype=np.int32) if intern else None,
+            intern,  # dicts keep insertion order, so position == code
+            np.asarray(kept, dtype=np.int64) if skipped else None,
+        )
+
+    @classmethod
+    def from_csv(cls, path):
+        # utf-8-sig drops the BOM Excel puts in front of the header
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            return cls.from_records(csv.DictReader(f))
+
+    @classmethod
+    def from_json(cls, path):
+        """``{"questions": [{"question", "answer"}, ...]}`` or a bare list of records."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = next((v for v in data.values() if isinstance(v, list)), [])
+        return cls.from_records(data)
+
+    @classmethod
+    def from_dataframe(cls, df):
+        return cls.from_records(df.to_dict("records"))
+
+    # ----------------------------
+    # Binary format
+    # ----------------------------
+    # MAGIC | uint64 header length | JSON header | 8-byte aligned sections.
+    # The header maps each section name to [offset, length, dtype].
+    def _sections(self):
+        sections = {
+            "question_blob": np.frombuffer(bytes(self.questions._blob), dtype=np.uint8),
+            "question_offsets": np.asarray(self.questions._offsets, dtype=np.int64),
+            "answer_blob": np.frombuffer(bytes(self.answers._blob), dtype=np.uint8),
+            "answer_offsets": np.asarray(self.answers._offsets, dtype=np.int64),
+        }
+        if self.intent_codes is not None:
+            sections["intent_codes"] = np.asarray(self.intent_codes, dtype=np.int32)
+        if self.source_rows is not None:
+            sections["source_rows"] = np.asarray(self.source_rows, dtype=np.int64)
+        return sections
+
+    def save(self, path):
+        """Write the binary format (atomically, via a temp file)."""
+        sections = self._sections()
+        layout, position = {}, 0
+        for name, array in sections.items():
+            layout[name] = [position, int(array.size), array.dtype.str]
+            position += -(-array.nbytes // 8) * 8
+        header = json.dumps({
+            "version": STORE_FORMAT_VERSION,
+            "rows": len(self),
+            "intent_names": self.intent_names,
+            "sections": layout,
+        }).encode("utf-8")
+        header += b" " * (-(len(STORE_MAGIC) + 8 + len(header)) % 8)
+
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(STORE_MAGIC)
+            f.write(np.uint64(len(header)).tobytes())
+            f.write(header)
+            for array in sections.values():
+                data = array.tobytes()
+                f.write(data)
+                f.write(b"\0" * (-len(data) % 8))
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a file written by ``save``; strings are decoded on access."""
+        with open(path, "rb") as f:
+            if f.read(len(STORE_MAGIC)) != STORE_MAGIC:
+                raise ValueError(f"{path} is not an answer store file")
+            header_len = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_len).decode("utf-8"))
+            if header.get("version") != STORE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported answer store version {header.get('version')} in {path}")
+            base = len(STORE_MAGIC) + 8 + header_len
+            # Zero-length files cannot be mapped, but a valid store always has a header
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        def section(name):
+            if name not in header["sections"]:
+                return None
+            offset, count, dtype = header["sections"][name]
+            return np.frombuffer(mapped, dtype=np.dtype(dtype), count=count, offset=base + offset)
+
+        def column(name):
+            offset, count, _ = header["sections"][name + "_blob"]
+            blob = memoryview(mapped)[base + offset:base + offset + count]
+            return StringColumn(blob, section(name + "_offsets"))
+
+        return cls(column("question"), column("answer"), section("intent_codes"), header["intent_names"],
+                   section("source_rows"))
+
+    # ----------------------------
+    # Access
+    # ----------------------------
+    def __len__(self):
+        return len(self.questions)
+
+    def intent_at(self, row):
+        if self.intent_codes is None:
+            return None
+        code = int(self.intent_codes[row])
+        return self.intent_names[code] if code >= 0 else None
+
+    def row(self, row):
+        return {
+            "question": self.questions[row],
+            "answer": self.answers[row],
+            "intent": self.intent_at(row),
+        }
+
+    def rows(self):
+        """(question, answer, intent) tuples in row order."""
+        for i in range(len(self)):
+            yield self.questions[i], self.answers[i], self.intent_at(i)
+
+    def text_values(self):
+        """Every question, answer and distinct intent name (for the spell checker)."""
+        yield from self.questions
+        yield from self.answers
+        yield from self.intent_names
+
+    def row_hashes(self):
+        """sha256 per row over question, answer and intent."""
+        return [
+            hashlib.sha256("\x1f".join(v or "" for v in row).encode("utf-8")).hexdigest()
+            for row in self.rows()
+        ]
+
+    @property
+    def nbytes(self):
+        codes = self.intent_codes.nbytes if self.intent_codes is not None else 0
+        return self.questions.nbytes + self.answers.nbytes + codes
+
+
+def load_answer_store(path):
+    """Answer store from a .csv, a .json dataset or a binary store file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return AnswerStore.from_csv(path)
+    if ext == ".json":
+        return AnswerStore.from_json(path)
+    return AnswerStore.load(path)
+
+
+_last_converted = (None, None)
+
+
+def as_answer_store(table):
+    """
+    Pass stores through; convert a pandas DataFrame (legacy callers). The
+    conversion is memoized for the same DataFrame object, so per-store caches
+    (BM25, intent classifier) keyed on the result are not rebuilt per call.
+    """
+    global _last_converted
+    if table is None or isinstance(table, AnswerStore):
+        return table
+    frame, store = _last_converted
+    if frame is table:
+        return store
+    store = AnswerStore.from_dataframe(table)
+    _last_converted = (table, store)
+    return store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python answer_store.py <faq.csv|faq.json> <output.store>")
+        sys.exit(2)
+    store = load_answer_store(sys.argv[1])
+    store.save(sys.argv[2])
+    print(f"✅ Wrote {len(store)} rows ({len(store.intent_names)} intents, {store.nbytes / 1024:.1f} KiB) to {sys.argv[2]}")
@@ -1,17 +1,25 @@
 import streamlit as st
 from datetime import datetime
-from utils import clean_text, greeting_response, business_response
-from models import load_data, load_model_and_embeddings
-from chatbot_core import chatbot_response
-import traceback
+import chat_service as service
 import os
+import traceback
 import database  # Database import
+from chatbot_core import FALLBACK_REPLY
+from utils import clean_text
 
 # ----------------------------
 # --- App Setup ---
 # ----------------------------
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-file_path = os.path.join(BASE_DIR, "data", "faq_with_intent.csv")
+# Model, answer store, FAQ index, response cache and chat log writer are
+# process-wide resources owned by chat_service (the same registry the Flask
+# and ASGI servers use). Browser sessions only keep their own messages.
+
+# Windowed history: each rerun renders only the last HISTORY_WINDOW_TURNS
+# exchanges, a session keeps at most HISTORY_MAX_MESSAGES in memory, and older
+# exchanges are paged in from SQLite on demand (keyset cursor, one page held)
+HISTORY_WINDOW_TURNS = int(os.environ.get("CHATBOT_HISTORY_WINDOW_TURNS", "20"))
+HISTORY_PAGE_TURNS = int(os.environ.get("CHATBOT_HISTORY_PAGE_TURNS", "20"))
+HISTORY_MAX_MESSAGES = int(os.environ.get("CHATBOT_HISTORY_MAX_MESSAGES", "200"))
 
 st.set_page_config(
     page_title="E-commerce Chatbot 🤖", 
@@ -32,76 +40,81 @@ st.markdown("""
 # ----------------------------
 # --- Helper Functions ---
 # ----------------------------
-def get_time_greeting():
-    hour = datetime.now().hour
-    if 5 <= hour < 12:
-        return "Good morning! 🌅 How can I help you today?"
-    elif 12 <= hour < 17:
-        return "Good afternoon! 🌤 How can I help you today?"
-    elif 17 <= hour < 22:
-        return "Good evening! 🌙 What can I assist you with?"
-    else:
-        return "Hello there! 🌙 Burning the midnight oil, huh?"
-
-def get_chatbot_reply(user_input):
-    if not st.session_state.model_loaded or st.session_state.model is None:
-        user_input_clean = clean_text(user_input)
-        greet = greeting_response(user_input_clean)
-        if greet:
-            return greet
-        biz = business_response(user_input_clean)
-        if biz:
-            return biz
-        return "⚠️ Chatbot model failed to load. Please try again later."
-
+@st.cache_resource
+def get_service():
+    # Once per process: starts the background load (no-op if already running)
+    service.start_background_load()
+    return service
+
+def remember(message):
+    # Append to the session's recent messages, dropping the oldest past the cap
+    messages = st.session_state.messages
+    messages.append(message)
+    if len(messages) > HISTORY_MAX_MESSAGES:
+        del messages[:len(messages) - HISTORY_MAX_MESSAGES]
+        st.session_state.has_earlier = True
+
+def safe_reply(text):
+    # Never show a traceback in the page: fall back to greeting/business rules
     try:
-        user_input_clean = clean_text(user_input)
-        greet = greeting_response(user_input_clean)
-        if greet:
-            return greet
-        biz = business_response(user_input_clean)
-        if biz:
-            return biz
-
-        ml_reply = chatbot_response(
-            user_input_clean,
-            st.session_state.model,
-            st.session_state.df,
-            st.session_state.question_embeddings
-        )
-        if ml_reply:
-            return ml_reply
-
-        return "Hmm 🤔 I'm not sure about that. Could you rephrase it?"
-    
+        return chat.get_chatbot_reply(text)
     except Exception as e:
-        # Fallback to rule-based responses
-        user_input_clean = clean_text(user_input)
-        greet = greeting_response(user_input_clean)
-        if greet:
-            return greet
-        biz = business_response(user_input_clean)
-        if biz:
-            return biz
-        return "Hmm 🤔 I'm not sure about that. Could you rephrase it?"
+        print("⚠️ Error during chat response:", e)
+        traceback.print_exc()
+        try:
+            details = chat.rules_only_reply(clean_text(text))
+            if details["layer"] not in ("warmup", "unavailable"):
+                return details["reply"]
+        except Exception:
+            traceback.print_exc()
+        return FALLBACK_REPLY
+
+def visible_messages():
+    return st.session_state.messages[-2 * HISTORY_WINDOW_TURNS:]
+
+def show_earlier_page(older):
+    # Button callback: page one step older (or back newer) through SQLite
+    session_id, cursors = st.session_state.session_id, st.session_state.earlier_cursors
+    if older and not cursors:
+        # Anchor just before the exchanges already rendered below
+        service.chat_log.flush()
+        turns = sum(1 for m in visible_messages() if m["sender"] == "user")
+        anchor = None
+        if turns:
+            _, anchor = database.get_chat_history_page(session_id, limit=turns)
+            if anchor is None:
+                # Everything in SQLite is already on screen
+                cursors.append(None)
+                st.session_state.earlier_page, st.session_state.earlier_next = [], None
+                return
+        cursors.append(anchor)
+    elif older:
+        cursors.append(st.session_state.earlier_next)
+    elif len(cursors) > 1:
+        cursors.pop()
+    page, next_cursor = database.get_chat_history_page(session_id, limit=HISTORY_PAGE_TURNS, before=cursors[-1])
+    st.session_state.earlier_page, st.session_state.earlier_next = page, next_cursor
+
+def render_message(msg):
+    with st.chat_message("user" if msg["sender"] == "user" else "assistant"):
+        st.write(msg['text'])
+        st.caption(f"Sent at {datetime.now().strftime('%H:%M')}")
 
 # ----------------------------
 # --- Session State ---
 # ----------------------------
 if "messages" not in st.session_state:
     st.session_state.messages = []
-if "model_loaded" not in st.session_state:
-    st.session_state.model_loaded = False
-if "model" not in st.session_state:
-    st.session_state.model = None
-if "df" not in st.session_state:
-    st.session_state.df = None
-if "question_embeddings" not in st.session_state:
-    st.session_state.question_embeddings = None
 if "last_input" not in st.session_state:
     st.session_state.last_input = None
 if "input_key" not in st.session_state:
     st.session_state.input_key = 0
+if "has_earlier" not in st.session_state:
+    st.session_state.has_earlier = False
+if "earlier_cursors" not in st.session_state:
+    st.session_state.earlier_cursors = []
+    st.session_state.earlier_page = []
+    st.session_state.earlier_next = None
 if "session_id" not in st.session_state:
     # Generate unique session ID for database
     st.session_state.session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{hash(str(datetime.now()))}"
@@ -109,30 +122,27 @@ if "session_id" not in st.session_state:
 # ----------------------------
 # --- Load Model & Data ---
 # ----------------------------
-if not st.session_state.model_loaded:
-    with st.spinner("⚙️ Loading model and FAQ embeddings... Please wait."):
-        try:
-            st.session_state.df = load_data(file_path)
-            st.session_state.model, st.session_state.question_embeddings = load_model_and_embeddings(st.session_state.df)
-            st.session_state.model_loaded = True
-            st.success("✅ Model loaded successfully!")
-            
-            # Load previous chat history from database
-            try:
-                previous_messages = database.get_chat_history(st.session_state.session_id)
-                if previous_messages:
-                    st.session_state.messages = previous_messages
-                else:
-                    # Add first greeting if no previous messages
-                    st.session_state.messages.append({"sender": "bot", "text": get_time_greeting()})
-            except Exception as db_error:
-                st.session_state.messages.append({"sender": "bot", "text": get_time_greeting()})
-                
-        except Exception as e:
-            st.session_state.model_loaded = False
-            st.error("❌ Failed to load model or data! Chatbot will only answer greetings or fallback responses.")
-            if not st.session_state.messages:
-                st.session_state.messages.append({"sender": "bot", "text": get_time_greeting()})
+chat = get_service()
+if chat.load_state == "loading":
+    st.info("⚙️ Loading model and FAQ embeddings in the background... quick questions work already.")
+elif chat.load_state == "failed":
+    st.error("❌ Failed to load model or data! Chatbot will only answer greetings or fallback responses.")
+
+if "history_loaded" not in st.session_state:
+    # Load previous chat history from database
+    try:
+        previous_messages, older = database.get_chat_history_page(
+            st.session_state.session_id, limit=HISTORY_WINDOW_TURNS
+        )
+        if previous_messages:
+            st.session_state.messages = previous_messages
+            st.session_state.has_earlier = older is not None
+        else:
+            # Add first greeting if no previous messages
+            st.session_state.messages.append({"sender": "bot", "text": chat.get_time_greeting()})
+    except Exception as db_error:
+        st.session_state.messages.append({"sender": "bot", "text": chat.get_time_greeting()})
+    st.session_state.history_loaded = True
 
 # ----------------------------
 # --- Streamlit UI ---
@@ -146,16 +156,18 @@ st.markdown("<p style='text-align: center; color: gray;'>Always here to help you
 chat_container = st.container()
 
 with chat_container:
-    # Display all messages
-    for msg in st.session_state.messages:
-        if msg["sender"] == "user":
-            with st.chat_message("user"):
-                st.write(msg['text'])
-                st.caption(f"Sent at {datetime.now().strftime('%H:%M')}")
-        else:
-            with st.chat_message("assistant"):
-                st.write(msg['text'])
-                st.caption(f"Sent at {datetime.now().strftime('%H:%M')}")
+    if st.session_state.has_earlier or len(st.session_state.messages) > 2 * HISTORY_WINDOW_TURNS:
+        with st.expander("🕘 Earlier messages"):
+            for msg in st.session_state.earlier_page:
+                render_message(msg)
+            older_col, newer_col = st.columns(2)
+            older_col.button("⬆️ Load older", on_click=show_earlier_page, args=(True,),
+                             disabled=bool(st.session_state.earlier_cursors) and st.session_state.earlier_next is None)
+            newer_col.button("⬇️ Newer", on_click=show_earlier_page, args=(False,),
+                             disabled=len(st.session_state.earlier_cursors) < 2)
+    # Only the latest window is rendered, so a rerun costs the same at any length
+    for msg in visible_messages():
+        render_message(msg)
 
 # Input section - Using Streamlit's chat input
 user_input = st.chat_input("💬 Type your message here...")
@@ -165,17 +177,14 @@ if user_input:
         st.session_state.last_input = user_input.strip()
         
         # Add user message to chat
-        st.session_state.messages.append({"sender": "user", "text": user_input.strip()})
+        remember({"sender": "user", "text": user_input.strip()})
         
         # Get bot reply
-        reply = get_chatbot_reply(user_input.strip())
-        st.session_state.messages.append({"sender": "bot", "text": reply})
+        reply = safe_reply(user_input.strip())
+        remember({"sender": "bot", "text": reply})
         
-        # Save to database (silently in background)
-        try:
-            database.save_chat(st.session_state.session_id, user_input.strip(), reply)
-        except Exception as e:
-            pass  # Silent fail - database saves in background
+        # Save to database (queued, written in background)
+        chat.log_chat(st.session_state.session_id, user_input.strip(), reply)
         
         st.rerun()
 
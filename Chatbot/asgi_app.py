@@ -0,0 +1,275 @@
+import asyncio
+import json
+import mimetypes
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from jinja2 import Environment, FileSystemLoader
+
+import chat_service as service
+from streaming import SSE_HEADERS, reply_events, sse_event
+from instrumentation import PROMETHEUS_CONTENT_TYPE, render_prometheus
+
+# ============================
+# ASGI serving mode
+# ============================
+# Same "/" and "/get" contract as the Flask server, served by an asyncio
+# event loop. The CPU-heavy reply pipeline (spell correction, encoding,
+# search) runs on a bounded thread pool; a semaphore caps in-flight requests
+# and each request gets a timeout. A request's slot is held until its worker
+# thread finishes, not just until the client gets its timeout reply, so
+# timed-out work cannot pile up behind the pool. Static files are read once
+# at startup. Run with:
+#
+#     uvicorn asgi_app:app --host 0.0.0.0 --port 5100
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+
+WORKER_THREADS = int(os.environ.get("CHATBOT_ASGI_WORKERS", str(min(8, os.cpu_count() or 1))))
+MAX_IN_FLIGHT = int(os.environ.get("CHATBOT_ASGI_MAX_IN_FLIGHT", "64"))
+REQUEST_TIMEOUT_S = float(os.environ.get("CHATBOT_ASGI_REQUEST_TIMEOUT", "10"))
+QUEUE_TIMEOUT_S = float(os.environ.get("CHATBOT_ASGI_QUEUE_TIMEOUT", "2"))
+SHUTDOWN_GRACE_S = float(os.environ.get("CHATBOT_ASGI_SHUTDOWN_GRACE", "10"))
+MAX_BODY_BYTES = 64 * 1024
+
+_templates = Environment(loader=FileSystemLoader(os.path.join(BASE_DIR, "templates")), autoescape=True)
+# index.html uses Flask's url_for for its stylesheet
+_templates.globals["url_for"] = lambda endpoint, filename="": f"/{endpoint}/{filename}"
+
+
+class ChatApp:
+    def __init__(self):
+        self.executor = None
+        self.semaphore = None
+        self.in_flight = 0
+        self.shutting_down = False
+        self.static_files = {}
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    async def startup(self):
+        self.executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="chat-worker")
+        self.semaphore = asyncio.Semaphore(MAX_IN_FLIGHT)
+        self.static_files = load_static_files(STATIC_DIR)
+        # Don't hold up startup: the model loads on its own thread
+        service.start_background_load()
+
+    async def shutdown(self):
+        self.shutting_down = True
+        deadline = time.monotonic() + SHUTDOWN_GRACE_S
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        service.shutdown()
+
+    # ----------------------------
+    # ASGI entry point
+    # ----------------------------
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        method, path = scope["method"], scope["path"]
+        if path == "/healthz":
+            await self._json(send, service.liveness())
+        elif path == "/readyz":
+            state = service.readiness()
+            ready = state["ready"] and not self.shutting_down
+            await self._json(send, state, 200 if ready else 503)
+        elif path == "/metrics":
+            await self._respond(send, 200, render_prometheus().encode("utf-8"), PROMETHEUS_CONTENT_TYPE)
+        elif self.shutting_down:
+            await self._json(send, {"reply": "Server is restarting, please retry 🙏"}, 503)
+        elif path == "/" and method in ("GET", "HEAD"):
+            html = _templates.get_template("index.html").render(greeting=service.get_time_greeting())
+            await self._respond(send, 200, html.encode("utf-8"), "text/html; charset=utf-8")
+        elif path == "/get" and method == "POST":
+            await self._get_reply(receive, send)
+        elif path == "/get/stream" and method in ("GET", "POST"):
+            await self._stream_reply(scope, receive, send)
+        elif path.startswith("/static/") and method in ("GET", "HEAD"):
+            await self._static(path[len("/static/"):], send)
+        else:
+            await self._json(send, {"error": "not found"}, 404)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # ----------------------------
+    # Handlers
+    # ----------------------------
+    async def _get_reply(self, receive, send):
+        body = await self._read_body(receive)
+        if body is None:
+            await self._json(send, {"reply": "Message too long 😅"}, 413)
+            return
+        form = parse_qs(body.decode("utf-8", errors="replace"))
+        user_msg = form.get("msg", [""])[0].strip()
+        if not user_msg:
+            await self._json(send, {"reply": "Please type something 😅"})
+            return
+
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), QUEUE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            await self._json(send, {"reply": "I'm a bit busy right now 😅 Please try again."}, 503)
+            return
+
+        try:
+            future = self._run_in_slot(service.get_chatbot_reply, user_msg)
+            bot_reply = await asyncio.wait_for(future, REQUEST_TIMEOUT_S)
+            service.log_chat(form.get("session_id", [""])[0].strip(), user_msg, bot_reply)
+            await self._json(send, {"reply": bot_reply})
+        except asyncio.TimeoutError:
+            await self._json(send, {"reply": "Sorry, that took too long ⏳ Please try again."}, 504)
+        except Exception as e:
+            print("⚠️ Error during chat response:", e)
+            await self._json(send, {"reply": "Oops! Something went wrong 😔"}, 500)
+
+    async def _stream_reply(self, scope, receive, send):
+        # Same fields as /get, as form data or query string (EventSource)
+        if scope["method"] == "POST":
+            body = await self._read_body(receive)
+            if body is None:
+                await self._json(send, {"reply": "Message too long 😅"}, 413)
+                return
+            form = parse_qs(body.decode("utf-8", errors="replace"))
+        else:
+            form = parse_qs(scope.get("query_string", b"").decode("utf-8", errors="replace"))
+        user_msg = form.get("msg", [""])[0].strip()
+        if not user_msg:
+            await self._sse(send, reply_events({"reply": "Please type something 😅", "layer": "empty", "intent": None, "score": None}))
+            return
+
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), QUEUE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            await self._sse(send, [sse_event("error", {"reply": "I'm a bit busy right now 😅 Please try again."})], 503)
+            return
+
+        try:
+            future = self._run_in_slot(service.get_reply_details, user_msg)
+            details = await asyncio.wait_for(future, REQUEST_TIMEOUT_S)
+            service.log_chat(form.get("session_id", [""])[0].strip(), user_msg, details["reply"])
+            events = reply_events(details)
+        except asyncio.TimeoutError:
+            events, status = [sse_event("error", {"reply": "Sorry, that took too long ⏳ Please try again."})], 504
+        except Exception as e:
+            print("⚠️ Error during chat response:", e)
+            events, status = [sse_event("error", {"reply": "Oops! Something went wrong 😔"})], 500
+        else:
+            status = 200
+        await self._sse(send, events, status)
+
+    async def _static(self, name, send):
+        entry = self.static_files.get(name)
+        if entry is None:
+            await self._json(send, {"error": "not found"}, 404)
+            return
+        data, content_type = entry
+        await self._respond(send, 200, data, content_type)
+
+    def _run_in_slot(self, fn, *args):
+        """
+        Run ``fn`` on the pool inside an already acquired semaphore slot. The
+        slot and in_flight count are released when the worker thread is done,
+        even if the awaiting request has timed out in the meantime.
+        """
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        try:
+            work = self.executor.submit(fn, *args)
+        except Exception:
+            self._release_slot()
+            raise
+        work.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release_slot))
+        return asyncio.wrap_future(work)
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        self.semaphore.release()
+
+    # ----------------------------
+    # Helpers
+    # ----------------------------
+    @staticmethod
+    async def _read_body(receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    @staticmethod
+    async def _respond(send, status, body, content_type):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type.encode("latin-1")),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    async def _sse(send, events, status=200):
+        # Each event is its own body message so it reaches the client at once
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in SSE_HEADERS.items()],
+        })
+        for event in events:
+            await send({"type": "http.response.body", "body": event.encode("utf-8"), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _json(self, send, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        await self._respond(send, status, body, "application/json")
+
+
+def load_static_files(static_dir):
+    """{relative path: (bytes, content type)} for every file under ``static_dir``."""
+    files = {}
+    for root, _, names in os.walk(static_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            files[os.path.relpath(path, static_dir).replace(os.sep, "/")] = (data, content_type)
+    return files
+
+
+app = ChatApp()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=5100, lifespan="on")
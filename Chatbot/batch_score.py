@@ -0,0 +1,338 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+# ============================
+# Offline batch scoring
+# ============================
+# Replays historical user messages through the reply cascade (greeting and
+# business rules, spelling correction, rule-based/business rules, FAQ search)
+# without the HTTP servers. Messages are read in chunks from chat_history.db
+# or a CSV/JSONL file and each chunk is scored in a worker process, with one
+# batched encode and one matrix product for all of its FAQ lookups. Results
+# are appended in input order to JSONL (or Parquet part files), and a
+# checkpoint written after every chunk lets --resume continue a stopped run.
+#
+#     python batch_score.py --source chat_history.db --output rescored.jsonl
+#     python batch_score.py --source messages.csv --text-column msg --output rescored.parquet --workers 4
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+file_path = os.environ.get("CHATBOT_FAQ_PATH", os.path.join(BASE_DIR, "data", "faq_with_intent.csv"))
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+
+# ----------------------------
+# Sources
+# ----------------------------
+def iter_source(path, chunk_size, position=0, text_column="user_message", id_column=None):
+    """
+    Yields (rows, position) per chunk; rows are dicts with id, session_id and
+    message. ``position`` is the resume cursor after that chunk: the last
+    chat id for SQLite, the number of records consumed for files.
+    """
+    if path.endswith(SQLITE_EXTENSIONS):
+        import database
+        for chunk in database.iter_user_messages(chunk_size, after_id=position or 0, db_path=path):
+            rows = [{"id": i, "session_id": s, "message": m} for i, s, m in chunk]
+            yield rows, chunk[-1][0]
+        return
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith(".jsonl"):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f)
+        rows, consumed = [], 0
+        for record in records:
+            consumed += 1
+            if consumed <= position:
+                continue
+            rows.append({
+                "id": record.get(id_column) if id_column else consumed,
+                "session_id": record.get("session_id"),
+                "message": record.get(text_column),
+            })
+            if len(rows) == chunk_size:
+                yield rows, consumed
+                rows = []
+        if rows:
+            yield rows, consumed
+
+
+# ----------------------------
+# Scoring
+# ----------------------------
+_worker = {}
+
+
+def init_worker(faq_path, threshold, threads=None):
+    """Load FAQ data, model and index once per worker process."""
+    if threads:
+        # Keep N workers x M BLAS/torch threads within the machine
+        os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+    from models import load_answers, load_model_and_embeddings, build_faq_index
+    from utils import build_domain_vocabulary
+
+    df = load_answers(faq_path)
+    build_domain_vocabulary(df)
+    model, question_embeddings = load_model_and_embeddings(df, threads=threads)
+    _worker.update(df=df, model=model, index=build_faq_index(df, question_embeddings), threshold=threshold)
+
+
+def score_messages(rows, model, df, index, threshold):
+    """
+    One result dict per row: layer, intent, score and answer_id (FAQ row for
+    "faq"/"lexical"/"intent", rule name for rule layers), in the same order as ``rows``.
+    """
+    from chatbot_core import get_faq_matches
+    from intent_matcher import get_matcher
+    from utils import clean_text, correct_spelling_batch
+
+    matcher = get_matcher()
+    results = [None] * len(rows)
+
+    def rule_result(rule):
+        return {"layer": rule.cascade, "intent": rule.name, "score": None, "answer_id": rule.name}
+
+    # Greetings and business rules on the cleaned text, as chat_service does
+    pending = []
+    for i, row in enumerate(rows):
+        text = clean_text(row["message"] or "")
+        if not text:
+            results[i] = {"layer": "empty", "intent": None, "score": None, "answer_id": None}
+            continue
+        rule = matcher.match(text, ("greeting", "business"))
+        if rule:
+            results[i] = rule_result(rule)
+        else:
+            pending.append((i, text))
+
+    # Spelling correction (each distinct token once), then the core rules
+    corrected = correct_spelling_batch([text for _, text in pending])
+    faq_pending = []
+    for (i, _), text in zip(pending, corrected):
+        rule = matcher.match(text, ("rule_based", "business"))
+        if rule:
+            results[i] = rule_result(rule)
+        else:
+            faq_pending.append((i, clean_text(text)))
+
+    # FAQ search as the servers do it: BM25 shortcut, then one batched
+    # encode and search for the rest
+    if faq_pending:
+        matches = get_faq_matches([text for _, text in faq_pending], model, df, index, threshold)
+        for (i, _), match in zip(faq_pending, matches):
+            matched = match is not None and match["score"] >= threshold and bool(match["answer"])
+            results[i] = {
+                "layer": (match["source"] if match["source"] in ("lexical", "intent") else "faq") if matched else "fallback",
+                "intent": match["intent"] if matched else None,
+                "score": match["score"] if match is not None else None,
+                "answer_id": match["row"] if matched else None,
+            }
+
+    return [dict(row, **result) for row, result in zip(rows, results)]
+
+
+def score_chunk(rows):
+    state = _worker
+    return score_messages(rows, state["model"], state["df"], state["index"], state["threshold"])
+
+
+# ----------------------------
+# Output + checkpoints
+# ----------------------------
+class JsonlOutput:
+    """Appends one JSON object per line; ``resume_bytes`` drops a torn tail."""
+
+    def __init__(self, path, resume_bytes=None):
+        self.path = path
+        mode = "r+b" if resume_bytes is not None and os.path.exists(path) else "wb"
+        self._f = open(path, mode)
+        if mode == "r+b":
+            self._f.truncate(resume_bytes)
+            self._f.seek(resume_bytes)
+
+    def write(self, seq, results):
+        self._f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in results).encode("utf-8"))
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    @property
+    def position(self):
+        return self._f.tell()
+
+    def close(self):
+        self._f.close()
+
+
+class ParquetOutput:
+    """One part file per chunk in a directory (needs pyarrow)."""
+
+    def __init__(self, path, resume_chunks=None):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            sys.exit("Parquet output needs pyarrow (pip install pyarrow); or write .jsonl instead")
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            seq = self._seq(name)
+            # Fresh run: clear everything; resume: drop parts past the checkpoint
+            if seq is not None and (resume_chunks is None or seq >= resume_chunks):
+                os.remove(os.path.join(path, name))
+
+    @staticmethod
+    def _seq(name):
+        if name.startswith("part-") and name.endswith(".parquet"):
+            return int(name[len("part-"):-len(".parquet")])
+        return None
+
+    def write(self, seq, results):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        columns = {key: [r.get(key) for r in results] for key in results[0]} if results else {}
+        for key in ("id", "session_id", "answer_id"):
+            # Mixed int/str columns (e.g. rule names vs FAQ rows) are stored as text
+            if key in columns:
+                columns[key] = [None if v is None else str(v) for v in columns[key]]
+        target = os.path.join(self.path, f"part-{seq:06d}.parquet")
+        pq.write_table(pa.table(columns), target + ".tmp")
+        os.replace(target + ".tmp", target)
+
+    @property
+    def position(self):
+        return None
+
+    def close(self):
+        pass
+
+
+def open_output(path, checkpoint):
+    if path.endswith(".parquet"):
+        return ParquetOutput(path, checkpoint["chunks"] if checkpoint else None)
+    return JsonlOutput(path, checkpoint["output_bytes"] if checkpoint else None)
+
+
+def write_checkpoint(path, state):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# ----------------------------
+# Driver
+# ----------------------------
+def run(args):
+    checkpoint_path = args.checkpoint or args.output + ".checkpoint.json"
+    checkpoint = None
+    if args.resume and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint["source"] != os.path.abspath(args.source):
+            sys.exit(f"Checkpoint {checkpoint_path} belongs to {checkpoint['source']}")
+        if checkpoint.get("done"):
+            print(f"✅ Nothing to do: {checkpoint['rows']} messages already scored")
+            return checkpoint
+        print(f"↩️ Resuming after {checkpoint['rows']} messages ({checkpoint['chunks']} chunks)")
+
+    state = checkpoint or {
+        "source": os.path.abspath(args.source),
+        "output": os.path.abspath(args.output),
+        "threshold": args.threshold,
+        "position": 0,
+        "chunks": 0,
+        "rows": 0,
+        "output_bytes": 0,
+        "layers": {},
+        "done": False,
+    }
+    layers = Counter(state["layers"])
+    output = open_output(args.output, checkpoint)
+
+    workers = max(0, args.workers)
+    threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+    if workers:
+        executor = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(args.faq, args.threshold, threads))
+        submit = lambda rows: executor.submit(score_chunk, rows)
+    else:
+        executor = None
+        init_worker(args.faq, args.threshold)
+        submit = lambda rows: _Done(score_chunk(rows))
+
+    started = time.perf_counter()
+    scored = 0
+    in_flight = deque()
+
+    def commit_oldest():
+        nonlocal scored
+        seq, future, position = in_flight.popleft()
+        results = future.result()
+        output.write(seq, results)
+        scored += len(results)
+        layers.update(r["layer"] for r in results)
+        state.update(position=position, chunks=seq + 1, rows=state["rows"] + len(results),
+                     output_bytes=output.position, layers=dict(layers))
+        write_checkpoint(checkpoint_path, state)
+        elapsed = time.perf_counter() - started
+        print(f"📦 chunk {seq}: {state['rows']} messages scored, {scored / elapsed:.0f} msgs/s")
+
+    try:
+        source = iter_source(args.source, args.chunk_size, state["position"], args.text_column, args.id_column)
+        for seq, (rows, position) in enumerate(source, start=state["chunks"]):
+            in_flight.append((seq, submit(rows), position))
+            while len(in_flight) >= max(1, workers * 2):
+                commit_oldest()
+        while in_flight:
+            commit_oldest()
+        state["done"] = True
+        write_checkpoint(checkpoint_path, state)
+    finally:
+        output.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    rate = scored / elapsed if elapsed else 0.0
+    print(f"✅ Scored {scored} messages in {elapsed:.1f}s ({rate:.0f} msgs/s) -> {args.output}")
+    print("   layers: " + ", ".join(f"{k}={v}" for k, v in layers.most_common()))
+    return state
+
+
+class _Done:
+    """Already-computed result with the Future interface used by run()."""
+
+    def __init__(self, value):
+        self._value = value
+
+    def result(self):
+        return self._value
+
+
+def main():
+    from chatbot_core import DEFAULT_THRESHOLD
+
+    parser = argparse.ArgumentParser(description="Re-score historical user messages through the chatbot pipeline")
+    parser.add_argument("--source", required=True, help="chat_history.db (SQLite), .csv or .jsonl")
+    parser.add_argument("--output", required=True, help=".jsonl file or .parquet directory")
+    parser.add_argument("--text-column", default="user_message", help="message field for CSV/JSONL input")
+    parser.add_argument("--id-column", default=None, help="id field for CSV/JSONL input (default: record number)")
+    parser.add_argument("--faq", default=file_path, help="FAQ file to score against (.csv, .json or binary store)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="0 = score in this process")
+    parser.add_argument("--checkpoint", default=None, help="default: <output>.checkpoint.json")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
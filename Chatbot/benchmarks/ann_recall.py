@@ -0,0 +1,69 @@
+"""
+Recall-vs-exact benchmark for the IVF backend on synthetic embeddings.
+
+    python benchmarks/ann_recall.py --rows 200000 --dim 384 --nprobe 1 4 8 16 32
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from faq_index import FaqIndex  # noqa: E402
+from ivf_index import IVFIndex  # noqa: E402
+
+
+def synthetic_embeddings(rows, dim, clusters, seed=0):
+    """Clustered Gaussian vectors, roughly what sentence embeddings look like."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    noise = rng.standard_normal((rows, dim)).astype(np.float32) * 0.6
+    return centers[labels] + noise, rng
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    data, rng = synthetic_embeddings(args.rows, args.dim, clusters=max(16, args.rows // 500))
+    queries = data[rng.choice(args.rows, args.queries, replace=False)]
+    queries = queries + rng.standard_normal(queries.shape).astype(np.float32) * 0.3
+
+    exact = FaqIndex(data)
+    t0 = time.perf_counter()
+    ivf = IVFIndex.build(data, nlist=args.nlist)
+    build_s = time.perf_counter() - t0
+    print(f"rows={args.rows} dim={args.dim} nlist={ivf.nlist} build={build_s:.2f}s")
+
+    truth = []
+    t0 = time.perf_counter()
+    for q in queries:
+        truth.append(set(exact.search(q, k=args.k)[1].tolist()))
+    exact_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+    print(f"{'exact':>10}  recall@{args.k}=1.000  top1=1.000  {exact_ms:8.3f} ms/query")
+
+    for nprobe in args.nprobe:
+        hits, top1 = 0, 0
+        t0 = time.perf_counter()
+        results = [ivf.search(q, k=args.k, nprobe=nprobe)[1] for q in queries]
+        ms = (time.perf_counter() - t0) * 1000 / len(queries)
+        for found, expected, q in zip(results, truth, queries):
+            hits += len(expected.intersection(found.tolist()))
+            top1 += int(len(found) > 0 and found[0] == exact.search(q, k=1)[1][0])
+        recall = hits / (args.k * len(queries))
+        print(f"nprobe={nprobe:<3}  recall@{args.k}={recall:.3f}  top1={top1 / len(queries):.3f}  "
+              f"{ms:8.3f} ms/query  ({exact_ms / ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Accuracy parity and CPU cost of the encoder backends (encoders.py).
+
+Every available backend embeds the shipped FAQ questions and the derived
+query sets from hybrid_retrieval.py (verbatim, paraphrase, typo, off-topic).
+Against the reference backend (the first one that loads) it reports:
+
+  top-1      queries whose best FAQ row matches the reference's
+  same reply queries with the same reply/fallback decision at the threshold
+  hit rate   queries answered with their source row (off-topic excluded)
+  cosine     mean / min cosine between the two backends' question vectors
+             (only when the dimensions match, e.g. torch vs onnx)
+
+and, per thread count, single-query encode latency and batch throughput.
+Backends that cannot load here (missing package or ONNX export) are listed
+as skipped.
+
+    python benchmarks/encoder_parity.py
+    python benchmarks/encoder_parity.py --backends sentence-transformers onnx --threads 1 2 4 --output parity.json
+
+Export the ONNX model first with `python encoders.py export`. RSS is
+measured in one process with backends loaded one after another, so treat
+the per-backend deltas as approximate.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ["CHATBOT_PRELOAD"] = "0"
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from hybrid_retrieval import query_sets  # noqa: E402
+
+
+def rss_mb():
+    from shared_store import process_memory
+    try:
+        return (process_memory(os.getpid()) or {}).get("rss_kb", 0) / 1024
+    except OSError:
+        return 0.0
+
+
+def speed(encoder, texts, threads, repeat=3):
+    """p50 single-query ms and batch sentences/s with ``threads`` intra-op threads."""
+    encoder.set_threads(threads)
+    encoder.encode(texts[:8])
+    single = []
+    for text in texts[:50]:
+        started = time.perf_counter()
+        encoder.encode([text])
+        single.append(time.perf_counter() - started)
+    batch = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encoder.encode(texts, batch_size=32)
+        batch.append(time.perf_counter() - started)
+    return {"threads": threads, "single_p50_ms": float(np.percentile(single, 50) * 1e3),
+            "batch_per_s": len(texts) / min(batch)}
+
+
+def decisions(index, query_vectors, threshold):
+    scores, rows = index.search_batch(query_vectors, k=1)
+    return np.where(scores[:, 0] >= threshold, rows[:, 0], -1), rows[:, 0]
+
+
+def cell(entry, key, width):
+    if key in entry:
+        return f"{entry[key]:>{width}.3f}"
+    return f"{'-' if 'reference' in entry else 'ref':>{width}}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["sentence-transformers", "onnx", "hashing"])
+    parser.add_argument("--threads", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument("--threshold", type=float, default=None, help="FAQ threshold (default: serving value)")
+    parser.add_argument("--output", default=None, help="write JSON results here")
+    args = parser.parse_args()
+
+    from chatbot_core import DEFAULT_THRESHOLD
+    from faq_index import FaqIndex
+    from models import load_answers, load_encoder
+    from utils import clean_text
+
+    threshold = DEFAULT_THRESHOLD if args.threshold is None else args.threshold
+    store = load_answers(os.path.join(BASE_DIR, "data", "faq_with_intent.csv"))
+    questions = list(store.questions)
+    queries = [(clean_text(text), expected) for items in query_sets(questions).values() for text, expected in items]
+    texts = [text for text, _ in queries]
+    expected = np.array([-1 if e is None else e for _, e in queries])
+
+    report = {"threshold": threshold, "queries": len(queries), "backends": {}}
+    reference = None
+    for backend in dict.fromkeys(args.backends):
+        before = rss_mb()
+        try:
+            encoder, cache_name = load_encoder(backend, threads=args.threads[0])
+        except (ImportError, OSError, ValueError) as e:
+            report["backends"][backend] = {"skipped": f"{type(e).__name__}: {e}"}
+            print(f"⏭️  {backend}: skipped ({type(e).__name__}: {e})")
+            continue
+        question_vectors = np.asarray(encoder.encode(questions), dtype=np.float32)
+        query_vectors = np.asarray(encoder.encode(texts), dtype=np.float32)
+        index = FaqIndex.from_store(store, question_vectors)
+        reply, top1 = decisions(index, query_vectors, threshold)
+        entry = {
+            "cache_name": cache_name,
+            "dim": int(question_vectors.shape[1]),
+            "rss_delta_mb": rss_mb() - before,
+            "hit_rate": float(np.mean(reply[expected >= 0] == expected[expected >= 0])),
+            "offtopic_answered": float(np.mean(reply[expected < 0] >= 0)),
+            "speed": [speed(encoder, questions, t) for t in args.threads],
+        }
+        if reference is None:
+            reference = (backend, question_vectors, reply, top1)
+        else:
+            ref_name, ref_vectors, ref_reply, ref_top1 = reference
+            entry.update(reference=ref_name, top1_agreement=float(np.mean(top1 == ref_top1)),
+                         same_reply=float(np.mean(reply == ref_reply)))
+            if ref_vectors.shape == question_vectors.shape:
+                a = ref_vectors / np.linalg.norm(ref_vectors, axis=1, keepdims=True)
+                b = question_vectors / np.linalg.norm(question_vectors, axis=1, keepdims=True)
+                cosine = np.sum(a * b, axis=1)
+                entry.update(cosine_mean=float(cosine.mean()), cosine_min=float(cosine.min()))
+        report["backends"][backend] = entry
+        del encoder
+
+    print(f"\n{'backend':<22} {'dim':>4} {'hit rate':>9} {'top-1':>7} {'same reply':>11} "
+          f"{'cos mean':>9} {'cos min':>8} {'RSS +MB':>8}")
+    for backend, entry in report["backends"].items():
+        if "skipped" in entry:
+            continue
+        print(f"{backend:<22} {entry['dim']:>4} {entry['hit_rate']:>9.3f} {cell(entry, 'top1_agreement', 7)} "
+              f"{cell(entry, 'same_reply', 11)} {cell(entry, 'cosine_mean', 9)} {cell(entry, 'cosine_min', 8)} "
+              f"{entry['rss_delta_mb']:>8.1f}")
+
+    print(f"\n{'backend':<22} {'threads':>7} {'1 query ms':>11} {'batch /s':>10}")
+    for backend, entry in report["backends"].items():
+        for s in entry.get("speed", []):
+            print(f"{backend:<22} {s['threads']:>7} {s['single_p50_ms']:>11.2f} {s['batch_per_s']:>10.0f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Dense-only vs. BM25 + dense retrieval on the shipped FAQ (lexical_index.py).
+
+Queries are derived from data/faq_with_intent.csv, so the correct row is
+known for each one:
+
+  verbatim    the 79 FAQ questions as written
+  paraphrase  each question lowercased with its first or last word dropped
+  typo        each question with two letters of its longest word swapped
+  offtopic    out-of-domain questions that should fall back (no answer)
+
+For every configuration it reports the hit rate (answered with the right row
+at the serving threshold), false answers on off-topic queries, the share of
+queries that needed the encoder, and per-query latency of get_faq_match.
+
+    python benchmarks/hybrid_retrieval.py
+    python benchmarks/hybrid_retrieval.py --encode-ms 8 --output hybrid.json
+
+The offline HashingEncoder is itself word/trigram based and costs ~0.1 ms;
+--encode-ms adds a fixed delay per encode call to stand in for a real
+sentence-transformers forward pass on CPU.
+"""
+import argparse
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+if __name__ == "__main__":
+    # Before any project import: nothing this benchmark loads may land in the
+    # real cache (scripts importing query_sets set up their own scratch dir)
+    BENCH_DIR = tempfile.mkdtemp(prefix="chatbot-bench-")
+    atexit.register(shutil.rmtree, BENCH_DIR, ignore_errors=True)
+    os.environ["CHATBOT_EMBEDDING_CACHE_DIR"] = os.path.join(BENCH_DIR, "cache")
+os.environ.setdefault("CHATBOT_ENCODER_BACKEND", "hashing")
+os.environ["CHATBOT_PRELOAD"] = "0"
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+OFFTOPIC = [
+    "what is the weather on mars",
+    "who won the football match yesterday",
+    "tell me a joke about penguins",
+    "how tall is mount everest",
+    "what is the capital of australia",
+    "recommend a good sci fi novel",
+    "how do i bake sourdough bread",
+    "what time is it in tokyo",
+    "explain quantum entanglement simply",
+    "who painted the mona lisa",
+]
+
+# (name, lexical accept threshold, fusion strategy)
+CONFIGS = [
+    ("dense", 0.0, "dense"),
+    ("bm25-shortcut", 0.9, "dense"),
+    ("bm25-rerank", 0.9, "rerank"),
+    ("bm25-rrf", 0.9, "rrf"),
+]
+
+
+class DelayedEncoder:
+    """Wraps an encoder, adding ``delay_s`` per call and counting calls."""
+
+    def __init__(self, encoder, delay_s):
+        self.encoder = encoder
+        self.delay_s = delay_s
+        self.calls = 0
+
+    def encode(self, sentences, **kwargs):
+        self.calls += 1
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        return self.encoder.encode(sentences, **kwargs)
+
+
+def query_sets(questions):
+    from utils import clean_text
+
+    sets = {"verbatim": [(q, row) for row, q in enumerate(questions)], "paraphrase": [], "typo": []}
+    for row, q in enumerate(questions):
+        words = clean_text(q).split()
+        if len(words) > 3:
+            sets["paraphrase"].append((" ".join(words[1:] if row % 2 else words[:-1]), row))
+        longest = max(words, key=len)
+        if len(longest) > 3:
+            i = len(longest) // 2
+            typo = longest[:i - 1] + longest[i] + longest[i - 1] + longest[i + 1:]
+            sets["typo"].append((" ".join(typo if w == longest else w for w in words), row))
+    sets["offtopic"] = [(q, None) for q in OFFTOPIC]
+    return sets
+
+
+def run_config(name, accept, fusion, sets, encoder, store, index, threshold):
+    import chatbot_core
+
+    chatbot_core.LEXICAL_ACCEPT = accept
+    chatbot_core.FUSION_STRATEGY = fusion
+    chatbot_core.LEXICAL_ENABLED = accept > 0 or fusion != "dense"
+
+    result = {"name": name, "lexical_accept": accept, "fusion": fusion, "sets": {}}
+    timings, encodes, total = [], 0, 0
+    for set_name, queries in sets.items():
+        hits = answered = 0
+        before = encoder.calls
+        for text, expected in queries:
+            started = time.perf_counter()
+            match = chatbot_core.get_faq_match(text, encoder, store, index)
+            timings.append(time.perf_counter() - started)
+            ok = match is not None and match["score"] >= threshold
+            answered += ok
+            hits += ok and match["row"] == expected
+        encodes += encoder.calls - before
+        total += len(queries)
+        entry = {"queries": len(queries), "answered": answered / len(queries)}
+        if set_name != "offtopic":
+            entry["hit_rate"] = hits / len(queries)
+        result["sets"][set_name] = entry
+
+    us = np.array(timings) * 1e6
+    result.update(encode_share=encodes / total, p50_us=float(np.percentile(us, 50)),
+                  mean_us=float(us.mean()), p99_us=float(np.percentile(us, 99)))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--encode-ms", type=float, default=0.0, help="simulated encoder cost per call")
+    parser.add_argument("--threshold", type=float, default=None, help="FAQ threshold (default: serving value)")
+    parser.add_argument("--output", default=None, help="write JSON results here")
+    args = parser.parse_args()
+
+    from chatbot_core import DEFAULT_THRESHOLD
+    from lexical_index import lexical_index_for
+    from models import build_faq_index, load_answers, load_model_and_embeddings
+
+    threshold = DEFAULT_THRESHOLD if args.threshold is None else args.threshold
+    store = load_answers(os.path.join(BASE_DIR, "data", "faq_with_intent.csv"))
+    model, embeddings = load_model_and_embeddings(store, use_cache=False)
+    index = build_faq_index(store, embeddings, backend="exact")
+    lexical_index_for(store)
+    encoder = DelayedEncoder(model, args.encode_ms / 1000.0)
+    sets = query_sets(list(store.questions))
+
+    results = []
+    print(f"{'config':<15} {'verbatim':>9} {'paraphr.':>9} {'typo':>9} {'offtopic':>9} "
+          f"{'encoded':>8} {'p50 µs':>9} {'mean µs':>9}")
+    for name, accept, fusion in CONFIGS:
+        r = run_config(name, accept, fusion, sets, encoder, store, index, threshold)
+        results.append(r)
+        s = r["sets"]
+        print(f"{name:<15} {s['verbatim']['hit_rate']:>9.3f} {s['paraphrase']['hit_rate']:>9.3f} "
+              f"{s['typo']['hit_rate']:>9.3f} {s['offtopic']['answered']:>9.3f} {r['encode_share']:>8.0%} "
+              f"{r['p50_us']:>9.1f} {r['mean_us']:>9.1f}")
+    print("(columns 2-4: hit rate; offtopic: share wrongly answered; encoded: queries that ran the encoder)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"threshold": threshold, "encode_ms": args.encode_ms, "results": results}, f, indent=2)
+        print(f"\n📄 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Intent-routed FAQ search (intent_classifier.py) against the full dense search.
+
+Uses the same derived query sets as hybrid_retrieval.py (verbatim,
+paraphrase, typo, off-topic) on the shipped FAQ with the offline
+HashingEncoder. For each accept threshold it reports the hit rate, how many
+queries were answered by the intent shortcut without encoding, how many
+were routed to one intent's rows, how many replies differ from the unrouted
+search, and get_faq_match latency. The BM25 shortcut is disabled so
+only routing is measured.
+
+    python benchmarks/intent_routing.py
+    python benchmarks/intent_routing.py --rows 100000 --output routing.json
+
+--rows additionally times score_rows() over one intent's share of a
+synthetic catalog against a full index search, which is where routing pays
+off; at 79 rows both are a few microseconds.
+"""
+import argparse
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = tempfile.mkdtemp(prefix="chatbot-bench-")
+atexit.register(shutil.rmtree, BENCH_DIR, ignore_errors=True)
+# Before any project import: the classifier is trained into a scratch cache
+os.environ["CHATBOT_EMBEDDING_CACHE_DIR"] = os.path.join(BENCH_DIR, "cache")
+os.environ.setdefault("CHATBOT_ENCODER_BACKEND", "hashing")
+os.environ["CHATBOT_PRELOAD"] = "0"
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from hybrid_retrieval import DelayedEncoder, query_sets  # noqa: E402
+
+ACCEPTS = [0.0, 0.5, 0.7, 0.9]
+
+
+def run_accept(accept, sets, model, store, index, threshold, baseline=None):
+    import chatbot_core
+
+    chatbot_core.LEXICAL_ACCEPT = 0.0
+    chatbot_core.LEXICAL_ENABLED = False
+    chatbot_core.INTENT_ACCEPT = accept
+    chatbot_core.INTENT_ROUTING = accept > 0
+
+    result = {"accept": accept, "sets": {}}
+    rows, timings, shortcut, routed = {}, [], 0, 0
+    encodes = model.calls
+    for set_name, queries in sets.items():
+        hits = answered = 0
+        for i, (text, expected) in enumerate(queries):
+            started = time.perf_counter()
+            match = chatbot_core.get_faq_match(text, model, store, index, threshold)
+            timings.append(time.perf_counter() - started)
+            ok = match["score"] >= threshold
+            answered += ok
+            hits += ok and match["row"] == expected
+            shortcut += match["source"] == "intent"
+            routed += match["source"] in ("intent", "partition")
+            rows[(set_name, i)] = match["row"] if ok else None
+        entry = {"queries": len(queries), "answered": answered / len(queries)}
+        if set_name != "offtopic":
+            entry["hit_rate"] = hits / len(queries)
+        result["sets"][set_name] = entry
+
+    us = np.array(timings) * 1e6
+    result.update(shortcut=shortcut / len(rows), routed=routed / len(rows),
+                  encoded=(model.calls - encodes) / len(rows), p50_us=float(np.percentile(us, 50)), mean_us=float(us.mean()))
+    if baseline is not None:
+        result["changed_replies"] = sum(rows[key] != baseline[key] for key in rows) / len(rows)
+    return result, rows
+
+
+def time_partition(rows, dim, intents, repeat=20):
+    """Full search vs. score_rows over one intent's share of a synthetic catalog."""
+    from faq_index import FaqIndex
+
+    rng = np.random.default_rng(0)
+    index = FaqIndex(rng.standard_normal((rows, dim), dtype=np.float32))
+    partition = np.flatnonzero(rng.integers(0, intents, rows) == 0)
+    query = rng.standard_normal(dim, dtype=np.float32)
+
+    def p50(fn):
+        fn()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        return float(np.percentile(timings, 50) * 1e3)
+
+    return {"rows": rows, "partition_rows": int(partition.size),
+            "full_ms": p50(lambda: index.search(query, k=1)),
+            "partition_ms": p50(lambda: index.score_rows(query, partition).argmax())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=None, help="FAQ threshold (default: serving value)")
+    parser.add_argument("--rows", type=int, nargs="*", default=[], help="synthetic catalog sizes to time")
+    parser.add_argument("--output", default=None, help="write JSON results here")
+    args = parser.parse_args()
+
+    from chatbot_core import DEFAULT_THRESHOLD
+    from intent_classifier import intent_classifier_for
+    from models import build_faq_index, load_answers, load_model_and_embeddings
+
+    threshold = DEFAULT_THRESHOLD if args.threshold is None else args.threshold
+    store = load_answers(os.path.join(BASE_DIR, "data", "faq_with_intent.csv"))
+    model, embeddings = load_model_and_embeddings(store, use_cache=False)
+    model = DelayedEncoder(model, 0.0)
+    index = build_faq_index(store, embeddings, backend="exact")
+    intent_classifier_for(store)
+    sets = query_sets(list(store.questions))
+
+    results, baseline = [], None
+    print(f"{'accept':<8} {'verbatim':>9} {'paraphr.':>9} {'typo':>9} {'offtopic':>9} "
+          f"{'no enc.':>8} {'routed':>7} {'changed':>8} {'p50 µs':>8}")
+    for accept in ACCEPTS:
+        r, rows = run_accept(accept, sets, model, store, index, threshold, baseline)
+        baseline = baseline or rows
+        results.append(r)
+        s = r["sets"]
+        label = "off" if accept == 0 else f"{accept:.1f}"
+        print(f"{label:<8} {s['verbatim']['hit_rate']:>9.3f} {s['paraphrase']['hit_rate']:>9.3f} "
+              f"{s['typo']['hit_rate']:>9.3f} {s['offtopic']['answered']:>9.3f} {r['shortcut']:>8.0%} {r['routed']:>7.0%} "
+              f"{r.get('changed_replies', 0.0):>8.1%} {r['p50_us']:>8.1f}")
+
+    synthetic = []
+    if args.rows:
+        intents = len(store.intent_names)
+        print(f"\n{'rows':>9} {'partition':>10} {'full ms':>8} {'routed ms':>10}   (1 of {intents} intents)")
+        for n in args.rows:
+            t = time_partition(n, embeddings.shape[1], intents)
+            synthetic.append(t)
+            print(f"{n:>9} {t['partition_rows']:>10} {t['full_ms']:>8.2f} {t['partition_ms']:>10.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"threshold": threshold, "faq": results, "synthetic": synthetic}, f, indent=2)
+        print(f"\n📄 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
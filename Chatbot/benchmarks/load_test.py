@@ -0,0 +1,193 @@
+"""
+HTTP load test for the chatbot /get endpoint.
+
+Every /get request is logged to the chat history, so by default the servers
+under test are started here with CHATBOT_DB_PATH pointing at a scratch
+database that is deleted afterwards:
+
+    python benchmarks/load_test.py --serve flask asgi -c 32 -n 2000
+
+Already running servers can be given as URLs instead; start them with a
+throwaway CHATBOT_DB_PATH, or the load test fills the real chat_history.db:
+
+    CHATBOT_DB_PATH=/tmp/load.db python streamlit_chatbot.py
+    python benchmarks/load_test.py http://127.0.0.1:5100 -c 32 -n 2000
+"""
+import argparse
+import atexit
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode, urlparse
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Server commands for --serve; {port} is filled in per server
+SERVERS = {
+    "flask": [sys.executable, "streamlit_chatbot.py"],
+    "asgi": [sys.executable, "-m", "uvicorn", "asgi_app:app", "--host", "127.0.0.1", "--port", "{port}"],
+}
+
+QUERIES = [
+    "how can i track my order",
+    "what payment methods do you accept",
+    "can i return a product",
+    "how long does shipping take",
+    "do you offer international shipping",
+    "how do i create an account",
+    "can i change my shipping address",
+    "is my personal information secure",
+    "do you have a physical store",
+    "hi there",
+    "what is your return policy for sale items",
+    "how do i use a gift card",
+]
+
+
+def run(base_url, concurrency, total, timeout):
+    url = urlparse(base_url)
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker(seed):
+        nonlocal errors
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    break
+            body = urlencode({"msg": rng.choice(QUERIES), "session_id": f"loadtest_{seed}"})
+            started = time.perf_counter()
+            try:
+                conn.request("POST", "/get", body, {"Content-Type": "application/x-www-form-urlencoded"})
+                response = conn.getresponse()
+                payload = response.read()
+                ok = response.status == 200 and "reply" in json.loads(payload)
+            except Exception:
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+        conn.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    ms = np.array(latencies) * 1000.0
+    return {
+        "url": base_url,
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / wall if wall else 0.0,
+        "p50_ms": float(np.percentile(ms, 50)) if ms.size else None,
+        "p99_ms": float(np.percentile(ms, 99)) if ms.size else None,
+        "max_ms": float(ms.max()) if ms.size else None,
+    }
+
+
+def wait_ready(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/readyz")
+            status = conn.getresponse().status
+            conn.close()
+            if status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.1)
+    return False
+
+
+def start_server(name, port, scratch_dir, timeout):
+    """Start ``name`` on ``port`` logging into a scratch database; returns the process."""
+    env = dict(os.environ, CHATBOT_PORT=str(port),
+               CHATBOT_DB_PATH=os.path.join(scratch_dir, f"{name}-chat_history.db"))
+    proc = subprocess.Popen([arg.format(port=port) for arg in SERVERS[name]], cwd=BASE_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_ready(port, timeout):
+        stop_server(proc)
+        sys.exit(f"❌ {name} server did not become ready on port {port}")
+    return proc
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("urls", nargs="*", help="base URLs of already running servers")
+    parser.add_argument("--serve", nargs="+", choices=sorted(SERVERS), default=[],
+                        help="start these servers with a scratch chat database")
+    parser.add_argument("--port", type=int, default=5190, help="first port for --serve")
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--json", action="store_true", help="print raw JSON results")
+    args = parser.parse_args()
+    if not args.urls and not args.serve:
+        parser.error("give server URLs or --serve")
+
+    targets = [(url, None) for url in args.urls]
+    if args.serve:
+        scratch_dir = tempfile.mkdtemp(prefix="chatbot-bench-")
+        atexit.register(shutil.rmtree, scratch_dir, ignore_errors=True)
+        targets += [(f"http://127.0.0.1:{args.port + i}", name) for i, name in enumerate(args.serve)]
+
+    results = []
+    for base_url, name in targets:
+        proc = start_server(name, urlparse(base_url).port, scratch_dir, args.ready_timeout) if name else None
+        try:
+            run(base_url, min(4, args.concurrency), args.warmup, args.timeout)
+            result = run(base_url, args.concurrency, args.requests, args.timeout)
+        finally:
+            if proc is not None:
+                stop_server(proc)
+        result["server"] = name or "external"
+        results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'url':<32} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for r in results:
+        p50 = f"{r['p50_ms']:.1f}" if r["p50_ms"] is not None else "-"
+        p99 = f"{r['p99_ms']:.1f}" if r["p99_ms"] is not None else "-"
+        print(f"{r['url']:<32} {r['rps']:>9.1f} {p50:>9} {p99:>9} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Memory and accuracy report for the int8 quantized FAQ index (quantized_index.py)
+against the exact float32 FaqIndex.
+
+For every catalog size it reports the resident size of each representation,
+per-query search latency, and how often the quantized path (with and without
+float32 re-ranking) agrees with the exact one: top-1 agreement, recall@10 and
+the top-1 score error. The real 79-row FAQ is also checked end to end with the
+offline HashingEncoder, including whether the reply/fallback decision at the
+serving threshold changes.
+
+    python benchmarks/quantization.py
+    python benchmarks/quantization.py --sizes 10000 1000000 --rerank-k 16 64 --output quant.json
+
+Synthetic catalogs are unit vectors from a fixed seed; their queries are rows
+plus noise ("near", a clear nearest neighbour) and fresh random vectors
+("random", near-ties everywhere - the hardest case for top-1 agreement).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("CHATBOT_ENCODER_BACKEND", "hashing")
+os.environ["CHATBOT_PRELOAD"] = "0"
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+SEED = 1234
+RECALL_AT = 10
+
+
+def unit_rows(rng, rows, dim):
+    matrix = np.empty((rows, dim), dtype=np.float32)
+    for start in range(0, rows, 65536):
+        block = rng.standard_normal((min(65536, rows - start), dim), dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        matrix[start:start + block.shape[0]] = block
+    return matrix
+
+
+def p50_ms(fn, queries, repeat=2):
+    fn(queries[0])
+    timings = []
+    for _ in range(repeat):
+        for q in queries:
+            started = time.perf_counter()
+            fn(q)
+            timings.append(time.perf_counter() - started)
+    return float(np.percentile(timings, 50) * 1e3)
+
+
+def compare(exact, candidate, queries):
+    """Agreement of ``candidate`` with ``exact`` over ``queries``."""
+    k = min(RECALL_AT, len(exact))
+    e_scores, e_idx = exact.search_batch(queries, k=k)
+    c_scores, c_idx = candidate.search_batch(queries, k=k)
+    recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(e_idx, c_idx)])
+    return {
+        "top1_agreement": float(np.mean(e_idx[:, 0] == c_idx[:, 0])),
+        f"recall@{k}": float(recall),
+        "top1_score_abs_error_mean": float(np.mean(np.abs(e_scores[:, 0] - c_scores[:, 0]))),
+        "top1_score_abs_error_max": float(np.max(np.abs(e_scores[:, 0] - c_scores[:, 0]))),
+    }
+
+
+def variants(matrix, rerank_ks):
+    from quantized_index import Int8Index
+
+    yield "int8", Int8Index.build(matrix, rerank=False)
+    for rerank_k in rerank_ks:
+        yield f"int8+rerank{rerank_k}", Int8Index.build(matrix, rerank_k=rerank_k)
+
+
+def report_size(rows, dim, n_queries, rerank_ks):
+    from faq_index import FaqIndex
+
+    rng = np.random.default_rng(SEED)
+    matrix = unit_rows(rng, rows, dim)
+    exact = FaqIndex.from_normalized(matrix)
+    near = matrix[rng.choice(rows, n_queries)] + 0.06 * rng.standard_normal((n_queries, dim), dtype=np.float32)
+    query_sets = {"near": near, "random": unit_rows(rng, n_queries, dim)}
+    timing_queries = list(near[:20])
+
+    result = {
+        "rows": rows,
+        "dim": dim,
+        "exact": {"bytes": int(matrix.nbytes), "p50_ms": p50_ms(lambda q: exact.search(q), timing_queries)},
+    }
+    for name, index in variants(matrix, rerank_ks):
+        entry = {
+            "bytes": int(index.nbytes),
+            "memory_saved": 1.0 - index.nbytes / matrix.nbytes,
+            "p50_ms": p50_ms(lambda q: index.search(q), timing_queries),
+        }
+        for set_name, queries in query_sets.items():
+            entry[set_name] = compare(exact, index, queries)
+        result[name] = entry
+    return result
+
+
+def report_faq(rerank_ks, threshold):
+    """The shipped FAQ with the HashingEncoder: reply decisions, not just rows."""
+    from chatbot_core import DEFAULT_THRESHOLD
+    from models import build_faq_index, load_answers, load_model_and_embeddings
+
+    threshold = DEFAULT_THRESHOLD if threshold is None else threshold
+    store = load_answers(os.path.join(BASE_DIR, "data", "faq_with_intent.csv"))
+    model, embeddings = load_model_and_embeddings(store, use_cache=False)
+    # Every question lowercased with its last word dropped, as a light paraphrase
+    texts = [" ".join(q.lower().split()[:-1]) or q for q in store.questions]
+    queries = np.asarray(model.encode(texts), dtype=np.float32)
+
+    exact = build_faq_index(store, embeddings, backend="exact")
+    e_scores, e_idx = exact.search_batch(queries, k=1)
+    result = {"rows": len(store), "queries": len(texts), "threshold": threshold}
+    for name, index in variants(np.asarray(embeddings, dtype=np.float32), rerank_ks):
+        c_scores, c_idx = index.search_batch(queries, k=1)
+        e_hit, c_hit = e_scores[:, 0] >= threshold, c_scores[:, 0] >= threshold
+        result[name] = {
+            "top1_agreement": float(np.mean(e_idx[:, 0] == c_idx[:, 0])),
+            "threshold_decision_agreement": float(np.mean(e_hit == c_hit)),
+            "same_reply": float(np.mean((e_hit == c_hit) & (~e_hit | (e_idx[:, 0] == c_idx[:, 0])))),
+            "top1_score_abs_error_max": float(np.max(np.abs(e_scores[:, 0] - c_scores[:, 0]))),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384, help="all-MiniLM-L6-v2 width")
+    parser.add_argument("--queries", type=int, default=200, help="queries per accuracy set")
+    parser.add_argument("--rerank-k", type=int, nargs="+", default=[32], help="re-rank candidate counts")
+    parser.add_argument("--threshold", type=float, default=None, help="FAQ threshold (default: serving value)")
+    parser.add_argument("--output", default=None, help="write JSON results here")
+    args = parser.parse_args()
+
+    report = {"faq": report_faq(args.rerank_k, args.threshold), "synthetic": []}
+    faq = report["faq"]
+    print(f"Real FAQ ({faq['rows']} rows, {faq['queries']} paraphrased queries, threshold {faq['threshold']}):")
+    for name, entry in faq.items():
+        if isinstance(entry, dict):
+            print(f"  {name:<16} top-1 {entry['top1_agreement']:.3f}  same reply {entry['same_reply']:.3f}  "
+                  f"max score err {entry['top1_score_abs_error_max']:.4f}")
+
+    print(f"\n{'rows':>9} {'variant':<16} {'MB':>8} {'saved':>6} {'p50 ms':>8} "
+          f"{'near top-1':>10} {'rand top-1':>10} {f'rand r@{RECALL_AT}':>10} {'rand err':>9}")
+    for rows in args.sizes:
+        result = report_size(rows, args.dim, args.queries, args.rerank_k)
+        report["synthetic"].append(result)
+        exact = result["exact"]
+        print(f"{rows:>9} {'exact float32':<16} {exact['bytes'] / 1e6:>8.1f} {'':>6} {exact['p50_ms']:>8.2f}")
+        for name, entry in result.items():
+            if not isinstance(entry, dict) or name == "exact":
+                continue
+            recall = next(v for key, v in entry["random"].items() if key.startswith("recall@"))
+            print(f"{'':>9} {name:<16} {entry['bytes'] / 1e6:>8.1f} {entry['memory_saved']:>6.0%} "
+                  f"{entry['p50_ms']:>8.2f} {entry['near']['top1_agreement']:>10.3f} "
+                  f"{entry['random']['top1_agreement']:>10.3f} {recall:>10.3f} "
+                  f"{entry['random']['top1_score_abs_error_mean']:>9.5f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
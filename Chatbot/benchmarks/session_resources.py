@@ -0,0 +1,108 @@
+"""
+Per-session load time and memory of the Streamlit UI's model/FAQ resources.
+
+"per-session" replays what app.py used to do for every new browser session:
+load the FAQ, the encoder and the embeddings into that session's state.
+"shared" is the current behaviour: the first session triggers one
+chat_service.load() for the process and every session afterwards only holds
+its message list.
+
+    python benchmarks/session_resources.py --sessions 50
+
+Memory is what each approach keeps allocated (tracemalloc, which sees numpy
+buffers) after all sessions are open. The offline HashingEncoder has no
+weights, so with sentence-transformers each per-session copy additionally
+holds the model's parameters (reported when that backend is active).
+"""
+import argparse
+import atexit
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = tempfile.mkdtemp(prefix="chatbot-bench-")
+atexit.register(shutil.rmtree, BENCH_DIR, ignore_errors=True)
+# Before any project import: scratch DB and embedding cache, so a run never
+# touches (or prunes) the real ones
+os.environ["CHATBOT_DB_PATH"] = os.path.join(BENCH_DIR, "bench.db")
+os.environ["CHATBOT_EMBEDDING_CACHE_DIR"] = os.path.join(BENCH_DIR, "cache")
+os.environ.setdefault("CHATBOT_ENCODER_BACKEND", "hashing")
+os.environ["CHATBOT_PRELOAD"] = "0"
+os.environ["CHATBOT_FAQ_WATCH_INTERVAL"] = "0"
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+def model_bytes(model):
+    model = getattr(model, "model", model)  # TorchEncoder wraps the SentenceTransformer
+    if hasattr(model, "parameters"):
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+    return 0
+
+
+def open_sessions(n, new_session):
+    """Opens ``n`` sessions; returns (sessions, per-session seconds, retained bytes)."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    sessions, timings = [], []
+    for i in range(n):
+        started = time.perf_counter()
+        sessions.append(new_session(i))
+        timings.append(time.perf_counter() - started)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return sessions, timings, retained
+
+
+def per_session(i):
+    from models import build_faq_index, load_answers, load_model_and_embeddings
+
+    store = load_answers()
+    model, embeddings = load_model_and_embeddings(store)
+    return {"messages": [], "model": model, "df": store, "question_embeddings": embeddings,
+            "faq_index": build_faq_index(store, embeddings)}
+
+
+def shared(i):
+    import chat_service as service
+
+    service.load()
+    return {"messages": [], "session_id": f"session_{i}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    args = parser.parse_args()
+
+    # Imports, the spell-checker dictionary and the rule matcher are process
+    # singletons in both modes; keep them out of the numbers
+    import chat_service  # noqa: F401
+    import models  # noqa: F401
+    from intent_matcher import get_matcher
+    from utils import get_spellchecker
+    get_spellchecker()
+    get_matcher()
+
+    print(f"{'mode':<12} {'first ms':>9} {'next ms':>9} {'total ms':>9} {'retained MB':>12} {'per session kB':>15}")
+    for name, factory in (("per-session", per_session), ("shared", shared)):
+        sessions, timings, retained = open_sessions(args.sessions, factory)
+        later = sorted(timings[1:]) or timings
+        print(f"{name:<12} {timings[0] * 1e3:>9.1f} {later[len(later) // 2] * 1e3:>9.2f} "
+              f"{sum(timings) * 1e3:>9.1f} {retained / 1e6:>12.2f} {retained / len(sessions) / 1e3:>15.1f}")
+        if name == "per-session":
+            weights = model_bytes(sessions[0]["model"])
+            if weights:
+                print(f"{'':<12} + {weights / 1e6:.0f} MB of encoder weights per session")
+        del sessions
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Startup-time benchmark: import cost of the server modules and time until the
+Flask server is live (/healthz) and ready (/readyz).
+
+    python benchmarks/startup_time.py                        # import breakdown
+    python benchmarks/startup_time.py --serve                # + bind/ready timings
+    python benchmarks/startup_time.py --budget-ms 400        # exit 1 on regression
+
+The import breakdown comes from ``python -X importtime`` in a fresh
+interpreter. Modules listed in --forbid (heavy ML / data libraries) must not
+be imported at startup at all; they belong to the background model load.
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "sentence_transformers", "torch", "transformers", "spellchecker", "sklearn"]
+
+
+def import_profile(module):
+    """Returns [(module, self_us, cumulative_us)] from -X importtime."""
+    # Without the background model load, whose imports would interleave
+    env = dict(os.environ, CHATBOT_PRELOAD="0")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def wait_for(port, path, deadline):
+    """perf_counter() time when GET path first returns 200, or None on timeout."""
+    while time.perf_counter() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", path)
+            status = conn.getresponse().status
+            conn.close()
+            if status == 200:
+                return time.perf_counter()
+        except OSError:
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def serve_timings(port, timeout):
+    env = dict(os.environ, CHATBOT_PORT=str(port))
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "streamlit_chatbot.py"], cwd=BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + timeout
+        live = wait_for(port, "/healthz", deadline)
+        ready = wait_for(port, "/readyz", deadline)
+        return {
+            "live_s": round(live - started, 3) if live is not None else None,
+            "ready_s": round(ready - started, 3) if ready is not None else None,
+        }
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="streamlit_chatbot", help="module to import-profile")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--forbid", nargs="*", default=HEAVY_MODULES,
+                        help="top-level packages that must not be imported at startup")
+    parser.add_argument("--budget-ms", type=float, default=0, help="fail if total import time exceeds this")
+    parser.add_argument("--serve", action="store_true", help="also time /healthz and /readyz of a live server")
+    parser.add_argument("--port", type=int, default=5199)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", action="store_true", help="print raw JSON results")
+    args = parser.parse_args()
+
+    rows = import_profile(args.module)
+    total_ms = next((c for name, _, c in rows if name == args.module), 0) / 1000.0
+    imported = {name.split(".")[0] for name, _, _ in rows}
+    forbidden = sorted(set(args.forbid) & imported)
+    result = {
+        "module": args.module,
+        "import_ms": round(total_ms, 1),
+        "modules_imported": len(rows),
+        "forbidden_imported": forbidden,
+        "top_cumulative": [
+            {"module": name, "self_ms": s / 1000.0, "cumulative_ms": c / 1000.0}
+            for name, s, c in sorted(rows, key=lambda r: -r[2])[:args.top]
+        ],
+    }
+    if args.serve:
+        result.update(serve_timings(args.port, args.timeout))
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"import {args.module}: {total_ms:.1f} ms, {len(rows)} modules")
+        print(f"{'module':<40} {'self ms':>9} {'cum ms':>9}")
+        for row in result["top_cumulative"]:
+            print(f"{row['module']:<40} {row['self_ms']:>9.1f} {row['cumulative_ms']:>9.1f}")
+        if args.serve:
+            print(f"live after {result['live_s']} s, ready after {result['ready_s']} s")
+
+    failures = []
+    if forbidden:
+        failures.append(f"heavy modules imported at startup: {', '.join(forbidden)}")
+    if args.budget_ms and total_ms > args.budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Reproducible micro/macro benchmark suite for the reply pipeline.
+
+Runs offline: the deterministic HashingEncoder (encoders.py) stands in for the
+sentence-transformers model, FAQ catalogs beyond the real CSV are synthetic
+unit vectors from a fixed seed, and the database goes to a temporary file.
+
+    python benchmarks/suite.py --output bench.json
+    python benchmarks/suite.py --sizes 80 1000 100000 1000000 --only faq
+    python benchmarks/suite.py --output new.json --compare bench.json
+
+Each case reports per-call mean/p50/p99 (µs) and ops/s; --compare prints the
+p50 ratio against an earlier run's JSON (> 1.0 means slower).
+"""
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = tempfile.mkdtemp(prefix="chatbot-bench-")
+atexit.register(shutil.rmtree, BENCH_DIR, ignore_errors=True)
+# Before any project import: offline encoder, scratch DB and embedding cache
+os.environ["CHATBOT_ENCODER_BACKEND"] = "hashing"
+os.environ["CHATBOT_DB_PATH"] = os.path.join(BENCH_DIR, "bench.db")
+os.environ["CHATBOT_EMBEDDING_CACHE_DIR"] = os.path.join(BENCH_DIR, "cache")
+os.environ["CHATBOT_PRELOAD"] = "0"
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+SEED = 1234
+
+QUERIES = [
+    "How can I track my order?",
+    "what paymnt methods do you acept",
+    "Can I cancel my subscription to your newsletter?",
+    "do you ship internationaly",
+    "hi there",
+    "my refund hasnt arrived yet order 4521",
+    "is cash on delivery available for electronics",
+    "how do i change the shipping adress on my acount",
+]
+
+
+def measure(fn, args_list, repeat=3, warmup=20):
+    """Per-call timings (seconds) of ``fn(*args)`` cycling through ``args_list``."""
+    for i in range(min(warmup, len(args_list) * 4)):
+        fn(*args_list[i % len(args_list)])
+    timings = []
+    for _ in range(repeat):
+        for args in args_list:
+            started = time.perf_counter()
+            fn(*args)
+            timings.append(time.perf_counter() - started)
+    return np.array(timings)
+
+
+def summarize(name, timings, **params):
+    us = timings * 1e6
+    return {
+        "name": name,
+        "params": params,
+        "calls": int(us.size),
+        "mean_us": float(us.mean()),
+        "p50_us": float(np.percentile(us, 50)),
+        "p99_us": float(np.percentile(us, 99)),
+        "ops_per_s": float(1e6 / us.mean()) if us.mean() else None,
+    }
+
+
+def quiet():
+    # Some code paths still print per call; keep the report readable
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+# ----------------------------
+# Cases
+# ----------------------------
+def bench_text(calls):
+    from utils import clean_text, correct_spelling, _correct_token, get_spellchecker
+
+    get_spellchecker()
+    args = [(q,) for q in (QUERIES * (calls // len(QUERIES) + 1))[:calls]]
+    cleaned = [(clean_text(q),) for (q,) in args]
+    results = [summarize("clean_text", measure(clean_text, args))]
+
+    results.append(summarize("correct_spelling.cached", measure(correct_spelling, cleaned)))
+
+    def cold(text):
+        _correct_token.cache_clear()
+        correct_spelling(text)
+    results.append(summarize("correct_spelling.cold", measure(cold, cleaned[:len(QUERIES)], repeat=2, warmup=0)))
+    return results
+
+
+def bench_rules(calls):
+    from intent_matcher import get_matcher
+    from utils import clean_text
+
+    matcher = get_matcher()
+    texts = [(clean_text(q),) for q in (QUERIES * (calls // len(QUERIES) + 1))[:calls]]
+    results = []
+    for cascades in (("greeting",), ("rule_based",), ("business",), ("greeting", "rule_based", "business")):
+        results.append(summarize(
+            "rules." + "+".join(cascades),
+            measure(lambda t, c=cascades: matcher.match(t, c), texts),
+        ))
+    return results
+
+
+def synthetic_index(rows, dim, dtype):
+    """Unit vectors from a fixed seed, built in blocks to bound peak memory."""
+    from faq_index import FaqIndex
+
+    rng = np.random.default_rng(SEED)
+    matrix = np.empty((rows, dim), dtype=dtype)
+    for start in range(0, rows, 65536):
+        block = rng.standard_normal((min(65536, rows - start), dim), dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        matrix[start:start + block.shape[0]] = block
+    answers = [f"synthetic answer {i}" for i in range(rows)]
+    return FaqIndex.from_normalized(matrix, answers)
+
+
+def bench_faq(sizes, calls, dtype):
+    from chatbot_core import get_faq_response
+    from encoders import HashingEncoder
+    from models import load_answers, build_faq_index, load_model_and_embeddings
+
+    encoder = HashingEncoder()
+    args = [(q,) for q in QUERIES]
+    results = []
+    for rows in sizes:
+        if rows <= 80:
+            # The real FAQ catalog (79 rows)
+            df = load_answers(os.path.join(BASE_DIR, "data", "faq_with_intent.csv"))
+            with quiet():
+                _, embeddings = load_model_and_embeddings(df)
+            index = build_faq_index(df, embeddings, dtype=dtype)
+        else:
+            df, index = None, synthetic_index(rows, encoder.dim, dtype)
+        timings = measure(lambda q: get_faq_response(q, encoder, df, index), args * max(1, calls // len(args) // 10),
+                          repeat=1, warmup=4)
+        results.append(summarize("get_faq_response", timings, rows=len(index), dtype=dtype))
+        del index
+    return results
+
+
+def bench_database(calls):
+    import database
+
+    database.init_db()
+    with quiet():
+        timings = measure(lambda i: database.save_chat(f"bench_{i % 50}", QUERIES[i % len(QUERIES)], "reply"),
+                          [(i,) for i in range(calls)], repeat=1, warmup=0)
+    results = [summarize("database.save_chat", timings)]
+
+    records = [(f"bench_{i % 50}", QUERIES[i % len(QUERIES)], "reply") for i in range(100)]
+    with quiet():
+        timings = measure(database.save_chats, [(records,)] * 20, repeat=1, warmup=2)
+    results.append(summarize("database.save_chats", timings, batch=len(records)))
+
+    with quiet():
+        timings = measure(database.get_chat_history, [(f"bench_{i}", 50) for i in range(50)], repeat=4, warmup=5)
+    results.append(summarize("database.get_chat_history", timings, limit=50))
+
+    # Windowed UI reads: latest page vs. a page deep into a long session
+    # (one exchange per second, as a real conversation is written)
+    with quiet():
+        conn = database.get_connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO chats (session_id, user_message, bot_message, timestamp) "
+                "VALUES (?, ?, 'reply', datetime('2024-01-01', ? || ' seconds'))",
+                [("bench_long", f"question {i}", i) for i in range(5000)],
+            )
+        _, deep = database.get_chat_history_page("bench_long", limit=4900)
+        for name, before in (("latest", None), ("deep", deep)):
+            timings = measure(database.get_chat_history_page, [("bench_long", 20, before)] * 50, repeat=2, warmup=5)
+            results.append(summarize("database.get_chat_history_page", timings, limit=20, page=name, session_rows=5000))
+    return results
+
+
+def bench_end_to_end(calls):
+    import chat_service as service
+    from streamlit_chatbot import app
+
+    with quiet():
+        service.load()
+    client = app.test_client()
+
+    def post(msg):
+        response = client.post("/get", data={"msg": msg, "session_id": "bench"})
+        assert response.status_code == 200
+
+    args = [(q,) for q in QUERIES]
+    results = [summarize("http./get.cached", measure(post, args * max(1, calls // len(args))))]
+
+    def uncached(msg):
+        service.response_cache.clear()
+        post(msg)
+    results.append(summarize("http./get.uncached", measure(uncached, args * max(1, calls // len(args) // 4))))
+    with quiet():
+        service.shutdown()
+    return results
+
+
+# ----------------------------
+# Driver
+# ----------------------------
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "encoder": "hashing",
+        "seed": SEED,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    def key(r):
+        return r["name"], json.dumps(r["params"], sort_keys=True)
+
+    old = {key(r): r for r in baseline["results"]}
+    print(f"\nvs {baseline_path} ({baseline['environment'].get('commit')}): p50 ratio new/old")
+    for r in results:
+        before = old.get(key(r))
+        if before and before["p50_us"]:
+            print(f"  {r['name']:<40} {json.dumps(r['params']):<32} {r['p50_us'] / before['p50_us']:>6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="*", default=None,
+                        help="subset of: text rules faq database e2e")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[80, 1000, 10_000, 100_000],
+                        help="FAQ catalog sizes (1000000 needs ~1.5 GB as float32)")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--calls", type=int, default=400, help="calls per case (approximate)")
+    parser.add_argument("--output", default=None, help="write JSON results here")
+    parser.add_argument("--compare", default=None, help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    groups = {
+        "text": lambda: bench_text(args.calls),
+        "rules": lambda: bench_rules(args.calls),
+        "faq": lambda: bench_faq(args.sizes, args.calls, args.dtype),
+        "database": lambda: bench_database(args.calls),
+        "e2e": lambda: bench_end_to_end(args.calls),
+    }
+    results = []
+    print(f"{'case':<40} {'params':<32} {'p50 µs':>10} {'p99 µs':>10} {'ops/s':>10}")
+    for name, run in groups.items():
+        if args.only and name not in args.only:
+            continue
+        for r in run():
+            results.append(r)
+            print(f"{r['name']:<40} {json.dumps(r['params']):<32} {r['p50_us']:>10.1f} {r['p99_us']:>10.1f} {r['ops_per_s']:>10.0f}")
+
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+
+import database
+
+# ============================
+# Background chat log writer
+# ============================
+# Request handlers hand chat records to a bounded queue and return at once.
+# A single writer thread drains it and group-commits with executemany every
+# ``flush_records`` records or ``flush_interval_ms``, whichever comes first,
+# so many messages share one transaction and one WAL sync.
+
+_FLUSH = object()
+_STOP = object()
+# How often an idle writer checks for a close() whose _STOP did not fit the queue
+STOP_POLL_S = 0.5
+
+
+class ChatLogWriter:
+    """
+    Non-blocking chat logger. When the queue is full, records are dropped
+    (after waiting up to ``put_timeout_ms``) and counted rather than stalling
+    the request. ``synchronous=True`` writes inline, for tests and scripts.
+    """
+
+    def __init__(self, flush_records=100, flush_interval_ms=200, max_queue=10000,
+                 put_timeout_ms=0, synchronous=False, write_batch=None):
+        self.flush_records = max(1, int(flush_records))
+        self.flush_interval = max(0.0, float(flush_interval_ms)) / 1000.0
+        self.put_timeout = max(0.0, float(put_timeout_ms)) / 1000.0
+        self.synchronous = synchronous
+        self._write_batch = write_batch or database.save_chats
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        # Orders log() against close(): no record is enqueued after _STOP
+        self._submit_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self._closed = False
+        self._worker = None
+        if not synchronous:
+            self._worker = threading.Thread(target=self._run, name="chat-log-writer", daemon=True)
+            self._worker.start()
+
+    # ----------------------------
+    # Public API
+    # ----------------------------
+    def log(self, session_id, user_message, bot_message):
+        """Queue one record; returns False if it was dropped."""
+        record = (session_id, user_message, bot_message)
+        if self.synchronous:
+            if self._closed:
+                self._count(dropped=1)
+                return False
+            self._write([record])
+            return True
+        with self._submit_lock:
+            if self._closed:
+                self._count(dropped=1)
+                return False
+            try:
+                if self.put_timeout:
+                    self._queue.put(record, timeout=self.put_timeout)
+                else:
+                    self._queue.put_nowait(record)
+            except queue.Full:
+                self._count(dropped=1)
+                return False
+            self._count(enqueued=1)
+        return True
+
+    def flush(self, timeout=10.0):
+        """Block until everything queued before this call has been written."""
+        if self.synchronous or self._worker is None or not self._worker.is_alive():
+            return True
+        done = threading.Event()
+        started = time.monotonic()
+        try:
+            self._queue.put((_FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(max(0.0, timeout - (time.monotonic() - started)))
+
+    def close(self, timeout=10.0):
+        """Flush what is queued and stop the writer thread."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._stopping.set()
+            if self._worker is not None:
+                try:
+                    self._queue.put((_STOP, None), timeout=timeout)
+                except queue.Full:
+                    pass  # the writer exits on its own once the queue is empty
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "flushes": self.flushes,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+            }
+
+    # ----------------------------
+    # Writer thread
+    # ----------------------------
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def _write(self, records):
+        ok = self._write_batch(records)
+        if ok:
+            self._count(written=len(records), flushes=1)
+        else:
+            self._count(failed=len(records))
+
+    def _run(self):
+        pending = []
+        deadline = None
+        while True:
+            timeout = STOP_POLL_S if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+                if self._stopping.is_set() and not pending:
+                    self._drain()
+                    return
+
+            control = item[0] if isinstance(item, tuple) and item and item[0] in (_FLUSH, _STOP) else None
+            if item is not None and control is None:
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            due = deadline is not None and time.monotonic() >= deadline
+            if pending and (control is not None or due or len(pending) >= self.flush_records):
+                self._write(pending)
+                pending = []
+                deadline = None
+
+            if control is _FLUSH:
+                item[1].set()
+            elif control is _STOP:
+                self._drain()
+                return
+
+    def _drain(self):
+        """Write whatever is still queued after _STOP; nothing is lost silently."""
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple) and item and item[0] is _FLUSH:
+                item[1].set()
+            elif not (isinstance(item, tuple) and item and item[0] is _STOP):
+                leftover.append(item)
+        if leftover:
+            self._write(leftover)
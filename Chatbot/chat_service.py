@@ -0,0 +1,293 @@
+from models import load_answers, load_model_and_embeddings, build_faq_index, store_embeddings
+from chatbot_core import chatbot_reply_details, DEFAULT_THRESHOLD
+from encode_batcher import BatchingEncoder
+from response_cache import ResponseCache, faq_version
+from intent_matcher import add_reload_listener, get_matcher
+from chat_log_writer import ChatLogWriter
+from instrumentation import add_collector, record_reply, timed
+from faq_reload import FaqWatcher, incremental_embeddings
+from intent_classifier import INTENT_ROUTING, has_intents, intent_classifier_for
+from lexical_index import LEXICAL_ENABLED, lexical_index_for
+from utils import clean_text, build_domain_vocabulary
+from datetime import datetime
+import atexit
+import threading
+import time
+import traceback
+import os
+
+# ============================
+# Shared serving pipeline
+# ============================
+# Loaded state and the reply cascade used by every HTTP front end
+# (Flask in streamlit_chatbot.py, ASGI in asgi_app.py).
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+file_path = os.environ.get("CHATBOT_FAQ_PATH", os.path.join(BASE_DIR, "data", "faq_with_intent.csv"))
+
+# Micro-batching of concurrent /get query encodes
+ENCODE_MAX_BATCH_SIZE = int(os.environ.get("CHATBOT_ENCODE_MAX_BATCH_SIZE", "32"))
+ENCODE_MAX_WAIT_MS = float(os.environ.get("CHATBOT_ENCODE_MAX_WAIT_MS", "5"))
+
+FAQ_THRESHOLD = DEFAULT_THRESHOLD
+RESPONSE_CACHE_SIZE = int(os.environ.get("CHATBOT_RESPONSE_CACHE_SIZE", "4096"))
+RESPONSE_CACHE_TTL = float(os.environ.get("CHATBOT_RESPONSE_CACHE_TTL", "0")) or None
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+# Cached replies may come from the old rules
+add_reload_listener(response_cache.clear)
+
+# Chat logging off the request path (group-committed by a background thread)
+chat_log = ChatLogWriter(
+    flush_records=int(os.environ.get("CHATBOT_LOG_FLUSH_RECORDS", "100")),
+    flush_interval_ms=float(os.environ.get("CHATBOT_LOG_FLUSH_MS", "200")),
+    max_queue=int(os.environ.get("CHATBOT_LOG_QUEUE_SIZE", "10000")),
+)
+
+df, model, question_embeddings, faq_index, encoder = None, None, None, None, None
+# (df, faq_index, question_embeddings) as one tuple: the request path reads it
+# once, so an FAQ reload swaps all three atomically
+faq_snapshot = (None, None, None)
+
+# ----------------------------
+# Staged startup
+# ----------------------------
+# Servers bind first and call start_background_load(); until the model is in,
+# greetings and rule-based intents are still answered. load_state goes
+# "idle" -> "loading" -> "ready" | "failed" and backs /healthz and /readyz.
+# CHATBOT_PRELOAD=0 skips the background load (import profiling, rule-only smoke tests)
+PRELOAD = os.environ.get("CHATBOT_PRELOAD", "1") != "0"
+STARTED_AT = time.time()
+load_state = "idle"
+load_error = None
+load_seconds = None
+_load_lock = threading.Lock()
+_load_thread = None
+# Held for the whole load, so concurrent callers (Streamlit sessions, the
+# background thread) load the shared resources once
+_init_lock = threading.Lock()
+
+
+def is_ready():
+    return model is not None and faq_index is not None
+
+
+def install(new_model, new_index, data_version, new_df=None, new_embeddings=None):
+    """Serve with already-built resources (used by the pre-fork workers)."""
+    global df, model, faq_index, question_embeddings, faq_snapshot, encoder, load_state
+    faq_snapshot = (new_df, new_index, new_embeddings)
+    df, model, faq_index, question_embeddings = new_df, new_model, new_index, new_embeddings
+    encoder = BatchingEncoder(model, ENCODE_MAX_BATCH_SIZE, ENCODE_MAX_WAIT_MS)
+    response_cache.bind(data_version)
+    load_state = "ready"
+
+
+def load(path=file_path):
+    """Load FAQ data, model and index; on failure only rules will answer."""
+    with _init_lock:
+        if is_ready():
+            return True
+        return _load(path)
+
+
+def _load(path):
+    global df, model, question_embeddings, faq_index, faq_snapshot, encoder, load_state, load_error, load_seconds
+    global faq_watcher
+    print("⚙️ Initializing Chatbot System...")
+    load_state, load_error = "loading", None
+    started = time.perf_counter()
+    try:
+        data = load_answers(path)
+        build_domain_vocabulary(data)
+        loaded_model, embeddings = load_model_and_embeddings(data)
+        index = build_faq_index(data, embeddings)
+        if LEXICAL_ENABLED or INTENT_ROUTING:
+            lexical_index_for(data)
+        if INTENT_ROUTING and has_intents(data):
+            intent_classifier_for(data)
+        install(loaded_model, index, faq_version(data, FAQ_THRESHOLD), data, embeddings)
+        load_seconds = time.perf_counter() - started
+        print(f"✅ Model and FAQ embeddings loaded successfully in {load_seconds:.1f}s!")
+        if faq_watcher is None:
+            faq_watcher = FaqWatcher(path, reload_faq).start()
+        return True
+    except Exception as e:
+        print("❌ Error while loading model/data:")
+        traceback.print_exc()
+        df, model, question_embeddings, faq_index, encoder = None, None, None, None, None
+        faq_snapshot = (None, None, None)
+        load_state, load_error = "failed", str(e)
+        return False
+
+
+def start_background_load(path=file_path):
+    """Run load() on a daemon thread and return at once (no-op when ready or loading)."""
+    global _load_thread
+    if not PRELOAD:
+        return None
+    with _load_lock:
+        if is_ready() or (_load_thread is not None and _load_thread.is_alive()):
+            return _load_thread
+        _load_thread = threading.Thread(target=load, args=(path,), name="model-loader", daemon=True)
+        _load_thread.start()
+        return _load_thread
+
+
+# ----------------------------
+# FAQ hot reload
+# ----------------------------
+_reload_lock = threading.Lock()
+faq_watcher = None
+last_reload = None
+
+
+def reload_faq(path=file_path):
+    """
+    Re-read the FAQ file, encode only new or reworded questions, then swap the
+    table, embeddings and index in one assignment. Returns the diff stats.
+    """
+    global df, faq_index, question_embeddings, faq_snapshot, last_reload
+    if not is_ready():
+        raise RuntimeError("model not loaded yet")
+    with _reload_lock:
+        started = time.perf_counter()
+        new_df = load_answers(path)
+        version = faq_version(new_df, FAQ_THRESHOLD)
+        if version == response_cache.version:
+            return {"rows": len(new_df), "changed": False}
+
+        old_df, _, old_embeddings = faq_snapshot
+        if old_df is not None and old_embeddings is not None:
+            embeddings, stats = incremental_embeddings(model, old_df, old_embeddings, new_df)
+        else:
+            # Pre-fork workers only hold the shared normalized matrix
+            embeddings = model.encode(list(new_df.questions))
+            stats = {"rows": len(new_df), "encoded": len(new_df)}
+        build_domain_vocabulary(new_df)
+        index = build_faq_index(new_df, embeddings)
+        if LEXICAL_ENABLED or INTENT_ROUTING:
+            lexical_index_for(new_df)
+        if INTENT_ROUTING and has_intents(new_df):
+            intent_classifier_for(new_df)
+
+        faq_snapshot = (new_df, index, embeddings)
+        df, faq_index, question_embeddings = new_df, index, embeddings
+        response_cache.bind(version)
+
+        stats.update(changed=True, seconds=round(time.perf_counter() - started, 3))
+        last_reload = stats
+        print(f"🔄 FAQ reloaded: {stats}")
+    store_embeddings(new_df, embeddings)
+    return stats
+
+
+def liveness():
+    return {"status": "alive", "uptime_s": round(time.time() - STARTED_AT, 3)}
+
+
+def readiness():
+    return {
+        "ready": is_ready(),
+        "state": load_state,
+        "error": load_error,
+        "load_seconds": round(load_seconds, 3) if load_seconds is not None else None,
+    }
+
+
+def shutdown():
+    """Flush pending chat logs and stop background threads."""
+    if faq_watcher is not None:
+        faq_watcher.stop()
+    chat_log.close()
+    if encoder is not None:
+        encoder.close()
+
+
+atexit.register(shutdown)
+
+
+def get_time_greeting():
+    hour = datetime.now().hour
+    if 5 <= hour < 12:
+        return "Good morning! 🌅 How can I help you today?"
+    elif 12 <= hour < 17:
+        return "Good afternoon! 🌤 How can I help you today?"
+    elif 17 <= hour < 22:
+        return "Good evening! 🌙 What can I assist you with?"
+    else:
+        return "Hello there! 🌙 Burning the midnight oil, huh?"
+
+
+def get_chatbot_reply(user_input):
+    return get_reply_details(user_input)["reply"]
+
+
+def get_reply_details(user_input):
+    """
+    Reply plus its metadata: {"reply", "layer", "intent", "score", "cached"}.
+    ``layer`` is the cascade stage that answered ("greeting", "business",
+    "rule_based", "lexical", "intent", "faq", "fallback", or "warmup"/"unavailable"
+    before the model is loaded).
+    """
+    started = time.perf_counter()
+    with timed("clean"):
+        user_input = clean_text(user_input)
+    if not is_ready():
+        details = rules_only_reply(user_input)
+    else:
+        computed = []
+
+        def compute():
+            computed.append(True)
+            return compute_reply_details(user_input)
+
+        details = dict(response_cache.get_or_compute(user_input, compute), cached=not computed)
+    record_reply(details["layer"], details["cached"], time.perf_counter() - started)
+    return details
+
+
+def rules_only_reply(user_input):
+    """Reply while the model is loading (or failed to load): rules only, never cached."""
+    rule = get_matcher().match(user_input, ("greeting", "rule_based", "business"))
+    if rule:
+        return {"reply": rule.response, "layer": rule.cascade, "intent": rule.name, "score": None, "cached": False}
+    if load_state == "failed":
+        reply, layer = "⚠️ Chatbot model failed to load. Please try again later.", "unavailable"
+    else:
+        reply, layer = "⏳ I'm still warming up. Ask me again in a few seconds!", "warmup"
+    return {"reply": reply, "layer": layer, "intent": None, "score": None, "cached": False}
+
+
+def compute_reply_details(user_input):
+    # Greetings first, then business rules; one scan covers both
+    with timed("greeting_business"):
+        rule = get_matcher().match(user_input, ("greeting", "business"))
+    if rule:
+        return {"reply": rule.response, "layer": rule.cascade, "intent": rule.name, "score": None}
+    snapshot_df, snapshot_index, _ = faq_snapshot
+    return chatbot_reply_details(user_input, encoder, snapshot_df, snapshot_index, FAQ_THRESHOLD)
+
+
+def log_chat(session_id, user_msg, bot_reply):
+    chat_log.log(session_id or "web_anonymous", user_msg, bot_reply)
+
+
+def _service_metrics():
+    # Existing component stats, exported on /metrics at scrape time
+    cache, log = response_cache.stats(), chat_log.stats()
+    values = {
+        "chatbot_model_ready": ("gauge", "1 once the model and FAQ index are loaded", int(is_ready())),
+        "chatbot_response_cache_hits_total": ("counter", "Response cache hits", cache["hits"]),
+        "chatbot_response_cache_misses_total": ("counter", "Response cache misses", cache["misses"]),
+        "chatbot_response_cache_size": ("gauge", "Entries in the response cache", cache["size"]),
+        "chatbot_chat_log_written_total": ("counter", "Chat records written to SQLite", log["written"]),
+        "chatbot_chat_log_dropped_total": ("counter", "Chat records dropped (queue full)", log["dropped"]),
+        "chatbot_chat_log_queue_depth": ("gauge", "Chat records waiting to be written", log["queue_depth"]),
+    }
+    if encoder is not None:
+        stats = encoder.stats()
+        values["chatbot_encode_batches_total"] = ("counter", "Micro-batches sent to the encoder", stats["batches"])
+        values["chatbot_encode_items_total"] = ("counter", "Queries encoded through the batcher", stats["items"])
+    return values
+
+
+add_collector(_service_metrics)
@@ -1,74 +1,195 @@
+import logging
+
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from utils import clean_text, rule_based_response, correct_spelling, business_response
 
-def get_faq_response(user_query, model, df, question_embeddings, threshold=0.3):
+from answer_store import as_answer_store
+from faq_index import as_faq_index
+from instrumentation import get_logger, log_event, timed
+from intent_classifier import (
+    INTENT_ACCEPT, INTENT_ROUTING, INTENT_ROW_ACCEPT, has_intents, intent_classifier_for,
+)
+from intent_matcher import get_matcher
+from lexical_index import (
+    FUSION_STRATEGY, LEXICAL_ACCEPT, LEXICAL_CANDIDATES, LEXICAL_ENABLED, lexical_index_for,
+    reciprocal_rank_fusion,
+)
+from utils import clean_text, correct_spelling
+
+log = get_logger("core")
+
+# Minimum cosine similarity for an FAQ answer to be used
+DEFAULT_THRESHOLD = 0.3
+
+FALLBACK_REPLY = "Hmm 🤔 I'm not sure about that yet. Could you rephrase or ask something else?"
+
+
+def get_faq_match(user_query, model, df, question_embeddings, threshold=DEFAULT_THRESHOLD):
     """
-    Finds the most semantically similar FAQ answer.
+    Best FAQ row for the query as a dict (answer, score, row, question,
+    intent, source), or None when the index has nothing to return. ``df`` is
+    the AnswerStore the index was built from (a DataFrame is converted per
+    call). ``source`` is "lexical" when BM25 answered without the encoder;
+    ``score`` is then the lexical confidence instead of a cosine similarity.
+    "intent" means the classifier's intent plus the best BM25 row within it
+    answered without the encoder (``score`` is again lexical confidence);
+    "partition" means only that intent's rows were scored by cosine. If none
+    of them reaches ``threshold`` the whole index is searched instead.
     """
     user_query = clean_text(user_query)
-    user_embedding = model.encode([user_query])
-    similarities = cosine_similarity(user_embedding, question_embeddings)
-
-    best_match_idx = np.argmax(similarities)
-    best_score = similarities[0][best_match_idx]
-
-    # Check available columns in dataframe
-    print(f"Debug - Available columns: {df.columns.tolist()}")
-    print(f"Debug - Best similarity score: {best_score}, Threshold: {threshold}")
-    
-    # Use correct column names (lowercase)
-    if 'question' in df.columns:
-        print(f"Debug - Matched question: {df.iloc[best_match_idx]['question']}")
-    elif 'Question' in df.columns:
-        print(f"Debug - Matched question: {df.iloc[best_match_idx]['Question']}")
-    else:
-        print("Debug - No 'question' column found")
-
-    if best_score < threshold:
+    index = as_faq_index(question_embeddings, df)
+    store = as_answer_store(df)
+
+    lexical_rows, confidence = _lexical_candidates(user_query, store)
+    if _lexical_accepted(confidence):
+        return _faq_row(index, store, int(lexical_rows[0]), confidence, "lexical")
+
+    intent_rows = None
+    if INTENT_ROUTING and FUSION_STRATEGY == "dense" and has_intents(store):
+        with timed("intent"):
+            intent_rows = intent_classifier_for(store).route(user_query, INTENT_ACCEPT)
+        if intent_rows is not None:
+            with timed("lexical"):
+                row, confidence = lexical_index_for(store).best_in(user_query, intent_rows)
+            if row is not None and confidence >= INTENT_ROW_ACCEPT:
+                return _faq_row(index, store, row, confidence, "intent")
+
+    with timed("encode"):
+        user_embedding = model.encode([user_query])
+    with timed("search"):
+        if intent_rows is not None and len(intent_rows):
+            scores = index.score_rows(user_embedding, intent_rows)
+            best = int(np.argmax(scores))
+            if scores[best] >= threshold:
+                return _faq_row(index, store, int(intent_rows[best]), float(scores[best]), "partition")
+        if FUSION_STRATEGY == "rerank" and lexical_rows is not None and len(lexical_rows):
+            # Cosine over the BM25 candidates only
+            scores = index.score_rows(user_embedding, lexical_rows)
+            best = int(np.argmax(scores))
+            return _faq_row(index, store, int(lexical_rows[best]), float(scores[best]), "rerank")
+        if FUSION_STRATEGY == "rrf" and lexical_rows is not None and len(lexical_rows):
+            _, dense_rows, _ = index.search(user_embedding, k=LEXICAL_CANDIDATES)
+            row = reciprocal_rank_fusion(dense_rows, lexical_rows)[0]
+            score = float(index.score_rows(user_embedding, np.array([row]))[0])
+            return _faq_row(index, store, row, score, "rrf")
+        scores, indices, _ = index.search(user_embedding, k=1)
+    if len(indices) == 0:
+        return None
+    return _faq_row(index, store, int(indices[0]), float(scores[0]), "dense")
+
+
+def get_faq_matches(user_queries, model, df, question_embeddings, threshold=DEFAULT_THRESHOLD):
+    """
+    get_faq_match for many queries (offline replay): the same BM25 shortcut
+    per query, then one batched encode and search for the rest. Fusion and
+    intent routing are per query, so with those enabled each query goes
+    through get_faq_match.
+    """
+    queries = [clean_text(q) for q in user_queries]
+    index = as_faq_index(question_embeddings, df)
+    store = as_answer_store(df)
+    if FUSION_STRATEGY != "dense" or INTENT_ROUTING or not hasattr(index, "search_batch"):
+        return [get_faq_match(q, model, store, index, threshold) for q in queries]
+
+    matches = [None] * len(queries)
+    dense = []
+    for i, query in enumerate(queries):
+        lexical_rows, confidence = _lexical_candidates(query, store)
+        if _lexical_accepted(confidence):
+            matches[i] = _faq_row(index, store, int(lexical_rows[0]), confidence, "lexical")
+        else:
+            dense.append(i)
+    if dense and len(index):
+        with timed("encode"):
+            embeddings = model.encode([queries[i] for i in dense])
+        with timed("search"):
+            scores, rows = index.search_batch(embeddings, k=1)
+        for i, score, row in zip(dense, scores[:, 0], rows[:, 0]):
+            matches[i] = _faq_row(index, store, int(row), float(score), "dense")
+    return matches
+
+
+def _lexical_candidates(user_query, store):
+    """(BM25 candidate rows, confidence of the best one); (None, 0.0) when disabled."""
+    if store is None or not LEXICAL_ENABLED:
+        return None, 0.0
+    lexical = lexical_index_for(store)
+    with timed("lexical"):
+        _, rows = lexical.search(user_query, k=LEXICAL_CANDIDATES)
+        confidence = lexical.confidence(user_query, int(rows[0])) if len(rows) else 0.0
+    return rows, confidence
+
+
+def _lexical_accepted(confidence):
+    return LEXICAL_ACCEPT > 0 and confidence >= LEXICAL_ACCEPT
+
+
+def _faq_row(index, store, row, score, source):
+    return {
+        "answer": index.answers[row] if index.answers is not None else None,
+        "score": score,
+        "row": row,
+        "question": index.questions[row] if index.questions is not None else None,
+        "intent": store.intent_at(row) if store is not None else None,
+        "source": source,
+    }
+
+
+def get_faq_response(user_query, model, df, question_embeddings, threshold=DEFAULT_THRESHOLD):
+    """
+    Finds the most semantically similar FAQ answer.
+    ``question_embeddings`` may be a FaqIndex or a raw embedding matrix.
+    """
+    match = get_faq_match(user_query, model, df, question_embeddings, threshold)
+    if match is None:
         return None
-    
-    # Use correct column name for answer
-    if 'answer' in df.columns:
-        return df.iloc[best_match_idx]['answer']
-    elif 'Answer' in df.columns:
-        return df.iloc[best_match_idx]['Answer']
-    else:
+
+    log_event(log, logging.DEBUG, "faq_match", score=match["score"], threshold=threshold, question=match["question"])
+    if match["score"] < threshold:
         return None
+    return match["answer"]
 
-def chatbot_response(user_input, model, df, question_embeddings, threshold=0.3):
+def chatbot_response(user_input, model, df, question_embeddings, threshold=DEFAULT_THRESHOLD):
     """
     Combines spell-corrected, rule-based + ML semantic search logic.
     """
-    # SPELLING CORRECTION CALL KARO - yeh line change karo
-    corrected_input = correct_spelling(user_input)  # Ye use karo
-    # corrected_input = user_input  # Ye comment karo ya hatao
-    
-    print(f"Debug - Original input: {user_input}")
-    print(f"Debug - Corrected input: {corrected_input}")
-
-    # Pehle rule-based response check karo
-    rule_reply = rule_based_response(corrected_input)
-    if rule_reply:
-        print("Debug - Rule-based response used")
-        return rule_reply
-
-    # Fir business response check karo
-    biz_reply = business_response(corrected_input)
-    if biz_reply:
-        print("Debug - Business response used")
-        return biz_reply
+    return chatbot_reply_details(user_input, model, df, question_embeddings, threshold)["reply"]
+
+def chatbot_reply_details(user_input, model, df, question_embeddings, threshold=DEFAULT_THRESHOLD):
+    """
+    Same cascade as chatbot_response, but returns the reply with where it came
+    from: {"reply", "layer", "intent", "score"}. ``layer`` is "rule_based",
+    "business", "lexical" (BM25 shortcut, no encode), "intent" (intent
+    shortcut, no encode), "faq" or "fallback".
+    """
+    with timed("spell"):
+        corrected_input = correct_spelling(user_input)
+    log_event(log, logging.DEBUG, "spell", original=user_input, corrected=corrected_input)
+
+    # Rule-based pehle, fir business - dono ek hi scan mein
+    with timed("rule"):
+        rule = get_matcher().match(corrected_input, ("rule_based", "business"))
+    if rule:
+        log_event(log, logging.DEBUG, "rule_match", cascade=rule.cascade, rule=rule.name)
+        return {"reply": rule.response, "layer": rule.cascade, "intent": rule.name, "score": None}
 
     # FAQ semantic search response
-    faq_reply = get_faq_response(corrected_input, model, df, question_embeddings, threshold)
-    if faq_reply:
-        print("Debug - FAQ response used")
-        return faq_reply
+    match = get_faq_match(corrected_input, model, df, question_embeddings, threshold)
+    if match is not None:
+        log_event(log, logging.DEBUG, "faq_match", score=match["score"], threshold=threshold,
+                  question=match["question"], source=match["source"])
+        if match["score"] >= threshold and match["answer"]:
+            layer = match["source"] if match["source"] in ("lexical", "intent") else "faq"
+            return {"reply": match["answer"], "layer": layer, "intent": match["intent"], "score": match["score"]}
 
     # Default fallback
-    return "Hmm 🤔 I'm not sure about that yet. Could you rephrase or ask something else?"
+    return {
+        "reply": FALLBACK_REPLY,
+        "layer": "fallback",
+        "intent": None,
+        "score": match["score"] if match is not None else None,
+    }
 
-def process_user_message(msg, model, df, question_embeddings, threshold=0.3):
+def process_user_message(msg, model, df, question_embeddings, threshold=DEFAULT_THRESHOLD):
     """
     Corrects spelling and returns chatbot reply.
     """
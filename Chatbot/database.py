@@ -1,36 +1,211 @@
 import sqlite3
 import json
+import threading
+from collections import Counter
 from datetime import datetime
 import os
 
+DB_PATH = os.environ.get("CHATBOT_DB_PATH", "chat_history.db")
+BUSY_TIMEOUT_MS = 5000
+CACHED_STATEMENTS = 256
+
+# ----------------------------
+# Connection pool
+# ----------------------------
+# One long-lived connection per thread: WAL lets readers run alongside the
+# writer, synchronous=NORMAL drops the per-commit fsync of the WAL, and the
+# busy timeout makes concurrent writers wait instead of failing. Reusing the
+# connection also reuses sqlite3's per-connection prepared-statement cache.
+_local = threading.local()
+_pool_lock = threading.Lock()
+_connections = []
+# Bumped by close_all_connections; other threads' cached handles from an
+# older generation are closed and must be reopened
+_pool_generation = 0
+# The schema is migrated lazily by the first connection, not at import
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def _connect():
+    conn = sqlite3.connect(
+        DB_PATH,
+        check_same_thread=False,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=CACHED_STATEMENTS,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def get_connection():
+    """Return this thread's pooled connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "generation", None) != _pool_generation:
+        conn = _connect()
+        with _pool_lock:
+            _connections.append(conn)
+            _local.conn, _local.generation = conn, _pool_generation
+        _ensure_schema(conn)
+    return conn
+
+
+def _ensure_schema(conn):
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            migrate(conn)
+            _schema_ready = True
+
+
+def close_all_connections():
+    """Close every pooled connection (shutdown / tests)."""
+    global _schema_ready, _pool_generation
+    with _pool_lock:
+        _pool_generation += 1
+        for conn in _connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        _connections.clear()
+    _local.__dict__.clear()
+    _schema_ready = False
+
+
+# Statements kept as constants so every call hits the statement cache
+UPSERT_SESSION_SQL = '''
+    INSERT INTO sessions (session_id, last_activity, message_count)
+    VALUES (?, CURRENT_TIMESTAMP, ?)
+    ON CONFLICT(session_id) DO UPDATE SET
+        last_activity = CURRENT_TIMESTAMP,
+        message_count = message_count + excluded.message_count
+'''
+INSERT_CHAT_SQL = '''
+    INSERT INTO chats (session_id, user_message, bot_message)
+    VALUES (?, ?, ?)
+'''
+SELECT_HISTORY_SQL = '''
+    SELECT id, user_message, bot_message, timestamp
+    FROM chats
+    WHERE session_id = ?
+    ORDER BY timestamp ASC, id ASC
+    LIMIT ?
+'''
+SELECT_HISTORY_AFTER_SQL = '''
+    SELECT id, user_message, bot_message, timestamp
+    FROM chats
+    WHERE session_id = ? AND (timestamp, id) > (?, ?)
+    ORDER BY timestamp ASC, id ASC
+    LIMIT ?
+'''
+SELECT_HISTORY_LATEST_SQL = '''
+    SELECT id, user_message, bot_message, timestamp
+    FROM chats
+    WHERE session_id = ?
+    ORDER BY timestamp DESC, id DESC
+    LIMIT ?
+'''
+SELECT_HISTORY_BEFORE_SQL = '''
+    SELECT id, user_message, bot_message, timestamp
+    FROM chats
+    WHERE session_id = ? AND (timestamp, id) < (?, ?)
+    ORDER BY timestamp DESC, id DESC
+    LIMIT ?
+'''
+SELECT_SESSIONS_SQL = '''
+    SELECT session_id, created_at, last_activity, message_count
+    FROM sessions
+    ORDER BY last_activity DESC, session_id DESC
+    LIMIT ?
+'''
+SELECT_SESSIONS_AFTER_SQL = '''
+    SELECT session_id, created_at, last_activity, message_count
+    FROM sessions
+    WHERE (last_activity, session_id) < (?, ?)
+    ORDER BY last_activity DESC, session_id DESC
+    LIMIT ?
+'''
+SELECT_MESSAGES_AFTER_SQL = '''
+    SELECT id, session_id, user_message
+    FROM chats
+    WHERE id > ?
+    ORDER BY id ASC
+    LIMIT ?
+'''
+
+# ----------------------------
+# Schema migrations
+# ----------------------------
+# PRAGMA user_version records the last applied step, so each step runs once
+# per database file.
+
+def _migration_1(c):
+    # Create chats table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS chats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            user_message TEXT,
+            bot_message TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Create sessions table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_activity DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _migration_2(c):
+    # Denormalized per-session counter, maintained by the write path
+    columns = [row[1] for row in c.execute("PRAGMA table_info(sessions)")]
+    if "message_count" not in columns:
+        c.execute("ALTER TABLE sessions ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0")
+    c.execute('''
+        UPDATE sessions SET
+            message_count = (SELECT COUNT(*) FROM chats WHERE chats.session_id = sessions.session_id),
+            last_activity = COALESCE(
+                (SELECT MAX(timestamp) FROM chats WHERE chats.session_id = sessions.session_id),
+                last_activity
+            )
+    ''')
+    # History reads: equality on session_id, range/order on (timestamp, id)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_chats_session_ts ON chats (session_id, timestamp, id)")
+    # Covering index for the admin session listing
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_sessions_activity
+        ON sessions (last_activity, session_id, created_at, message_count)
+    ''')
+
+
+MIGRATIONS = [_migration_1, _migration_2]
+
+
+def migrate(conn):
+    """Apply pending migrations; returns the resulting schema version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        with conn:
+            step(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {target}")
+        print(f"🛠️ Database migrated to schema version {target}")
+    return max(version, len(MIGRATIONS))
+
 def init_db():
-    """Initialize database and create tables"""
+    """Initialize database and apply schema migrations"""
     try:
-        conn = sqlite3.connect('chat_history.db', check_same_thread=False)
-        c = conn.cursor()
-        
-        # Create chats table
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS chats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT NOT NULL,
-                user_message TEXT,
-                bot_message TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create sessions table
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                session_id TEXT PRIMARY KEY,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                last_activity DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        # Opening the first connection applies any pending migrations
+        get_connection()
         print("✅ Database initialized successfully!")
     except Exception as e:
         print(f"❌ Database initialization error: {e}")
@@ -38,98 +213,146 @@ def init_db():
 def save_chat(session_id, user_message, bot_message):
     """Save chat message to database"""
     try:
-        conn = sqlite3.connect('chat_history.db', check_same_thread=False)
-        c = conn.cursor()
+        conn = get_connection()
         
-        print(f"💾 Saving to database - Session: {session_id}, User: {user_message}, Bot: {bot_message}")
+        print(f"💾 Saving to database - Session: {session_id}")
         
-        # Insert or update session
-        c.execute('''
-            INSERT OR REPLACE INTO sessions (session_id, last_activity) 
-            VALUES (?, CURRENT_TIMESTAMP)
-        ''', (session_id,))
+        # Session upsert + message insert in one transaction
+        with conn:
+            conn.execute(UPSERT_SESSION_SQL, (session_id, 1))
+            conn.execute(INSERT_CHAT_SQL, (session_id, user_message, bot_message))
         
-        # Insert chat message
-        c.execute('''
-            INSERT INTO chats (session_id, user_message, bot_message) 
-            VALUES (?, ?, ?)
-        ''', (session_id, user_message, bot_message))
-        
-        conn.commit()
-        
-        # Verify the insert worked
-        c.execute('SELECT COUNT(*) FROM chats WHERE session_id = ?', (session_id,))
-        count = c.fetchone()[0]
-        print(f"✅ Saved successfully! Total messages in session: {count}")
-        
-        conn.close()
         return True
     except Exception as e:
         print(f"❌ Database save error: {e}")
         return False
 
-def get_chat_history(session_id, limit=50):
-    """Get chat history for a session"""
+def save_chats(records):
+    """
+    Group-commit many (session_id, user_message, bot_message) records in one
+    transaction. Used by the background chat log writer.
+    """
+    if not records:
+        return True
     try:
-        conn = sqlite3.connect('chat_history.db', check_same_thread=False)
-        c = conn.cursor()
-        
-        c.execute('''
-            SELECT user_message, bot_message, timestamp 
-            FROM chats 
-            WHERE session_id = ? 
-            ORDER BY timestamp ASC 
-            LIMIT ?
-        ''', (session_id, limit))
-        
-        messages = []
-        for user_msg, bot_msg, timestamp in c.fetchall():
-            if user_msg:
-                messages.append({"sender": "user", "text": user_msg, "timestamp": timestamp})
-            if bot_msg:
-                messages.append({"sender": "bot", "text": bot_msg, "timestamp": timestamp})
-        
-        conn.close()
-        print(f"📖 Loaded {len(messages)} messages for session: {session_id}")
-        return messages
+        conn = get_connection()
+        per_session = Counter(r[0] for r in records)
+        with conn:
+            conn.executemany(UPSERT_SESSION_SQL, per_session.items())
+            conn.executemany(INSERT_CHAT_SQL, records)
+        return True
+    except Exception as e:
+        print(f"❌ Database batch save error ({len(records)} records): {e}")
+        return False
+
+def _rows_to_messages(rows):
+    messages = []
+    for _id, user_msg, bot_msg, timestamp in rows:
+        if user_msg:
+            messages.append({"sender": "user", "text": user_msg, "timestamp": timestamp})
+        if bot_msg:
+            messages.append({"sender": "bot", "text": bot_msg, "timestamp": timestamp})
+    return messages
+
+def get_chat_history(session_id, limit=50, after=None):
+    """
+    Get chat history for a session, oldest first.
+    ``after`` is a (timestamp, id) cursor from a previous page.
+    """
+    page, _ = get_chat_history_forward(session_id, limit, after)
+    print(f"📖 Loaded {len(page)} messages for session: {session_id}")
+    return page
+
+def get_chat_history_forward(session_id, limit=50, after=None):
+    """Oldest-first page of ``limit`` exchanges; returns (messages, next_cursor)."""
+    try:
+        conn = get_connection()
+        if after is None:
+            rows = conn.execute(SELECT_HISTORY_SQL, (session_id, limit)).fetchall()
+        else:
+            rows = conn.execute(SELECT_HISTORY_AFTER_SQL, (session_id, after[0], after[1], limit)).fetchall()
+        next_cursor = (rows[-1][3], rows[-1][0]) if len(rows) == limit else None
+        return _rows_to_messages(rows), next_cursor
     except Exception as e:
         print(f"❌ Database load error: {e}")
-        return []
+        return [], None
 
-def get_all_sessions():
-    """Get all chat sessions (for admin view)"""
+def get_chat_history_page(session_id, limit=50, before=None):
+    """
+    Newest ``limit`` exchanges older than the ``before`` cursor (or the latest
+    ones), returned oldest first. Returns (messages, cursor for the next older
+    page, or None when there is nothing older).
+    """
     try:
-        conn = sqlite3.connect('chat_history.db', check_same_thread=False)
-        c = conn.cursor()
-        
-        c.execute('''
-            SELECT s.session_id, s.created_at, s.last_activity, COUNT(c.id) as message_count
-            FROM sessions s
-            LEFT JOIN chats c ON s.session_id = c.session_id
-            GROUP BY s.session_id
-            ORDER BY s.last_activity DESC
-        ''')
-        
-        sessions = []
-        for session_id, created_at, last_activity, message_count in c.fetchall():
-            sessions.append({
-                "session_id": session_id,
-                "created_at": created_at,
-                "last_activity": last_activity,
-                "message_count": message_count
-            })
-        
-        conn.close()
-        print(f"📊 Found {len(sessions)} total sessions")
-        return sessions
+        conn = get_connection()
+        if before is None:
+            rows = conn.execute(SELECT_HISTORY_LATEST_SQL, (session_id, limit)).fetchall()
+        else:
+            rows = conn.execute(SELECT_HISTORY_BEFORE_SQL, (session_id, before[0], before[1], limit)).fetchall()
+        next_cursor = (rows[-1][3], rows[-1][0]) if len(rows) == limit else None
+        rows.reverse()
+        return _rows_to_messages(rows), next_cursor
+    except Exception as e:
+        print(f"❌ Database load error: {e}")
+        return [], None
+
+def get_sessions_page(limit=50, after=None):
+    """
+    Sessions by most recent activity; ``after`` is the (last_activity,
+    session_id) cursor returned with the previous page.
+    """
+    try:
+        conn = get_connection()
+        if after is None:
+            rows = conn.execute(SELECT_SESSIONS_SQL, (limit,)).fetchall()
+        else:
+            rows = conn.execute(SELECT_SESSIONS_AFTER_SQL, (after[0], after[1], limit)).fetchall()
+        sessions = [{
+            "session_id": session_id,
+            "created_at": created_at,
+            "last_activity": last_activity,
+            "message_count": message_count
+        } for session_id, created_at, last_activity, message_count in rows]
+        next_cursor = (rows[-1][2], rows[-1][0]) if len(rows) == limit else None
+        return sessions, next_cursor
     except Exception as e:
         print(f"❌ Database sessions error: {e}")
-        return []
+        return [], None
+
+def iter_user_messages(chunk_size=5000, after_id=0, db_path=None):
+    """
+    Yields lists of (id, session_id, user_message) in id order, ``chunk_size``
+    rows at a time, starting after ``after_id`` (for offline re-scoring).
+    ``db_path`` opens a separate read-only connection instead of the pool.
+    """
+    if db_path is None:
+        conn = get_connection()
+    else:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_MS / 1000)
+    try:
+        while True:
+            rows = conn.execute(SELECT_MESSAGES_AFTER_SQL, (after_id, chunk_size)).fetchall()
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1][0]
+    finally:
+        if db_path is not None:
+            conn.close()
+
+def get_all_sessions(page_size=1000):
+    """Get all chat sessions (for admin view)"""
+    sessions, cursor = get_sessions_page(page_size)
+    while cursor is not None:
+        page, cursor = get_sessions_page(page_size, cursor)
+        sessions.extend(page)
+    print(f"📊 Found {len(sessions)} total sessions")
+    return sessions
 
 def debug_database():
     """Debug function to check database status"""
     try:
-        conn = sqlite3.connect('chat_history.db', check_same_thread=False)
+        conn = get_connection()
         c = conn.cursor()
         
         # Check tables
@@ -147,13 +370,7 @@ def debug_database():
         session_count = c.fetchone()[0]
         print(f"👥 Total sessions: {session_count}")
         
-        conn.close()
         return True
     except Exception as e:
         print(f"❌ Database debug error: {e}")
         return False
-
-# Initialize database when this module is imported
-init_db()
-# Run debug to check status
-debug_database()
\ No newline at end of file
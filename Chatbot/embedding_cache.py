@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+# ============================
+# On-disk FAQ embedding cache
+# ============================
+# Question embeddings are stored as a plain .npy matrix next to a small JSON
+# manifest. The file name is derived from a cache key covering everything that
+# changes the vectors (question content, model name, normalization), so a
+# worker either finds a matching file and memory-maps it, or encodes once and
+# writes a new one.
+
+CACHE_VERSION = 1
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("CHATBOT_EMBEDDING_CACHE_DIR", os.path.join(BASE_DIR, "cache"))
+FILE_PREFIX = "faq_embeddings"
+
+
+def dataset_hash(questions):
+    """SHA-256 over the question texts, in row order."""
+    h = hashlib.sha256()
+    for q in questions:
+        h.update(str(q).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def cache_key(questions, model_name, normalize):
+    """Key covering every input that affects the encoded matrix."""
+    payload = json.dumps({
+        "version": CACHE_VERSION,
+        "dataset": dataset_hash(questions),
+        "model": model_name,
+        "normalize": bool(normalize),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _paths(key, cache_dir):
+    stem = os.path.join(cache_dir, f"{FILE_PREFIX}-{key[:16]}")
+    return stem + ".npy", stem + ".json"
+
+
+def _read_umask():
+    # os.umask() can only be read by setting it, which races with threads
+    # creating files, so prefer the kernel's copy (Linux 4.7+)
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _import_umask():
+    umask = _read_umask()
+    if umask is None:
+        # Once, at import, before any cache writer threads exist
+        umask = os.umask(0)
+        os.umask(umask)
+    return umask
+
+
+_UMASK_AT_IMPORT = _import_umask()
+
+
+def _file_mode():
+    # What open() would create: 0666 minus the process umask
+    umask = _read_umask()
+    return 0o666 & ~(_UMASK_AT_IMPORT if umask is None else umask)
+
+
+def atomic_write(path, write_fn, suffix):
+    """
+    Write via a temp file + rename. mkstemp creates 0600 files; they are
+    widened to the umask default so workers running as another user can read
+    a cache built by a deploy/build user.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write_fn(f)
+        os.chmod(tmp_path, _file_mode())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_cached_embeddings(key, cache_dir=CACHE_DIR, mmap=True):
+    """Return the cached matrix for ``key`` or None if missing/stale."""
+    npy_path, manifest_path = _paths(key, cache_dir)
+    if not (os.path.exists(npy_path) and os.path.exists(manifest_path)):
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("key") != key or manifest.get("version") != CACHE_VERSION:
+            return None
+        embeddings = np.load(npy_path, mmap_mode="r" if mmap else None)
+        if list(embeddings.shape) != manifest.get("shape"):
+            return None
+        return embeddings
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable embedding cache {npy_path}: {e}")
+        return None
+
+
+def save_embeddings(key, embeddings, manifest_extra=None, cache_dir=CACHE_DIR):
+    """Write matrix + manifest atomically and drop this encoder's older cache files."""
+    os.makedirs(cache_dir, exist_ok=True)
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    npy_path, manifest_path = _paths(key, cache_dir)
+
+    manifest = {
+        "version": CACHE_VERSION,
+        "key": key,
+        "shape": list(embeddings.shape),
+        "dtype": str(embeddings.dtype),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    manifest.update(manifest_extra or {})
+
+    # Matrix first, manifest last: a manifest on disk implies a complete .npy.
+    atomic_write(npy_path, lambda f: np.save(f, embeddings), ".npy.tmp")
+    atomic_write(manifest_path, lambda f: f.write(json.dumps(manifest, indent=2).encode("utf-8")), ".json.tmp")
+
+    prune_superseded(manifest, cache_dir)
+    return npy_path
+
+
+def prune_superseded(manifest, cache_dir=CACHE_DIR):
+    """
+    Drop cache entries from the same encoder (model name + normalization)
+    other than ``manifest``'s own, i.e. embeddings of older FAQ versions.
+    Other encoders' and backends' entries are left alone.
+    """
+    model_name = manifest.get("model_name")
+    if model_name is None:
+        return
+    own = os.path.basename(_paths(manifest["key"], cache_dir)[1])
+    for name in os.listdir(cache_dir):
+        if not (name.startswith(FILE_PREFIX + "-") and name.endswith(".json")) or name == own:
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                other = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if other.get("model_name") == model_name and other.get("normalize") == manifest.get("normalize"):
+            for stale in (path, path[:-len(".json")] + ".npy"):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+
+def load_or_build_embeddings(model, questions, model_name, normalize=False, cache_dir=CACHE_DIR):
+    """
+    Returns the question embedding matrix, encoding only on a cache miss.
+    The returned array is a read-only memory map when served from cache.
+    """
+    questions = list(questions)
+    key = cache_key(questions, model_name, normalize)
+
+    embeddings = load_cached_embeddings(key, cache_dir)
+    if embeddings is not None:
+        print(f"✅ Loaded {embeddings.shape[0]} FAQ embeddings from cache ({key[:16]})")
+        return embeddings
+
+    print(f"⚙️ Embedding cache miss ({key[:16]}), encoding {len(questions)} questions...")
+    embeddings = model.encode(
+        questions,
+        show_progress_bar=True,
+        normalize_embeddings=normalize,
+    )
+    try:
+        save_embeddings(key, embeddings, {
+            "model_name": model_name,
+            "normalize": bool(normalize),
+            "dataset_hash": dataset_hash(questions),
+            "rows": len(questions),
+        }, cache_dir)
+        return load_cached_embeddings(key, cache_dir)
+    except Exception as e:
+        # A read-only filesystem must not stop the bot from serving.
+        print(f"⚠️ Could not write embedding cache: {e}")
+        return np.asarray(embeddings, dtype=np.float32)
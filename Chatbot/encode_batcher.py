@@ -0,0 +1,165 @@
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# ============================
+# Micro-batching query encoder
+# ============================
+# Concurrent requests each want one sentence encoded. Instead of N separate
+# transformer calls, a single worker thread collects queries for up to
+# ``max_wait_ms`` (or until ``max_batch_size`` are waiting), encodes them as
+# one batch, and resolves each caller's Future with its own row.
+
+_STOP = object()
+
+
+class BatchingEncoder:
+    """
+    Wraps any object with ``encode(list_of_texts) -> 2D array`` and batches
+    concurrent single-query calls. ``encode`` keeps the SentenceTransformer
+    call shape, so it can be passed wherever the model is used today.
+    """
+
+    def __init__(self, encoder, max_batch_size=32, max_wait_ms=5.0, delay_samples=10000):
+        self.encoder = encoder
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        # Orders submit() against close(): nothing is enqueued after _STOP
+        self._submit_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._queue_delays = deque(maxlen=delay_samples)
+        self._items = 0
+        self._batches = 0
+        self._errors = 0
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="encode-batcher", daemon=True)
+        self._worker.start()
+
+    # ----------------------------
+    # Public API
+    # ----------------------------
+    def submit(self, text):
+        """Queue one text; the Future resolves to its 1D embedding."""
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("BatchingEncoder is closed")
+            self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def encode(self, sentences, timeout=None, **kwargs):
+        """
+        Blocking encode with the SentenceTransformer call shape.
+        Calls with extra encode options bypass batching so their semantics
+        are preserved.
+        """
+        if kwargs:
+            return self.encoder.encode(sentences, **kwargs)
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        futures = [self.submit(t) for t in texts]
+        rows = [f.result(timeout=timeout) for f in futures]
+        if single:
+            return rows[0]
+        return np.vstack(rows) if rows else np.empty((0, 0), dtype=np.float32)
+
+    def stats(self):
+        """Batch-size distribution and queueing delay (ms) so far."""
+        with self._lock:
+            delays = np.array(self._queue_delays, dtype=np.float64) * 1000.0
+            sizes = dict(sorted(self._batch_sizes.items()))
+            items, batches, errors = self._items, self._batches, self._errors
+        result = {
+            "items": items,
+            "batches": batches,
+            "errors": errors,
+            "mean_batch_size": items / batches if batches else 0.0,
+            "batch_size_histogram": sizes,
+            "queue_depth": self._queue.qsize(),
+        }
+        if delays.size:
+            result.update({
+                "queue_delay_ms_p50": float(np.percentile(delays, 50)),
+                "queue_delay_ms_p99": float(np.percentile(delays, 99)),
+                "queue_delay_ms_max": float(delays.max()),
+            })
+        return result
+
+    def close(self, timeout=5.0):
+        """Stop accepting work, finish what is queued and join the worker."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    # ----------------------------
+    # Worker
+    # ----------------------------
+    def _collect(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return None, True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            if batch:
+                # One failing batch must never take the worker (and every waiter) down
+                try:
+                    self._encode_batch(batch)
+                except Exception as e:
+                    for _, future, _ in batch:
+                        if not future.done():
+                            future.set_exception(e)
+        # Nothing should be left behind _STOP; never leave a caller waiting
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item[1].set_exception(RuntimeError("BatchingEncoder is closed"))
+
+    def _encode_batch(self, batch):
+        started = time.perf_counter()
+        texts = [text for text, _, _ in batch]
+        try:
+            vectors = np.asarray(self.encoder.encode(texts))
+            if vectors.ndim != 2 or vectors.shape[0] != len(batch):
+                raise ValueError(f"Encoder returned shape {vectors.shape} for a batch of {len(batch)}")
+            for i, (_, future, _) in enumerate(batch):
+                future.set_result(vectors[i])
+        except Exception as e:
+            with self._lock:
+                self._errors += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        with self._lock:
+            self._items += len(batch)
+            self._batches += 1
+            self._batch_sizes[len(batch)] += 1
+            self._queue_delays.extend(started - enqueued for _, _, enqueued in batch)
@@ -0,0 +1,260 @@
+import hashlib
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+# ============================
+# Sentence encoder backends
+# ============================
+# Every backend has the SentenceTransformer ``encode`` call shape, so the
+# batcher, the embedding cache and the indexes take any of them:
+#
+#   "sentence-transformers" (alias "torch")  the PyTorch model (default)
+#   "onnx"     the same model exported to ONNX Runtime, int8 dynamically
+#              quantized by default (``python encoders.py export``; needs
+#              pip install onnxruntime)
+#   "hashing"  deterministic offline stand-in, no model download
+#
+# ``threads`` caps the backend's intra-op thread pool (0 = library default),
+# so N workers on one node can be given cores / N each instead of all
+# oversubscribing every core. Different backends produce different vectors,
+# so each gets its own name in the embedding cache key.
+#
+#     python encoders.py export [onnx dir] [--no-quantize]
+#
+# benchmarks/encoder_parity.py compares backends' retrieval results and speed.
+
+ONNX_FILE = "model.onnx"
+ONNX_INT8_FILE = "model_int8.onnx"
+
+
+class Encoder:
+    """Common interface; subclasses implement ``_encode`` on a list of texts."""
+
+    dim = None
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def set_threads(self, threads):
+        """Cap intra-op threads (0 = library default)."""
+
+    def _encode(self, texts, batch_size, show_progress_bar=False):
+        raise NotImplementedError
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=False,
+               normalize_embeddings=False, convert_to_numpy=True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else [str(t) for t in sentences]
+        out = self._encode(texts, batch_size, show_progress_bar) if texts else np.zeros((0, self.dim), dtype=np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            out = out / norms
+        return out[0] if single else out
+
+
+# ----------------------------
+# Deterministic stand-in
+# ----------------------------
+# Offline replacement for the real model: identical vectors for identical
+# text on every run. Texts sharing words/char-trigrams land close together,
+# which is enough for exercising batching, caching and search code paths.
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _bucket(token, dim):
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dim, 1.0 if (value >> 63) & 1 else -1.0
+
+
+class HashingEncoder(Encoder):
+    """Feature-hashing encoder over words and character trigrams."""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def _encode_one(self, text):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD_RE.findall(str(text).lower()):
+            idx, sign = _bucket("w:" + word, self.dim)
+            vec[idx] += 2.0 * sign
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                idx, sign = _bucket("c:" + padded[i:i + 3], self.dim)
+                vec[idx] += sign
+        return vec
+
+    def _encode(self, texts, batch_size, show_progress_bar=False):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            out[i] = self._encode_one(text)
+        return out
+
+
+# ----------------------------
+# PyTorch (sentence-transformers)
+# ----------------------------
+class TorchEncoder(Encoder):
+    """SentenceTransformer ``model_name`` on CPU; ``model`` is the wrapped instance."""
+
+    def __init__(self, model_name, threads=0):
+        from sentence_transformers import SentenceTransformer
+
+        self.set_threads(threads)
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def set_threads(self, threads):
+        if threads and threads > 0:
+            import torch
+            torch.set_num_threads(threads)
+
+    def _encode(self, texts, batch_size, show_progress_bar=False):
+        return np.asarray(self.model.encode(texts, batch_size=batch_size, show_progress_bar=show_progress_bar),
+                          dtype=np.float32)
+
+
+# ----------------------------
+# ONNX Runtime
+# ----------------------------
+def onnx_model_file(model_dir):
+    """The int8 export when present, otherwise the float32 one (or None)."""
+    for name in (ONNX_INT8_FILE, ONNX_FILE):
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class OnnxEncoder(Encoder):
+    """
+    Transformer exported by export_onnx(), run with ONNX Runtime. Mean pooling
+    over the attention mask plus L2 normalization reproduce the Pooling and
+    Normalize modules of all-MiniLM-L6-v2's sentence-transformers pipeline.
+    """
+
+    def __init__(self, model_dir, threads=0, max_length=256):
+        from transformers import AutoTokenizer
+
+        self.model_path = onnx_model_file(model_dir)
+        if self.model_path is None:
+            raise FileNotFoundError(f"No ONNX model in {model_dir}; run `python encoders.py export {model_dir}`")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_length = max_length
+        self.set_threads(threads)
+        self.dim = self._encode(["dimension probe"], 1).shape[1]
+
+    def set_threads(self, threads):
+        """(Re)creates the session: ORT fixes its thread pools at creation."""
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads and threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode(self, texts, batch_size, show_progress_bar=False):
+        out = None
+        # Length-sorted batches pad less, as sentence-transformers does
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            tokens = self.tokenizer([texts[i] for i in rows], padding=True, truncation=True,
+                                    max_length=self.max_length, return_tensors="np")
+            feed = {k: v.astype(np.int64) for k, v in tokens.items() if k in self.input_names}
+            hidden = self.session.run(None, feed)[0]
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            if out is None:
+                out = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            out[rows] = pooled
+        return out
+
+
+def export_onnx(model_name, model_dir, quantize=True):
+    """
+    Export the Hugging Face transformer behind ``model_name`` to
+    ``model_dir``/model.onnx (dynamic batch and sequence axes), save its
+    tokenizer next to it and, with ``quantize``, write the dynamically
+    int8-quantized model_int8.onnx that OnnxEncoder prefers.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    hub_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    tokenizer = AutoTokenizer.from_pretrained(hub_name)
+    model = AutoModel.from_pretrained(hub_name).eval()
+    os.makedirs(model_dir, exist_ok=True)
+
+    sample = tokenizer(["export sample sentence"], return_tensors="pt")
+    # Positional order of BertModel.forward
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    axes = {n: {0: "batch", 1: "tokens"} for n in names + ["last_hidden_state"]}
+    path = os.path.join(model_dir, ONNX_FILE)
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[n] for n in names), path, input_names=names,
+                          output_names=["last_hidden_state"], dynamic_axes=axes, opset_version=14)
+    tokenizer.save_pretrained(model_dir)
+    print(f"✅ Exported {hub_name} to {path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = os.path.join(model_dir, ONNX_INT8_FILE)
+        quantize_dynamic(path, int8_path, weight_type=QuantType.QInt8)
+        print(f"✅ int8 model: {int8_path} ({os.path.getsize(int8_path) / 1e6:.1f} MB, "
+              f"float32 {os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+# ----------------------------
+# Backend registry
+# ----------------------------
+BACKENDS = ("sentence-transformers", "torch", "onnx", "hashing")
+
+
+def encoder_cache_name(backend, model_name, onnx_dir):
+    """Name used in the embedding cache key for ``backend`` (no model load)."""
+    if backend in ("sentence-transformers", "torch"):
+        return model_name
+    if backend == "onnx":
+        path = onnx_model_file(onnx_dir)
+        return f"onnx-{'int8' if path and path.endswith(ONNX_INT8_FILE) else 'fp32'}-{model_name}"
+    if backend == "hashing":
+        return f"hashing-{HashingEncoder().dim}"
+    raise ValueError(f"Unknown encoder backend: {backend}")
+
+
+def build_encoder(backend, model_name, onnx_dir, threads=0):
+    """Returns (encoder, name used in the embedding cache key)."""
+    started = time.perf_counter()
+    if backend in ("sentence-transformers", "torch"):
+        encoder = TorchEncoder(model_name, threads)
+    elif backend == "onnx":
+        encoder = OnnxEncoder(onnx_dir, threads)
+    elif backend == "hashing":
+        encoder = HashingEncoder()
+    else:
+        raise ValueError(f"Unknown encoder backend: {backend}")
+    if backend != "hashing":
+        print(f"✅ {backend} encoder ready in {time.perf_counter() - started:.1f}s"
+              f" ({threads or 'default'} threads)")
+    return encoder, encoder_cache_name(backend, model_name, onnx_dir)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "export":
+        sys.exit("usage: python encoders.py export [onnx dir] [--no-quantize]")
+    from models import MODEL_NAME, ONNX_MODEL_DIR
+
+    args = [a for a in sys.argv[2:] if not a.startswith("--")]
+    export_onnx(MODEL_NAME, args[0] if args else ONNX_MODEL_DIR, quantize="--no-quantize" not in sys.argv)
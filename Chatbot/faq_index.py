@@ -0,0 +1,151 @@
+import numpy as np
+
+from answer_store import as_answer_store
+
+# ============================
+# Exact FAQ search index
+# ============================
+# Embeddings are L2-normalized once at build time, so cosine similarity for a
+# query is a single matrix-vector product against the stored matrix.
+
+# float16 matrices are upcast block by block (numpy has no fast f16 matmul)
+FLOAT16_BLOCK_ROWS = 65536
+# search_batch keeps each (queries x rows) score block under this many floats
+BATCH_SCORE_ELEMENTS = 1 << 24
+
+
+def l2_normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores, k):
+    """Indices of the ``k`` highest scores, best first."""
+    n = scores.shape[0]
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+    k = max(1, min(k, n))
+    if k == n:
+        idx = np.argsort(-scores)
+    else:
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx = idx[np.argsort(-scores[idx])]
+    return idx
+
+
+class FaqIndex:
+    """
+    Brute-force cosine search over pre-normalized FAQ question embeddings.
+    """
+
+    def __init__(self, embeddings, answers=None, questions=None, dtype=np.float32):
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float32, np.float16):
+            raise ValueError(f"Unsupported index dtype: {dtype}")
+        self.embeddings = np.ascontiguousarray(l2_normalize(embeddings), dtype=dtype)
+        self.answers = list(answers) if answers is not None else None
+        self.questions = list(questions) if questions is not None else None
+
+    @classmethod
+    def from_normalized(cls, matrix, answers=None, questions=None):
+        """
+        Wraps an already L2-normalized matrix without copying it (e.g. a view
+        over shared memory). ``answers``/``questions`` may be any indexable.
+        """
+        index = cls.__new__(cls)
+        index.embeddings = matrix
+        index.answers = answers
+        index.questions = questions
+        return index
+
+    @classmethod
+    def from_store(cls, store, embeddings, dtype=np.float32):
+        """Index over an AnswerStore; answers/questions stay in its columns."""
+        index = cls(embeddings, dtype=dtype)
+        index.answers, index.questions = store.answers, store.questions
+        return index
+
+    @classmethod
+    def from_dataframe(cls, df, embeddings, dtype=np.float32):
+        return cls.from_store(as_answer_store(df), embeddings, dtype=dtype)
+
+    def __len__(self):
+        return self.embeddings.shape[0]
+
+    @property
+    def dim(self):
+        return self.embeddings.shape[1]
+
+    def scores(self, query_embedding):
+        """Cosine similarity of one query against every stored row."""
+        query = l2_normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+        if self.embeddings.dtype == np.float32:
+            return self.embeddings @ query
+        out = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), FLOAT16_BLOCK_ROWS):
+            block = self.embeddings[start:start + FLOAT16_BLOCK_ROWS].astype(np.float32)
+            out[start:start + block.shape[0]] = block @ query
+        return out
+
+    def score_rows(self, query_embedding, rows):
+        """Cosine similarity of one query against the given rows only."""
+        query = l2_normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+        return self.embeddings[rows].astype(np.float32) @ query
+
+    def search(self, query_embedding, k=1):
+        """
+        Returns (scores, row indices, answers) for the ``k`` best rows, best first.
+        """
+        scores = self.scores(query_embedding)
+        idx = top_k(scores, k)
+        answers = [self.answers[i] for i in idx] if self.answers is not None else None
+        return scores[idx], idx, answers
+
+    def search_batch(self, query_embeddings, k=1):
+        """
+        Many queries at once, one matrix product per block of queries.
+        Returns (scores, row indices), both shaped (n_queries, k), best first.
+        """
+        queries = l2_normalize(np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.dim))
+        k = max(1, min(k, len(self)))
+        out_scores = np.empty((queries.shape[0], k), dtype=np.float32)
+        out_idx = np.empty((queries.shape[0], k), dtype=np.int64)
+        step = max(1, BATCH_SCORE_ELEMENTS // max(1, len(self)))
+        for start in range(0, queries.shape[0], step):
+            block = queries[start:start + step]
+            if self.embeddings.dtype == np.float32:
+                scores = block @ self.embeddings.T
+            else:
+                scores = np.empty((block.shape[0], len(self)), dtype=np.float32)
+                for row in range(0, len(self), FLOAT16_BLOCK_ROWS):
+                    rows = self.embeddings[row:row + FLOAT16_BLOCK_ROWS].astype(np.float32)
+                    scores[:, row:row + rows.shape[0]] = block @ rows.T
+            if k == 1:
+                idx = scores.argmax(axis=1)[:, None]
+            else:
+                idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1)
+                idx = np.take_along_axis(idx, order, axis=1)
+            out_idx[start:start + block.shape[0]] = idx
+            out_scores[start:start + block.shape[0]] = np.take_along_axis(scores, idx, axis=1)
+        return out_scores, out_idx
+
+
+_last_wrapped = (None, None, None)
+
+def as_faq_index(question_embeddings, df):
+    """
+    Accepts either a ready index or a raw embedding matrix (legacy callers).
+    Raw matrices are wrapped once and memoized for the same (matrix, df) pair.
+    """
+    global _last_wrapped
+    if hasattr(question_embeddings, "search"):
+        return question_embeddings
+    emb, frame, index = _last_wrapped
+    if emb is question_embeddings and frame is df:
+        return index
+    index = FaqIndex.from_store(as_answer_store(df), question_embeddings)
+    _last_wrapped = (question_embeddings, df, index)
+    return index
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from answer_store import as_answer_store
+
+# ============================
+# Incremental FAQ reload
+# ============================
+# A new FAQ table is diffed against the loaded one by row content hash.
+# Embeddings depend only on the question text, so rows whose question is
+# unchanged (even if the answer or intent was edited) reuse their existing
+# vector; only new or reworded questions are sent to the encoder. Callers
+# build the new index from the result off to the side and swap it in as one
+# reference, so requests never see a half-built state.
+
+# How often (seconds) FaqWatcher checks the CSV mtime; 0 disables the watcher
+FAQ_WATCH_INTERVAL = float(os.environ.get("CHATBOT_FAQ_WATCH_INTERVAL", "5"))
+
+
+def incremental_embeddings(model, old_df, old_embeddings, new_df):
+    """
+    Embedding matrix for ``new_df`` in its row order, reusing rows of
+    ``old_embeddings`` whose question text is unchanged. Returns
+    (embeddings, stats) where stats counts added/edited/removed/unchanged
+    rows and how many questions were encoded.
+    """
+    old_store, new_store = as_answer_store(old_df), as_answer_store(new_df)
+    old_questions, new_questions = list(old_store.questions), list(new_store.questions)
+
+    old_hashes, new_hashes = old_store.row_hashes(), new_store.row_hashes()
+    old_hash_set = set(old_hashes)
+    position = {q: i for i, q in enumerate(old_questions)}
+    new_question_set = set(new_questions)
+
+    to_encode = [i for i, q in enumerate(new_questions) if q not in position]
+    old_embeddings = np.asarray(old_embeddings)
+    embeddings = np.empty((len(new_questions), old_embeddings.shape[1]), dtype=old_embeddings.dtype)
+    for i, q in enumerate(new_questions):
+        if q in position:
+            embeddings[i] = old_embeddings[position[q]]
+    if to_encode:
+        encoded = model.encode([new_questions[i] for i in to_encode])
+        embeddings[to_encode] = np.asarray(encoded, dtype=embeddings.dtype)
+
+    unchanged = sum(1 for h in new_hashes if h in old_hash_set)
+    stats = {
+        "rows": len(new_questions),
+        "unchanged": unchanged,
+        # Rows whose content changed but whose question text is still known
+        "edited": sum(1 for i, h in enumerate(new_hashes) if h not in old_hash_set and new_questions[i] in position),
+        "added": len(to_encode),
+        "removed": sum(1 for q in old_questions if q not in new_question_set),
+        "encoded": len(to_encode),
+    }
+    return embeddings, stats
+
+
+class FaqWatcher:
+    """
+    Polls ``path``'s mtime on a daemon thread and calls ``on_change(path)``
+    when it moves (the file may still be mid-write, so a settle delay is used).
+    """
+
+    def __init__(self, path, on_change, interval=FAQ_WATCH_INTERVAL, settle=0.5):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.settle = settle
+        self._mtime = self._current_mtime()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="faq-watcher", daemon=True)
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def start(self):
+        if self.interval > 0:
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            mtime = self._current_mtime()
+            if mtime is None or mtime == self._mtime:
+                continue
+            time.sleep(self.settle)
+            self._mtime = self._current_mtime()
+            try:
+                self.on_change(self.path)
+            except Exception as e:
+                print(f"⚠️ FAQ reload failed, keeping the loaded data: {e}")
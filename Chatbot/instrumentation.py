@@ -0,0 +1,179 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# ============================
+# Pipeline instrumentation
+# ============================
+# Per-stage latency histograms and per-layer reply counters, kept in memory
+# and exported in Prometheus text format (GET /metrics). Recording a sample is
+# a perf_counter() pair plus a locked bucket increment, cheap enough for every
+# request. Diagnostics go through level-gated structured logging: when the
+# level is off, log_event() returns before formatting anything.
+
+LOG_LEVEL = os.environ.get("CHATBOT_LOG_LEVEL", "WARNING").upper()
+
+# Seconds; spans cache hits (~10 µs) to cold model encodes (~1 s)
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+logger = logging.getLogger("chatbot")
+logger.setLevel(getattr(logging, LOG_LEVEL, logging.WARNING))
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+
+def get_logger(name):
+    return logger.getChild(name)
+
+
+def log_event(log, level, event, **fields):
+    """``event key=value ...`` at ``level``; free when the level is disabled."""
+    if not log.isEnabledFor(level):
+        return
+    log.log(level, "%s %s", event, " ".join(f"{k}={v!r}" for k, v in fields.items()))
+
+
+# ----------------------------
+# Metric types
+# ----------------------------
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, *labels):
+        """{"count", "sum", "buckets": [(le, cumulative count)]} for one series."""
+        with self._lock:
+            counts, total, count = self._series.get(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            counts = list(counts)
+        cumulative, running = [], 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            running += n
+            cumulative.append((bound, running))
+        return {"count": count, "sum": total, "buckets": cumulative}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            keys = sorted(self._series)
+        for labels in keys:
+            snap = self.snapshot(*labels)
+            for bound, running in snap["buckets"]:
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                label_text = _label_text(self.labelnames + ("le",), labels + (le,))
+                lines.append(f"{self.name}_bucket{label_text} {running}")
+            label_text = _label_text(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {snap['sum']}")
+            lines.append(f"{self.name}_count{label_text} {snap['count']}")
+        return lines
+
+
+# ----------------------------
+# Registry
+# ----------------------------
+_metrics = []
+_collectors = []
+
+
+def register(metric):
+    _metrics.append(metric)
+    return metric
+
+
+def add_collector(callback):
+    """``callback()`` returns {metric name: (type, help, value)} read at scrape time."""
+    _collectors.append(callback)
+
+
+def render_prometheus():
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for callback in _collectors:
+        try:
+            values = callback()
+        except Exception as e:
+            log_event(logger, logging.WARNING, "collector_failed", error=str(e))
+            continue
+        for name, (kind, help_text, value) in values.items():
+            if value is None:
+                continue
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+stage_seconds = register(Histogram(
+    "chatbot_stage_seconds", "Time spent in each reply pipeline stage", ("stage",)))
+reply_seconds = register(Histogram(
+    "chatbot_reply_seconds", "End-to-end reply time by answering layer", ("layer",)))
+replies_total = register(Counter(
+    "chatbot_replies_total", "Replies by answering layer and cache hit", ("layer", "cached")))
+
+
+@contextmanager
+def timed(stage):
+    """Records the block's duration under chatbot_stage_seconds{stage=...}."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - started, stage)
+
+
+def record_reply(layer, cached, seconds):
+    replies_total.inc(layer, "true" if cached else "false")
+    reply_seconds.observe(seconds, layer)
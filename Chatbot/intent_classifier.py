@@ -0,0 +1,287 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+from embedding_cache import CACHE_DIR, atomic_write
+from encoders import HashingEncoder
+from utils import clean_text
+
+# ============================
+# Intent classifier fast path
+# ============================
+# Multinomial logistic regression over hashed word + character-trigram
+# features (the HashingEncoder's, at a wider dimension), trained on the FAQ
+# questions and their ``intent`` column. It needs no sentence encoder, so it
+# runs before the query is encoded. On a confident prediction get_faq_match
+# picks the best BM25 row within that intent; if that row covers the query
+# well enough (CHATBOT_INTENT_ROW_ACCEPT) it is answered without encoding at
+# all. Otherwise the query is encoded and only the intent's rows are scored,
+# and when none of them reaches the FAQ threshold the whole index is
+# searched.
+#
+# A trained model is saved to the embedding cache directory under a key
+# covering the training data and hyper-parameters, so workers load it instead
+# of retraining. Cross-validated accuracy per intent and at the accept
+# threshold:
+#
+#     python intent_classifier.py [faq path]
+
+# Probability needed to route a query to one intent's rows; 0 disables routing
+INTENT_ACCEPT = float(os.environ.get("CHATBOT_INTENT_ACCEPT", "0"))
+INTENT_ROUTING = INTENT_ACCEPT > 0
+# Lexical confidence of the best row within the routed intent needed to skip
+# the encoder. Lower than CHATBOT_LEXICAL_ACCEPT: the intent is already known
+INTENT_ROW_ACCEPT = float(os.environ.get("CHATBOT_INTENT_ROW_ACCEPT", "0.5"))
+
+FEATURE_DIM = 4096
+EPOCHS = 300
+LEARNING_RATE = 2.0
+L2_PENALTY = 1e-4
+MODEL_VERSION = 1
+FILE_PREFIX = "intent_model"
+
+
+class IntentClassifier:
+    """
+    Softmax regression over hashed n-grams. ``intent_names`` are the store's
+    interned intents; ``rows_by_intent[code]`` are the FAQ rows of each.
+    """
+
+    def __init__(self, weights, bias, intent_names, rows_by_intent=None):
+        self.weights = weights
+        self.bias = bias
+        self.intent_names = list(intent_names)
+        self.rows_by_intent = rows_by_intent
+        self.featurizer = HashingEncoder(dim=weights.shape[0])
+
+    # ----------------------------
+    # Training
+    # ----------------------------
+    @classmethod
+    def train(cls, texts, codes, intent_names, feature_dim=FEATURE_DIM, epochs=EPOCHS,
+              learning_rate=LEARNING_RATE, l2=L2_PENALTY):
+        """
+        Full-batch gradient descent on ``texts`` labelled with intent
+        ``codes`` (indices into ``intent_names``). Classes are weighted by
+        inverse frequency, so small intents are not drowned out.
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        features = featurize(HashingEncoder(dim=feature_dim), texts)
+        n, classes = len(codes), len(intent_names)
+        targets = np.zeros((n, classes), dtype=np.float32)
+        targets[np.arange(n), codes] = 1.0
+        counts = np.bincount(codes, minlength=classes).astype(np.float32)
+        sample_weight = (n / (classes * np.maximum(counts, 1.0)))[codes][:, None] / n
+
+        weights = np.zeros((feature_dim, classes), dtype=np.float32)
+        bias = np.zeros(classes, dtype=np.float32)
+        for _ in range(epochs):
+            grad = (softmax(features @ weights + bias) - targets) * sample_weight
+            weights -= learning_rate * (features.T @ grad + l2 * weights)
+            bias -= learning_rate * grad.sum(axis=0)
+        return cls(weights, bias, intent_names)
+
+    @classmethod
+    def from_store(cls, store, **kwargs):
+        """Trained on the store's labelled questions; routes to its rows."""
+        codes = np.asarray(store.intent_codes)
+        labelled = np.flatnonzero(codes >= 0)
+        classifier = cls.train([store.questions[i] for i in labelled], codes[labelled],
+                               store.intent_names, **kwargs)
+        classifier.rows_by_intent = rows_by_intent(store)
+        return classifier
+
+    # ----------------------------
+    # Prediction
+    # ----------------------------
+    def predict_proba(self, texts):
+        return softmax(featurize(self.featurizer, texts) @ self.weights + self.bias)
+
+    def predict(self, text):
+        """(intent code, probability) of the most likely intent for ``text``."""
+        probabilities = self.predict_proba([text])[0]
+        code = int(np.argmax(probabilities))
+        return code, float(probabilities[code])
+
+    def route(self, text, accept=INTENT_ACCEPT):
+        """FAQ rows of the predicted intent, or None if the prediction is below ``accept``."""
+        code, probability = self.predict(text)
+        if probability < accept or self.rows_by_intent is None:
+            return None
+        return self.rows_by_intent[code]
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+    def save(self, path):
+        """Atomic .npz write (weights, bias, intent names)."""
+        atomic_write(path, lambda f: np.savez(f, weights=self.weights, bias=self.bias,
+                                              intent_names=np.array(json.dumps(self.intent_names))), ".npz.tmp")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["weights"], data["bias"], json.loads(str(data["intent_names"])))
+
+
+def featurize(featurizer, texts):
+    return featurizer.encode([clean_text(str(t)) for t in texts], normalize_embeddings=True)
+
+
+def softmax(logits):
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def rows_by_intent(store):
+    codes = np.asarray(store.intent_codes)
+    return [np.flatnonzero(codes == c) for c in range(len(store.intent_names))]
+
+
+def has_intents(store):
+    return store is not None and store.intent_codes is not None and len(store.intent_names) > 1
+
+
+# ============================
+# Cached model per FAQ table
+# ============================
+def config_key(feature_dim=FEATURE_DIM):
+    """Hash of the classifier settings (the same for every FAQ table)."""
+    return hashlib.sha256(json.dumps({
+        "version": MODEL_VERSION, "dim": feature_dim, "epochs": EPOCHS,
+        "lr": LEARNING_RATE, "l2": L2_PENALTY,
+    }, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def model_key(store, feature_dim=FEATURE_DIM):
+    """Hash of everything the trained weights depend on."""
+    h = hashlib.sha256(config_key(feature_dim).encode("utf-8"))
+    h.update(json.dumps(store.intent_names).encode("utf-8"))
+    for question, code in zip(store.questions, np.asarray(store.intent_codes)):
+        h.update(str(question).encode("utf-8"))
+        h.update(b"\x00%d\x00" % int(code))
+    return h.hexdigest()
+
+
+def load_or_train(store, cache_dir=CACHE_DIR):
+    """Classifier for ``store``, read from the cache or trained and written there."""
+    # Older models with the same settings are pruned; other settings are kept
+    prefix = f"{FILE_PREFIX}-{config_key()[:8]}-"
+    path = os.path.join(cache_dir, f"{prefix}{model_key(store)[:16]}.npz")
+    if os.path.exists(path):
+        try:
+            classifier = IntentClassifier.load(path)
+            if classifier.intent_names == list(store.intent_names):
+                classifier.rows_by_intent = rows_by_intent(store)
+                return classifier
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable intent model {path}: {e}")
+
+    classifier = IntentClassifier.from_store(store)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        classifier.save(path)
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and name.endswith(".npz") and name != os.path.basename(path):
+                os.remove(os.path.join(cache_dir, name))
+    except OSError as e:
+        print(f"⚠️ Could not write intent model: {e}")
+    return classifier
+
+
+_last_built = (None, None)
+_build_lock = threading.Lock()
+
+
+def intent_classifier_for(store):
+    """Classifier trained on ``store``, loaded or trained once per loaded store."""
+    global _last_built
+    built_for, classifier = _last_built
+    if built_for is store:
+        return classifier
+    with _build_lock:
+        built_for, classifier = _last_built
+        if built_for is not store:
+            classifier = load_or_train(store)
+            _last_built = (store, classifier)
+    return classifier
+
+
+# ============================
+# Evaluation
+# ============================
+def cross_validate(store, folds=5, accept=INTENT_ACCEPT, seed=0):
+    """
+    Stratified k-fold evaluation on the store's labelled questions. Returns
+    overall and per-intent accuracy plus coverage/accuracy at ``accept``.
+    """
+    codes = np.asarray(store.intent_codes)
+    labelled = np.flatnonzero(codes >= 0)
+    rng = np.random.default_rng(seed)
+    fold_of = np.empty(len(labelled), dtype=np.int64)
+    for code in np.unique(codes[labelled]):
+        members = rng.permutation(np.flatnonzero(codes[labelled] == code))
+        fold_of[members] = np.arange(len(members)) % folds
+
+    predicted = np.empty(len(labelled), dtype=np.int64)
+    confidence = np.empty(len(labelled), dtype=np.float32)
+    for fold in range(folds):
+        test, train = labelled[fold_of == fold], labelled[fold_of != fold]
+        if len(test) == 0:
+            continue
+        model = IntentClassifier.train([store.questions[i] for i in train], codes[train], store.intent_names)
+        probabilities = model.predict_proba([store.questions[i] for i in test])
+        predicted[fold_of == fold] = probabilities.argmax(axis=1)
+        confidence[fold_of == fold] = probabilities.max(axis=1)
+
+    truth = codes[labelled]
+    correct = predicted == truth
+    routed = confidence >= accept
+    per_intent = {}
+    for code, name in enumerate(store.intent_names):
+        actual, claimed = truth == code, predicted == code
+        per_intent[name] = {
+            "support": int(actual.sum()),
+            "recall": float(correct[actual].mean()) if actual.any() else None,
+            "precision": float(correct[claimed].mean()) if claimed.any() else None,
+        }
+    return {
+        "questions": int(len(labelled)),
+        "folds": folds,
+        "accuracy": float(correct.mean()),
+        "accept": accept,
+        "routed": float(routed.mean()),
+        "routed_accuracy": float(correct[routed].mean()) if routed.any() else None,
+        "per_intent": per_intent,
+    }
+
+
+if __name__ == "__main__":
+    from answer_store import load_answer_store
+
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                               "data", "faq_with_intent.csv")
+    store = load_answer_store(path)
+    if not has_intents(store):
+        sys.exit(f"❌ {path} has no intent column with at least two intents")
+
+    print(f"📊 {len(store)} rows, {len(store.intent_names)} intents, 5-fold cross-validation")
+    for accept in (0.5, 0.7, 0.9):
+        report = cross_validate(store, accept=accept)
+        routed = report["routed_accuracy"]
+        print(f"  accept {accept:.1f}: routed {report['routed']:.0%} of questions, "
+              f"accuracy when routed {routed if routed is None else f'{routed:.3f}'}")
+    print(f"  overall accuracy {report['accuracy']:.3f}")
+    print(f"\n{'intent':<18} {'support':>8} {'recall':>8} {'precision':>10}")
+    for name, entry in report["per_intent"].items():
+        recall = "-" if entry["recall"] is None else f"{entry['recall']:.3f}"
+        precision = "-" if entry["precision"] is None else f"{entry['precision']:.3f}"
+        print(f"{name:<18} {entry['support']:>8} {recall:>8} {precision:>10}")
+
+    classifier = load_or_train(store)
+    print(f"\n✅ Intent model ready ({len(classifier.intent_names)} intents) in {CACHE_DIR}")
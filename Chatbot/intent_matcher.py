@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# ============================
+# Compiled rule matcher
+# ============================
+# All rule phrases from data/rules.json are compiled into one Aho–Corasick
+# automaton over word tokens. A single left-to-right scan of the cleaned
+# message finds every phrase occurrence; for each cascade the rule listed
+# first in the file wins, exactly like the old if/elif chains. Matching on
+# whole tokens means "hi" no longer fires inside "this" or "shipping".
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RULES_PATH = os.environ.get("CHATBOT_RULES_PATH", os.path.join(BASE_DIR, "data", "rules.json"))
+
+# How often (seconds) the rules file mtime is checked for hot reload
+RELOAD_CHECK_INTERVAL = 2.0
+
+
+def tokenize(text):
+    """Same normalization as utils.clean_text, split into word tokens."""
+    from utils import clean_text
+    return clean_text(text).split()
+
+
+class Rule:
+    __slots__ = ("cascade", "priority", "name", "response")
+
+    def __init__(self, cascade, priority, name, response):
+        self.cascade = cascade
+        self.priority = priority
+        self.name = name
+        self.response = response
+
+    def __repr__(self):
+        return f"Rule({self.cascade}:{self.name})"
+
+
+class RuleMatcher:
+    """Token-level Aho–Corasick automaton over every rule phrase."""
+
+    def __init__(self, rules_by_cascade):
+        self.cascades = list(rules_by_cascade)
+        self.rules = []
+        self._goto = [{}]
+        self._fail = [0]
+        # Per state: {cascade: best Rule ending here (incl. via fail links)}
+        self._out = [{}]
+
+        for cascade, rules in rules_by_cascade.items():
+            for priority, spec in enumerate(rules):
+                rule = Rule(cascade, priority, spec.get("name", f"{cascade}_{priority}"), spec["response"])
+                self.rules.append(rule)
+                for phrase in spec.get("phrases", []):
+                    tokens = tokenize(phrase)
+                    if tokens:
+                        self._add(tokens, rule)
+        self._link()
+
+    def _add(self, tokens, rule):
+        state = 0
+        for token in tokens:
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append({})
+            state = nxt
+        self._merge(self._out[state], {rule.cascade: rule})
+
+    @staticmethod
+    def _merge(target, source):
+        for cascade, rule in source.items():
+            current = target.get(cascade)
+            if current is None or rule.priority < current.priority:
+                target[cascade] = rule
+
+    def _link(self):
+        pending = deque()
+        for state in self._goto[0].values():
+            pending.append(state)
+        while pending:
+            state = pending.popleft()
+            for token, nxt in self._goto[state].items():
+                pending.append(nxt)
+                fail = self._fail[state]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(token, 0)
+                self._merge(self._out[nxt], self._out[self._fail[nxt]])
+
+    def scan(self, tokens):
+        """Single pass over ``tokens``; returns {cascade: winning Rule}."""
+        best = {}
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if out[state]:
+                self._merge(best, out[state])
+        return best
+
+    def match(self, text, cascades=None):
+        """
+        Winning rule for ``text``: the first cascade in ``cascades`` (default:
+        file order) that matched, then its highest-priority rule.
+        """
+        best = self.scan(tokenize(text))
+        for cascade in cascades or self.cascades:
+            if cascade in best:
+                return best[cascade]
+        return None
+
+
+def load_matcher(path=RULES_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return RuleMatcher(json.load(f))
+
+
+# ----------------------------
+# Process-wide rules with hot reload
+# ----------------------------
+_lock = threading.Lock()
+_matcher = None
+_mtime = None
+_last_check = 0.0
+_reload_listeners = []
+
+
+def add_reload_listener(callback):
+    """``callback()`` runs after every successful reload (e.g. to drop cached replies)."""
+    _reload_listeners.append(callback)
+
+
+def reload_rules(path=RULES_PATH):
+    """Recompile the rules file and swap it in; returns the new matcher."""
+    global _matcher, _mtime
+    matcher = load_matcher(path)
+    with _lock:
+        first_load = _matcher is None
+        _matcher = matcher
+        _mtime = os.path.getmtime(path)
+    if not first_load:
+        for callback in list(_reload_listeners):
+            callback()
+    print(f"✅ Loaded {len(matcher.rules)} chat rules from {path}")
+    return matcher
+
+
+def get_matcher(path=RULES_PATH):
+    """Current matcher; picks up edits to the rules file without a restart."""
+    global _last_check
+    matcher = _matcher
+    if matcher is None:
+        return reload_rules(path)
+    now = time.monotonic()
+    if now - _last_check >= RELOAD_CHECK_INTERVAL:
+        _last_check = now
+        try:
+            if os.path.getmtime(path) != _mtime:
+                matcher = reload_rules(path)
+        except Exception as e:
+            # Keep serving the last good rules if the file is mid-edit or broken
+            print(f"⚠️ Rules reload failed, keeping previous rules: {e}")
+    return matcher
@@ -0,0 +1,193 @@
+import json
+import os
+
+import numpy as np
+
+from answer_store import as_answer_store
+from faq_index import l2_normalize, top_k
+
+# ============================
+# IVF approximate FAQ index
+# ============================
+# Pure-NumPy inverted-file index for large catalogs: a spherical k-means
+# coarse quantizer splits the normalized embeddings into ``nlist`` cells, and
+# a query only scans the rows of its ``nprobe`` closest cells. Rows are stored
+# grouped by cell so each probed list is one contiguous slice.
+#
+# Same search contract as FaqIndex: search() -> (scores, row indices, answers).
+#
+# A saved index holds only the arrays plus the embedding-cache key of the
+# vectors it was built from; answers/questions come from the live AnswerStore
+# at load time, and a key mismatch means the index is stale.
+#
+#     python ivf_index.py <index dir> [faq path]
+
+IVF_FORMAT_VERSION = 2
+ASSIGN_BLOCK_ROWS = 65536
+
+
+def _assign(vectors, centroids):
+    """Closest centroid (by cosine) for every row, computed in blocks."""
+    labels = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], ASSIGN_BLOCK_ROWS):
+        block = vectors[start:start + ASSIGN_BLOCK_ROWS]
+        labels[start:start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def train_kmeans(vectors, nlist, n_iter=20, sample_size=None, seed=0):
+    """Spherical k-means over (a sample of) normalized vectors."""
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    if sample_size and n > sample_size:
+        vectors = vectors[rng.choice(n, sample_size, replace=False)]
+        n = sample_size
+    nlist = min(nlist, n)
+    centroids = vectors[rng.choice(n, nlist, replace=False)].copy()
+
+    for _ in range(n_iter):
+        labels = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=nlist)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed dead cells with random rows so every list stays useful
+            sums[empty] = vectors[rng.choice(n, int(empty.sum()), replace=False)]
+        centroids = l2_normalize(sums)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """
+    Approximate cosine search; raise ``nprobe`` for recall, lower it for speed.
+    """
+
+    def __init__(self, centroids, vectors, order, offsets, answers=None, questions=None, nprobe=8):
+        self.centroids = centroids
+        self.vectors = vectors      # rows grouped by cell
+        self.order = order          # grouped position -> original row id
+        self.offsets = offsets      # cell i spans vectors[offsets[i]:offsets[i + 1]]
+        self.answers = list(answers) if answers is not None else None
+        self.questions = list(questions) if questions is not None else None
+        self.nprobe = nprobe
+        self.key = None             # embedding-cache key of the source vectors
+        self._positions = None
+
+    @classmethod
+    def build(cls, embeddings, answers=None, questions=None, nlist=None, nprobe=8,
+              n_iter=20, sample_size=100_000, seed=0):
+        vectors = l2_normalize(embeddings)
+        n = vectors.shape[0]
+        if nlist is None:
+            nlist = max(1, int(4 * np.sqrt(n)))
+        centroids = train_kmeans(vectors, nlist, n_iter=n_iter, sample_size=sample_size, seed=seed)
+
+        labels = _assign(vectors, centroids)
+        order = np.argsort(labels, kind="stable").astype(np.int64)
+        counts = np.bincount(labels, minlength=centroids.shape[0])
+        offsets = np.zeros(centroids.shape[0] + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        return cls(centroids, np.ascontiguousarray(vectors[order]), order, offsets,
+                   answers=answers, questions=questions, nprobe=nprobe)
+
+    @classmethod
+    def from_store(cls, store, embeddings, **kwargs):
+        """Build over an AnswerStore; answers/questions stay in its columns."""
+        index = cls.build(embeddings, **kwargs)
+        index.answers, index.questions = store.answers, store.questions
+        return index
+
+    @classmethod
+    def from_dataframe(cls, df, embeddings, **kwargs):
+        return cls.from_store(as_answer_store(df), embeddings, **kwargs)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def nlist(self):
+        return self.centroids.shape[0]
+
+    def score_rows(self, query_embedding, rows):
+        """Exact cosine similarity of one query against the given original rows."""
+        if self._positions is None:
+            # original row id -> grouped position, the inverse of ``order``
+            positions = np.empty_like(self.order)
+            positions[self.order] = np.arange(len(self.order))
+            self._positions = positions
+        query = l2_normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+        return self.vectors[self._positions[rows]] @ query
+
+    def search(self, query_embedding, k=1, nprobe=None):
+        """
+        Returns (scores, row indices, answers) for the ``k`` best rows found
+        in the ``nprobe`` closest cells, best first.
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        query = l2_normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+
+        cells = top_k(self.centroids @ query, nprobe)
+        positions = [np.arange(self.offsets[c], self.offsets[c + 1]) for c in cells]
+        positions = np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)
+        if positions.size == 0:
+            empty = np.empty(0, dtype=np.float32)
+            return empty, np.empty(0, dtype=np.int64), [] if self.answers is not None else None
+
+        scores = self.vectors[positions] @ query
+        best = top_k(scores, k)
+        rows = self.order[positions[best]]
+        answers = [self.answers[i] for i in rows] if self.answers is not None else None
+        return scores[best], rows, answers
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+    def save(self, path, key=None):
+        """
+        Write the index as a directory of .npy arrays plus meta.json; ``key``
+        is the embedding-cache key of the vectors (checked by the loader).
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "centroids.npy"), self.centroids)
+        np.save(os.path.join(path, "vectors.npy"), self.vectors)
+        np.save(os.path.join(path, "order.npy"), self.order)
+        np.save(os.path.join(path, "offsets.npy"), self.offsets)
+        meta = {
+            "version": IVF_FORMAT_VERSION,
+            "rows": len(self),
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "key": key if key is not None else self.key,
+        }
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Arrays only: attach answers/questions from the matching AnswerStore."""
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != IVF_FORMAT_VERSION:
+            raise ValueError(f"Unsupported IVF index version: {meta.get('version')}")
+        mode = "r" if mmap else None
+        index = cls(
+            np.load(os.path.join(path, "centroids.npy")),
+            np.load(os.path.join(path, "vectors.npy"), mmap_mode=mode),
+            np.load(os.path.join(path, "order.npy"), mmap_mode=mode),
+            np.load(os.path.join(path, "offsets.npy")),
+            nprobe=meta.get("nprobe", 8),
+        )
+        index.key = meta.get("key")
+        return index
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        sys.exit("usage: python ivf_index.py <index dir> [faq path]")
+    from models import file_path, save_ivf_index
+
+    save_ivf_index(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else file_path)
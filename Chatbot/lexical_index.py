@@ -0,0 +1,140 @@
+import os
+import threading
+
+import numpy as np
+
+from faq_index import top_k
+from utils import clean_text
+
+# ============================
+# BM25 lexical FAQ index
+# ============================
+# Sparse inverted index over the clean_text() tokens of the FAQ questions,
+# built once per loaded FAQ table. It is used two ways before (or instead of)
+# the dense encoder:
+#
+#   * shortcut: when the best BM25 row covers the query and the question
+#     almost word for word (idf-weighted, both directions), its answer is
+#     returned without encoding the query at all;
+#   * fusion: BM25 top-k candidates narrow or complement the dense search,
+#     per CHATBOT_FUSION ("dense" = dense only, "rerank" = cosine over the
+#     BM25 candidates only, "rrf" = reciprocal rank fusion of both top-k).
+
+# Lexical confidence (0..1) needed to answer without the encoder; 0 disables
+LEXICAL_ACCEPT = float(os.environ.get("CHATBOT_LEXICAL_ACCEPT", "0.9"))
+FUSION_STRATEGY = os.environ.get("CHATBOT_FUSION", "dense")
+LEXICAL_CANDIDATES = int(os.environ.get("CHATBOT_LEXICAL_CANDIDATES", "20"))
+RRF_K = 60
+LEXICAL_ENABLED = LEXICAL_ACCEPT > 0 or FUSION_STRATEGY != "dense"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text):
+    return clean_text(str(text)).split()
+
+
+class BM25Index:
+    """Okapi BM25 over short documents, with per-posting weights precomputed."""
+
+    def __init__(self, documents, k1=BM25_K1, b=BM25_B):
+        tokens = [tokenize(d) for d in documents]
+        self.doc_terms = [tuple(dict.fromkeys(t)) for t in tokens]
+        n = len(tokens)
+        lengths = np.array([len(t) for t in tokens], dtype=np.float32)
+        avgdl = float(lengths.mean()) if n else 0.0
+
+        postings = {}
+        for row, document in enumerate(tokens):
+            counts = {}
+            for term in document:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((row, tf))
+
+        self.idf = {}
+        self.postings = {}
+        for term, entries in postings.items():
+            df = len(entries)
+            idf = float(np.log(1.0 + (n - df + 0.5) / (df + 0.5)))
+            rows = np.array([r for r, _ in entries], dtype=np.int64)
+            tf = np.array([t for _, t in entries], dtype=np.float32)
+            norm = k1 * (1.0 - b + b * lengths[rows] / avgdl) if avgdl else k1
+            self.idf[term] = idf
+            self.postings[term] = (rows, (idf * tf * (k1 + 1.0) / (tf + norm)).astype(np.float32))
+        # Unseen query words count as rare ones when measuring coverage
+        self.unknown_idf = max(self.idf.values(), default=1.0)
+        self.doc_weight = np.array([sum(self.idf[t] for t in terms) for terms in self.doc_terms],
+                                   dtype=np.float32)
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def scores(self, text):
+        """BM25 score of every row for ``text``."""
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term in set(tokenize(text)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        return scores
+
+    def search(self, text, k=LEXICAL_CANDIDATES):
+        """(scores, rows) of the best ``k`` rows sharing a term with ``text``, best first."""
+        scores = self.scores(text)
+        matched = np.flatnonzero(scores)
+        if matched.size == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        best = matched[top_k(scores[matched], k)]
+        return scores[best], best
+
+    def best_in(self, text, rows):
+        """(row, confidence) of the best BM25 row among ``rows``; (None, 0.0) if none match."""
+        rows = np.asarray(rows)
+        if rows.size == 0:
+            return None, 0.0
+        scores = self.scores(text)[rows]
+        best = int(np.argmax(scores))
+        if scores[best] <= 0:
+            return None, 0.0
+        return int(rows[best]), self.confidence(text, int(rows[best]))
+
+    def confidence(self, text, row):
+        """
+        idf-weighted share of the query's terms found in ``row`` and of the
+        row's terms found in the query; the smaller of the two.
+        """
+        query = set(tokenize(text))
+        if not query or not self.doc_terms[row]:
+            return 0.0
+        shared = sum(self.idf[t] for t in query.intersection(self.doc_terms[row]))
+        query_weight = sum(self.idf.get(t, self.unknown_idf) for t in query)
+        return float(min(shared / query_weight, shared / self.doc_weight[row]))
+
+
+def reciprocal_rank_fusion(*rankings, k=RRF_K):
+    """Rows ordered by sum of 1 / (k + rank) over the given rankings."""
+    fused = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            fused[int(row)] = fused.get(int(row), 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused, key=fused.get, reverse=True)
+
+
+_last_built = (None, None)
+_build_lock = threading.Lock()
+
+
+def lexical_index_for(store):
+    """BM25 index over ``store``'s questions, built once per loaded store."""
+    global _last_built
+    built_for, index = _last_built
+    if built_for is store:
+        return index
+    with _build_lock:
+        built_for, index = _last_built
+        if built_for is not store:
+            index = BM25Index(list(store.questions))
+            _last_built = (store, index)
+    return index
@@ -1,5 +1,9 @@
-import pandas as pd
-from sentence_transformers import SentenceTransformer
+from answer_store import as_answer_store, load_answer_store
+from embedding_cache import cache_key, dataset_hash, load_or_build_embeddings, save_embeddings
+from encoders import build_encoder, encoder_cache_name as backend_cache_name
+from faq_index import FaqIndex
+from ivf_index import IVFIndex
+from quantized_index import Int8Index
 
 # ============================
 # Load Dataset
@@ -7,19 +11,131 @@ import os
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-file_path = os.path.join(BASE_DIR, "data", "faq_with_intent.csv")
+# .csv, the .json dataset format, or a binary store built by answer_store.py
+file_path = os.environ.get("CHATBOT_FAQ_PATH", os.path.join(BASE_DIR, "data", "faq_with_intent.csv"))
 # df = pd.read_csv(file_path)
 
+# pandas, sentence_transformers and torch are imported inside the loaders
+# below so that importing this module (and starting a server) stays cheap.
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+NORMALIZE_EMBEDDINGS = False
+
+# "sentence-transformers"/"torch" (default), "onnx" (exported by
+# `python encoders.py export`, int8 by default) or "hashing" (offline stub)
+ENCODER_BACKEND = os.environ.get("CHATBOT_ENCODER_BACKEND", "sentence-transformers")
+ONNX_MODEL_DIR = os.environ.get("CHATBOT_ONNX_MODEL_DIR", os.path.join(BASE_DIR, "onnx_model"))
+# Encoder intra-op threads per process; 0 keeps the library default (all cores)
+ENCODER_THREADS = int(os.environ.get("CHATBOT_ENCODER_THREADS", "0"))
+
+# Retrieval backend: "exact" (FaqIndex, default), "ivf" (approximate, for large
+# catalogs) or "int8" (quantized scan: a quarter of the float32 memory, but a
+# slower search than "exact" - choose it for memory, not latency)
+INDEX_BACKEND = os.environ.get("CHATBOT_INDEX_BACKEND", "exact")
+IVF_NPROBE = int(os.environ.get("CHATBOT_IVF_NPROBE", "8"))
+IVF_INDEX_PATH = os.environ.get("CHATBOT_IVF_INDEX_PATH")  # optional prebuilt index directory
+# int8 candidates rescored exactly against the float32 embeddings; 0 disables re-ranking
+INT8_RERANK_K = int(os.environ.get("CHATBOT_INT8_RERANK_K", "32"))
+
 def load_data(path=file_path):
+    import pandas as pd
     df = pd.read_csv(path)
     return df
 
+def load_answers(path=file_path):
+    """FAQ rows as a read-only AnswerStore (the serving path; no pandas)."""
+    return load_answer_store(path)
+
 # ============================
 # Load Model & Encode Questions
 # ============================
-def load_model_and_embeddings(df):
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    question_embeddings = model.encode(df['question'].tolist(), show_progress_bar=True)
+def encoder_cache_name(backend=None):
+    """Name used in the embedding cache key for ``backend`` (no model load)."""
+    return backend_cache_name(backend or ENCODER_BACKEND, MODEL_NAME, ONNX_MODEL_DIR)
+
+def load_encoder(backend=None, threads=None):
+    """Returns (encoder, name used in the embedding cache key)."""
+    threads = ENCODER_THREADS if threads is None else threads
+    return build_encoder(backend or ENCODER_BACKEND, MODEL_NAME, ONNX_MODEL_DIR, threads)
+
+def store_embeddings(df, embeddings, model_name=None):
+    """
+    Write embeddings built outside load_model_and_embeddings (e.g. by an
+    incremental FAQ reload) to the cache, so the next cold start finds them.
+    """
+    questions = list(as_answer_store(df).questions)
+    model_name = model_name or encoder_cache_name()
+    key = cache_key(questions, model_name, NORMALIZE_EMBEDDINGS)
+    try:
+        save_embeddings(key, embeddings, {
+            "model_name": model_name,
+            "normalize": bool(NORMALIZE_EMBEDDINGS),
+            "dataset_hash": dataset_hash(questions),
+            "rows": len(questions),
+        })
+    except Exception as e:
+        print(f"⚠️ Could not write embedding cache: {e}")
+
+def load_model_and_embeddings(df, use_cache=True, threads=None):
+    model, model_name = load_encoder(threads=threads)
+    questions = list(as_answer_store(df).questions)
+    if use_cache:
+        question_embeddings = load_or_build_embeddings(
+            model, questions, model_name, normalize=NORMALIZE_EMBEDDINGS
+        )
+    else:
+        question_embeddings = model.encode(
+            questions, show_progress_bar=True, normalize_embeddings=NORMALIZE_EMBEDDINGS
+        )
     return model, question_embeddings
 
+# ============================
+# Build Search Index
+# ============================
+def embeddings_key(df, model_name=None):
+    """Embedding-cache key of ``df``'s questions under the active encoder."""
+    questions = list(as_answer_store(df).questions)
+    return cache_key(questions, model_name or encoder_cache_name(), NORMALIZE_EMBEDDINGS)
+
+def load_ivf_index(path, store):
+    """Prebuilt IVF index for ``store``, or None if missing, unreadable or stale."""
+    try:
+        index = IVFIndex.load(path)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring prebuilt IVF index at {path}: {e}; rebuilding")
+        return None
+    if index.key != embeddings_key(store) or len(index) != len(store):
+        print(f"⚠️ Prebuilt IVF index at {path} was built from other FAQ data or another encoder; rebuilding")
+        return None
+    index.answers, index.questions = store.answers, store.questions
+    index.nprobe = IVF_NPROBE
+    return index
+
+def save_ivf_index(out_dir, path=file_path):
+    """Build the IVF index for the FAQ at ``path`` and save it for CHATBOT_IVF_INDEX_PATH."""
+    store = load_answers(path)
+    _, embeddings = load_model_and_embeddings(store)
+    index = IVFIndex.from_store(store, embeddings, nprobe=IVF_NPROBE)
+    index.save(out_dir, key=embeddings_key(store))
+    print(f"✅ Saved IVF index ({len(index)} rows, {index.nlist} lists) to {out_dir}")
+    return index
 
+def build_faq_index(df, question_embeddings, dtype="float32", backend=None):
+    """``df`` is an AnswerStore (or a DataFrame, converted once)."""
+    backend = backend or INDEX_BACKEND
+    store = as_answer_store(df)
+    rows = len(question_embeddings)
+    if len(store) != rows:
+        # Row ids index both; embeddings of the unfiltered table would be off by the skipped rows
+        raise ValueError(f"{rows} embeddings for {len(store)} FAQ rows; encode the store's questions")
+    if backend == "exact":
+        return FaqIndex.from_store(store, question_embeddings, dtype=dtype)
+    if backend == "ivf":
+        if IVF_INDEX_PATH and os.path.isdir(IVF_INDEX_PATH):
+            index = load_ivf_index(IVF_INDEX_PATH, store)
+            if index is not None:
+                return index
+        return IVFIndex.from_store(store, question_embeddings, nprobe=IVF_NPROBE)
+    if backend == "int8":
+        return Int8Index.from_store(store, question_embeddings, rerank_k=INT8_RERANK_K)
+    raise ValueError(f"Unknown index backend: {backend}")
@@ -0,0 +1,197 @@
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+# ============================
+# Pre-fork multi-process server
+# ============================
+# The parent loads the model and FAQ data once, publishes the normalized
+# embedding matrix and answer/question strings in shared memory, binds the
+# listening socket, then forks N workers. Workers attach to the shared arrays
+# zero-copy and share the model weights copy-on-write, so adding a worker
+# costs little more than its Python heap. Linux/macOS only (needs fork).
+#
+#     python prefork_server.py --workers 4 --port 5100
+
+# Forked children must not inherit a live tokenizer thread pool
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+from models import ENCODER_THREADS, load_answers, load_model_and_embeddings  # noqa: E402
+from faq_index import FaqIndex, l2_normalize  # noqa: E402
+from shared_store import SharedFaqStore, process_memory  # noqa: E402
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+file_path = os.environ.get("CHATBOT_FAQ_PATH", os.path.join(BASE_DIR, "data", "faq_with_intent.csv"))
+# Pause before replacing a dead worker, so a crash loop does not spin the CPU
+RESPAWN_DELAY_S = float(os.environ.get("CHATBOT_PREFORK_RESPAWN_DELAY", "1"))
+
+
+def load_shared_resources(path=file_path):
+    """
+    Parent side: returns (model, SharedFaqStore, AnswerStore, data version).
+    chat_service is deliberately not imported here: its background threads
+    must start in the workers, after the fork. The returned AnswerStore is a
+    view of the shared segments, so the strings exist once; its BM25 index
+    and intent model are built here so workers inherit them copy-on-write.
+    """
+    from chatbot_core import DEFAULT_THRESHOLD
+    from intent_classifier import INTENT_ROUTING, has_intents, intent_classifier_for
+    from lexical_index import LEXICAL_ENABLED, lexical_index_for
+    from response_cache import faq_version
+    from utils import build_domain_vocabulary
+
+    loaded = load_answers(path)
+    build_domain_vocabulary(loaded)
+    model, question_embeddings = load_model_and_embeddings(loaded)
+    store = SharedFaqStore.from_answer_store(l2_normalize(question_embeddings), loaded)
+    data_version = faq_version(loaded, DEFAULT_THRESHOLD)
+    # Drop the private copy before forking; everything below uses the shared view
+    del loaded, question_embeddings
+    answers = store.answer_store()
+    if LEXICAL_ENABLED or INTENT_ROUTING:
+        lexical_index_for(answers)
+    if INTENT_ROUTING and has_intents(answers):
+        intent_classifier_for(answers)
+    return model, store, answers, data_version
+
+
+def run_worker(listen_fd, model, spec, answers, data_version, threads):
+    """Child side: attach to shared data, install it and serve forever."""
+    from werkzeug.serving import make_server
+    import chat_service as service
+
+    # Thread pools do not survive fork; size this worker's share of the cores
+    model.set_threads(threads)
+
+    store = SharedFaqStore.attach(spec, untrack=False)
+    index = FaqIndex.from_normalized(store.embeddings, store.answers, store.questions)
+    # The shared-view AnswerStore gives workers the same lexical/intent layers as the other servers
+    service.install(model, index, data_version, new_df=answers)
+
+    from streamlit_chatbot import app
+    server = make_server("0.0.0.0", 0, app, threaded=True, fd=listen_fd)
+
+    def stop(signum, frame):
+        service.shutdown()
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(f"👷 Worker {os.getpid()} serving ({store.nbytes / 1e6:.1f} MB shared FAQ data, {threads} encoder threads)")
+    server.serve_forever()
+
+
+def memory_report(pids):
+    """Per-process RSS/PSS table; PSS shows the real per-worker cost."""
+    print(f"{'pid':>8} {'rss MB':>9} {'pss MB':>9} {'shared MB':>10} {'private MB':>11}")
+    total_rss = total_pss = 0
+    for pid in pids:
+        try:
+            mem = process_memory(pid)
+        except OSError:
+            continue
+        if mem is None:
+            print(f"{pid:>8} {'unsupported on this platform':>41}")
+            continue
+        total_rss += mem.get("rss_kb", 0)
+        total_pss += mem.get("pss_kb", 0)
+        print(f"{pid:>8} {mem.get('rss_kb', 0) / 1024:>9.1f} {mem.get('pss_kb', 0) / 1024:>9.1f} "
+              f"{mem.get('shared_kb', 0) / 1024:>10.1f} {mem.get('private_kb', 0) / 1024:>11.1f}")
+    print(f"{'total':>8} {total_rss / 1024:>9.1f} {total_pss / 1024:>9.1f}   (sum of RSS double-counts shared pages)")
+
+
+def describe_exit(status):
+    if os.WIFSIGNALED(status):
+        return f"signal {os.WTERMSIG(status)}"
+    return f"exit code {os.WEXITSTATUS(status)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork chatbot server with shared FAQ memory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5100)
+    parser.add_argument("--report-after", type=float, default=5.0,
+                        help="seconds after start to print the memory report (0 to skip)")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("prefork_server needs os.fork; use streamlit_chatbot.py or asgi_app.py instead")
+
+    print("⚙️ Loading shared resources in the parent process...")
+    model, store, answers, data_version = load_shared_resources()
+    print(f"✅ Shared FAQ store ready: {store.spec['embeddings_shape']} embeddings, {store.nbytes / 1e6:.1f} MB")
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+
+    workers = max(1, args.workers)
+    threads = ENCODER_THREADS or max(1, (os.cpu_count() or 1) // workers)
+    children = []
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(sock.fileno(), model, store.spec, answers, data_version, threads)
+            finally:
+                os._exit(1)
+        children.append(pid)
+        return pid
+
+    for _ in range(workers):
+        spawn()
+    print(f"🚀 {len(children)} workers listening on {args.host}:{args.port}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    if args.report_after > 0:
+        time.sleep(args.report_after)
+        if not stopping:
+            print("📊 Memory per process (parent first):")
+            memory_report([os.getpid()] + children)
+
+    try:
+        # Supervise: reap every exited worker and replace it until we are stopping
+        while children:
+            try:
+                pid, status = os.wait()
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+            if pid not in children:
+                continue
+            children.remove(pid)
+            if stopping:
+                continue
+            print(f"⚠️ Worker {pid} exited ({describe_exit(status)}); starting a replacement")
+            time.sleep(RESPAWN_DELAY_S)
+            if not stopping:
+                print(f"👷 Worker {spawn()} replaces {pid}")
+    finally:
+        sock.close()
+        store.close()
+        print("👋 Pre-fork server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import numpy as np
+
+from answer_store import as_answer_store
+from faq_index import BATCH_SCORE_ELEMENTS, l2_normalize
+
+# ============================
+# int8 quantized FAQ index
+# ============================
+# Scalar quantization of the normalized embeddings: each row is stored as
+# int8 codes plus one float32 scale (max |v| / 127), a quarter of the float32
+# matrix. A query scans the codes block by block (each block is upcast in a
+# small buffer, so the full matrix is never materialized as float32), then the
+# best ``rerank_k`` candidates are rescored exactly against the original
+# embeddings. The embedding cache memory-maps those, so re-ranking only pages
+# in the candidate rows.
+#
+# Same search contract as FaqIndex: search() -> (scores, row indices, answers).
+# Without re-ranking the returned scores are the dequantized approximations.
+#
+# This backend saves memory, not time. numpy has no int8 or float16 BLAS
+# kernel, so every block is upcast to float32 before the matmul; that copy
+# costs more than the bandwidth the smaller codes save, and the scan is
+# slower than FaqIndex at every size (roughly 2x at 2k rows, ~15% at 200k,
+# see benchmarks/quantization.py). Use it when the float32 matrix does not
+# fit comfortably in RAM per worker, not to cut latency.
+
+QUANT_BLOCK_ROWS = 4096
+DEFAULT_RERANK_K = 32
+
+
+def quantize_rows(embeddings, block_rows=65536):
+    """(int8 codes, float32 per-row scales) of the L2-normalized rows."""
+    embeddings = np.asarray(embeddings)
+    n = embeddings.shape[0]
+    codes = np.empty(embeddings.shape, dtype=np.int8)
+    scales = np.empty(n, dtype=np.float32)
+    for start in range(0, n, block_rows):
+        block = l2_normalize(embeddings[start:start + block_rows])
+        peak = np.abs(block).max(axis=1)
+        peak[peak == 0] = 1.0
+        scale = peak / 127.0
+        codes[start:start + block.shape[0]] = np.rint(block / scale[:, None])
+        scales[start:start + block.shape[0]] = scale
+    return codes, scales
+
+
+class Int8Index:
+    """
+    Approximate cosine search over int8 codes with optional exact re-ranking.
+    ``rerank_vectors`` are the raw (un-normalized) embeddings, or None.
+    """
+
+    def __init__(self, codes, scales, answers=None, questions=None, rerank_vectors=None,
+                 rerank_k=DEFAULT_RERANK_K):
+        self.codes = codes
+        self.scales = scales
+        self.answers = answers
+        self.questions = questions
+        self.rerank_vectors = rerank_vectors
+        self.rerank_k = rerank_k
+
+    @classmethod
+    def build(cls, embeddings, answers=None, questions=None, rerank=True, rerank_k=DEFAULT_RERANK_K):
+        codes, scales = quantize_rows(embeddings)
+        return cls(
+            codes, scales,
+            answers=list(answers) if answers is not None else None,
+            questions=list(questions) if questions is not None else None,
+            rerank_vectors=embeddings if rerank and rerank_k > 0 else None,
+            rerank_k=rerank_k,
+        )
+
+    @classmethod
+    def from_store(cls, store, embeddings, **kwargs):
+        """Build over an AnswerStore; answers/questions stay in its columns."""
+        index = cls.build(embeddings, **kwargs)
+        index.answers, index.questions = store.answers, store.questions
+        return index
+
+    @classmethod
+    def from_dataframe(cls, df, embeddings, **kwargs):
+        return cls.from_store(as_answer_store(df), embeddings, **kwargs)
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    @property
+    def dim(self):
+        return self.codes.shape[1]
+
+    @property
+    def nbytes(self):
+        """Resident size of the quantized matrix (re-rank vectors not included)."""
+        return self.codes.nbytes + self.scales.nbytes
+
+    # ----------------------------
+    # Scoring
+    # ----------------------------
+    def approximate_scores(self, queries):
+        """Dequantized cosine scores, shape (n_queries, rows), for normalized queries."""
+        out = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        buf = np.empty((min(QUANT_BLOCK_ROWS, len(self)), self.dim), dtype=np.float32)
+        for start in range(0, len(self), QUANT_BLOCK_ROWS):
+            block = self.codes[start:start + QUANT_BLOCK_ROWS]
+            rows = buf[:block.shape[0]]
+            rows[...] = block
+            np.matmul(queries, rows.T, out=out[:, start:start + block.shape[0]])
+        out *= self.scales
+        return out
+
+    def _rerank(self, queries, candidates):
+        """Exact scores of each query's candidate rows; both (n_queries, c)."""
+        flat = candidates.reshape(-1)
+        order = np.argsort(flat, kind="stable")
+        # Sorted gathers read a memory-mapped matrix front to back
+        rows = np.empty((flat.size, self.dim), dtype=np.float32)
+        rows[order] = l2_normalize(np.asarray(self.rerank_vectors[flat[order]]))
+        rows = rows.reshape(candidates.shape + (self.dim,))
+        return np.einsum("qcd,qd->qc", rows, queries)
+
+    def score_rows(self, query_embedding, rows):
+        """Cosine similarity of one query against the given rows (exact when re-ranking)."""
+        query = l2_normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+        if self.rerank_vectors is not None:
+            return l2_normalize(np.asarray(self.rerank_vectors[rows])) @ query
+        return (self.codes[rows].astype(np.float32) @ query) * self.scales[rows]
+
+    def search_batch(self, query_embeddings, k=1):
+        """
+        Many queries at once. Returns (scores, row indices), both shaped
+        (n_queries, k), best first.
+        """
+        queries = l2_normalize(np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.dim))
+        k = max(1, min(k, len(self)))
+        rerank = self.rerank_vectors is not None and self.rerank_k > 0
+        candidates = min(len(self), max(k, self.rerank_k)) if rerank else k
+        out_scores = np.empty((queries.shape[0], k), dtype=np.float32)
+        out_idx = np.empty((queries.shape[0], k), dtype=np.int64)
+        step = max(1, BATCH_SCORE_ELEMENTS // max(1, len(self)))
+        for start in range(0, queries.shape[0], step):
+            block = queries[start:start + step]
+            scores = self.approximate_scores(block)
+            if candidates == len(self):
+                idx = np.broadcast_to(np.arange(len(self)), scores.shape).copy()
+            else:
+                idx = np.argpartition(-scores, candidates - 1, axis=1)[:, :candidates]
+            best = np.take_along_axis(scores, idx, axis=1)
+            if rerank:
+                best = self._rerank(block, idx)
+            order = np.argsort(-best, axis=1)[:, :k]
+            out_idx[start:start + block.shape[0]] = np.take_along_axis(idx, order, axis=1)
+            out_scores[start:start + block.shape[0]] = np.take_along_axis(best, order, axis=1)
+        return out_scores, out_idx
+
+    def search(self, query_embedding, k=1):
+        """
+        Returns (scores, row indices, answers) for the ``k`` best rows, best first.
+        """
+        scores, idx = self.search_batch(np.asarray(query_embedding).reshape(1, -1), k=k)
+        scores, idx = scores[0], idx[0]
+        answers = [self.answers[i] for i in idx] if self.answers is not None else None
+        return scores, idx, answers
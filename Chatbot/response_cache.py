@@ -0,0 +1,124 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from answer_store import as_answer_store
+from utils import clean_text
+
+# ============================
+# Query -> reply cache
+# ============================
+# Support traffic repeats itself ("track my order", "refund status"), so the
+# full reply for a normalized query is kept in a bounded LRU with optional TTL.
+# The cache is bound to a version (FAQ content + threshold); binding a new
+# version drops every entry so stale answers are never served.
+
+
+def faq_version(df, threshold):
+    """Version token for a loaded FAQ table and similarity threshold."""
+    h = hashlib.sha256()
+    if df is not None:
+        for row in as_answer_store(df).rows():
+            h.update("\x1f".join(str(v) for v in row).encode("utf-8"))
+            h.update(b"\x1e")
+    h.update(repr(float(threshold)).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU + TTL cache keyed on ``clean_text(query)``."""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self.version = None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # Bumped on every clear; a reply computed before a clear is not stored
+        self._generation = 0
+
+    @staticmethod
+    def key(query):
+        return clean_text(query)
+
+    def bind(self, version):
+        """Attach the cache to a data version, clearing it if that changed."""
+        with self._lock:
+            if version != self.version:
+                if self._data:
+                    self.invalidations += 1
+                self._data.clear()
+                self._generation += 1
+                self.version = version
+
+    def clear(self):
+        with self._lock:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self._generation += 1
+
+    def get(self, query):
+        key = self.key(query)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, query, value, generation=None):
+        """Store ``value``; with ``generation``, only if no clear happened since."""
+        if value is None:
+            return
+        key = self.key(query)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, query, compute):
+        """Return the cached reply or call ``compute()`` and store its result."""
+        generation = self._generation
+        value = self.get(query)
+        if value is None:
+            value = compute()
+            self.put(query, value, generation)
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,163 @@
+import os
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from answer_store import AnswerStore, StringColumn, encode_strings
+
+# ============================
+# Shared-memory FAQ store
+# ============================
+# The normalized embedding matrix and the answer/question strings are written
+# once into POSIX shared memory by the parent process. Workers attach by name
+# and get numpy views over the same physical pages, so N workers cost one
+# copy of the data instead of N.
+
+
+# Same layout as the answer store's string columns, over shared memory
+SharedStrings = StringColumn
+
+
+class SharedFaqStore:
+    """
+    Owner (``create``) or attached view (``attach``) of the shared arrays.
+    ``spec`` is a small picklable dict that lets another process attach.
+    """
+
+    def __init__(self, segments, spec, owner):
+        self._segments = segments
+        self.spec = spec
+        self.owner = owner
+
+        shape = tuple(spec["embeddings_shape"])
+        self.embeddings = np.ndarray(shape, dtype=np.float32, buffer=segments["embeddings"].buf)
+        self.embeddings.flags.writeable = False
+        self.answers = self._strings(segments, spec, "answers")
+        self.questions = self._strings(segments, spec, "questions")
+        self.intent_codes = None
+        if "intent_codes" in segments:
+            self.intent_codes = np.ndarray((shape[0],), dtype=np.int32, buffer=segments["intent_codes"].buf)
+            self.intent_codes.flags.writeable = False
+
+    @staticmethod
+    def _strings(segments, spec, name):
+        if name not in spec["strings"]:
+            return None
+        count, blob_size = spec["strings"][name]
+        offsets = np.ndarray((count + 1,), dtype=np.int64, buffer=segments[name + "_offsets"].buf)
+        blob = memoryview(segments[name].buf)[:blob_size]
+        return SharedStrings(blob, offsets)
+
+    @classmethod
+    def create(cls, normalized_embeddings, answers=None, questions=None, intent_codes=None, intent_names=()):
+        matrix = np.ascontiguousarray(normalized_embeddings, dtype=np.float32)
+        segments, spec = {}, {"embeddings_shape": list(matrix.shape), "strings": {}, "names": {},
+                              "intent_names": list(intent_names)}
+
+        def allocate(name, nbytes):
+            # Zero-size segments are not allowed
+            shm = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+            segments[name] = shm
+            spec["names"][name] = shm.name
+            return shm
+
+        shm = allocate("embeddings", matrix.nbytes)
+        np.ndarray(matrix.shape, dtype=np.float32, buffer=shm.buf)[:] = matrix
+
+        for name, values in (("answers", answers), ("questions", questions)):
+            if values is None:
+                continue
+            blob, offsets = encode_strings(values)
+            allocate(name, len(blob)).buf[:len(blob)] = blob
+            off = allocate(name + "_offsets", offsets.nbytes)
+            np.ndarray(offsets.shape, dtype=np.int64, buffer=off.buf)[:] = offsets
+            spec["strings"][name] = [len(offsets) - 1, len(blob)]
+
+        if intent_codes is not None:
+            codes = np.asarray(intent_codes, dtype=np.int32)
+            shm = allocate("intent_codes", codes.nbytes)
+            np.ndarray(codes.shape, dtype=np.int32, buffer=shm.buf)[:] = codes
+
+        return cls(segments, spec, owner=True)
+
+    @classmethod
+    def from_answer_store(cls, normalized_embeddings, store):
+        """Publish an AnswerStore's columns next to its embeddings."""
+        return cls.create(normalized_embeddings, answers=store.answers, questions=store.questions,
+                          intent_codes=store.intent_codes, intent_names=store.intent_names)
+
+    def answer_store(self):
+        """AnswerStore whose columns are views of the shared segments (no copy)."""
+        return AnswerStore(self.questions, self.answers, self.intent_codes, self.spec.get("intent_names", ()))
+
+    @classmethod
+    def attach(cls, spec, untrack=True):
+        """
+        Attach by name. Pass ``untrack=False`` from forked children, which
+        share the parent's resource tracker.
+        """
+        segments = {}
+        for name, shm_name in spec["names"].items():
+            segments[name] = shared_memory.SharedMemory(name=shm_name)
+            if untrack:
+                _untrack(segments[name])
+        return cls(segments, spec, owner=False)
+
+    @property
+    def nbytes(self):
+        return sum(shm.size for shm in self._segments.values())
+
+    def close(self):
+        """Detach; the owner also unlinks the segments."""
+        self.embeddings = None
+        self.answers = self.questions = self.intent_codes = None
+        for shm in self._segments.values():
+            try:
+                shm.close()
+            except BufferError:
+                pass  # a view is still alive; the mapping goes away with the process
+            if self.owner:
+                try:
+                    shm.unlink()
+                except FileNotFoundError:
+                    pass
+        self._segments = {}
+
+
+def _untrack(shm):
+    # Before 3.13 attaching registers the segment with this process's resource
+    # tracker, which would unlink it when a spawned worker exits.
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+def process_memory(pid="self"):
+    """
+    Memory of a process in kB from /proc/<pid>/smaps_rollup (Linux): RSS,
+    PSS (shared pages split between sharers) and shared/private totals.
+    Elsewhere only this process's peak RSS is known; other pids give None.
+    """
+    path = f"/proc/{pid}/smaps_rollup"
+    if not os.path.exists(path):
+        if pid not in ("self", os.getpid()):
+            return None
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS, kB elsewhere
+        return {"rss_kb": peak // 1024 if sys.platform == "darwin" else peak}
+    fields = {}
+    with open(path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "shared_kb": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
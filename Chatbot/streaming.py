@@ -0,0 +1,47 @@
+import json
+import os
+import re
+
+# ============================
+# Streamed replies (Server-Sent Events)
+# ============================
+# A reply is sent as one "meta" event (intent, source layer, score) as soon as
+# it is known, then the text in small "chunk" events, then "done". Browsers
+# can start rendering after the first bytes instead of waiting for the whole
+# JSON body; the same chunking feeds Streamlit's st.write_stream.
+
+STREAM_CHUNK_CHARS = int(os.environ.get("CHATBOT_STREAM_CHUNK_CHARS", "24"))
+
+SSE_HEADERS = {
+    "Content-Type": "text/event-stream; charset=utf-8",
+    "Cache-Control": "no-cache",
+    # Stop nginx-style proxies from buffering the stream
+    "X-Accel-Buffering": "no",
+}
+
+_WORD = re.compile(r"\S+\s*|\s+")
+
+
+def reply_chunks(text, size=STREAM_CHUNK_CHARS):
+    """Split ``text`` into pieces of about ``size`` characters on word boundaries."""
+    chunk = ""
+    for word in _WORD.findall(text or ""):
+        if chunk and len(chunk) + len(word) > size:
+            yield chunk
+            chunk = ""
+        chunk += word
+    if chunk:
+        yield chunk
+
+
+def sse_event(event, data):
+    """One SSE frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def reply_events(details, size=STREAM_CHUNK_CHARS):
+    """SSE frames for a reply dict as returned by chat_service.get_reply_details."""
+    yield sse_event("meta", {k: v for k, v in details.items() if k != "reply"})
+    for chunk in reply_chunks(details["reply"], size):
+        yield sse_event("chunk", {"text": chunk})
+    yield sse_event("done", {"chars": len(details["reply"])})
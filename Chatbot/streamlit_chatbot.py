@@ -1,66 +1,21 @@
-from flask import Flask, request, jsonify, render_template
-from models import load_data, load_model_and_embeddings
-from chatbot_core import chatbot_response
-from utils import clean_text, greeting_response, business_response
-from datetime import datetime
+from flask import Flask, Response, request, jsonify, render_template
+from intent_matcher import reload_rules
+from streaming import SSE_HEADERS, reply_events, sse_event
+from instrumentation import PROMETHEUS_CONTENT_TYPE, render_prometheus
+import chat_service as service
 import traceback
 import os
-import pandas as pd
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-file_path = os.path.join(BASE_DIR, "data", "faq_with_intent.csv")
-# df = pd.read_csv(file_path)
 
 
 app = Flask(__name__)
 
-print("⚙️ Initializing Chatbot System...")
-try:
-    df = load_data(file_path)
-    model, question_embeddings = load_model_and_embeddings(df)
-    print("✅ Model and FAQ embeddings loaded successfully!")
-except Exception as e:
-    print("❌ Error while loading model/data:")
-    traceback.print_exc()
-    df, model, question_embeddings = None, None, None
-
-
-def get_time_greeting():
-    hour = datetime.now().hour
-    if 5 <= hour < 12:
-        return "Good morning! 🌅 How can I help you today?"
-    elif 12 <= hour < 17:
-        return "Good afternoon! 🌤 How can I help you today?"
-    elif 17 <= hour < 22:
-        return "Good evening! 🌙 What can I assist you with?"
-    else:
-        return "Hello there! 🌙 Burning the midnight oil, huh?"
-
-
-def get_chatbot_reply(user_input):
-    if not model or df is None:
-        return "⚠️ Chatbot model failed to load. Please try again later."
-
-    user_input = clean_text(user_input)
-
-    greet = greeting_response(user_input)
-    if greet:
-        return greet
-
-    biz = business_response(user_input)
-    if biz:
-        return biz
-
-    ml_reply = chatbot_response(user_input, model, df, question_embeddings)
-    if ml_reply:
-        return ml_reply
-
-    return "Hmm 🤔 I’m not sure about that. Could you rephrase it?"
+# Bind right away; the model loads in the background and rules answer meanwhile
+service.start_background_load()
 
 
 @app.route("/")
 def home():
-    greeting = get_time_greeting()
+    greeting = service.get_time_greeting()
     return render_template("index.html", greeting=greeting)
 
 
@@ -70,7 +25,8 @@ def get_bot_response():
         user_msg = request.form.get("msg", "").strip()
         if not user_msg:
             return jsonify({"reply": "Please type something 😅"})
-        bot_reply = get_chatbot_reply(user_msg)
+        bot_reply = service.get_chatbot_reply(user_msg)
+        service.log_chat(request.form.get("session_id", "").strip(), user_msg, bot_reply)
         return jsonify({"reply": bot_reply})
     except Exception as e:
         print("⚠️ Error during chat response:", e)
@@ -78,5 +34,82 @@ def get_bot_response():
         return jsonify({"reply": "Oops! Something went wrong 😔"})
 
 
+@app.route("/get/stream", methods=["GET", "POST"])
+def stream_bot_response():
+    # Accepts the same fields as /get as form data or query string (EventSource)
+    user_msg = request.values.get("msg", "").strip()
+    session_id = request.values.get("session_id", "").strip()
+
+    def events():
+        if not user_msg:
+            yield from reply_events({"reply": "Please type something 😅", "layer": "empty", "intent": None, "score": None})
+            return
+        try:
+            details = service.get_reply_details(user_msg)
+        except Exception as e:
+            print("⚠️ Error during chat response:", e)
+            traceback.print_exc()
+            yield sse_event("error", {"reply": "Oops! Something went wrong 😔"})
+            return
+        # Logged before streaming so a client that disconnects early is still recorded
+        service.log_chat(session_id, user_msg, details["reply"])
+        yield from reply_events(details)
+
+    return Response(events(), headers=SSE_HEADERS)
+
+
+@app.route("/healthz")
+def healthz():
+    return jsonify(service.liveness())
+
+
+@app.route("/readyz")
+def readyz():
+    state = service.readiness()
+    return jsonify(state), 200 if state["ready"] else 503
+
+
+@app.route("/metrics")
+def metrics():
+    return Response(render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.route("/stats/encoder")
+def encoder_stats():
+    if service.encoder is None:
+        return jsonify({"error": "model not loaded"}), 503
+    return jsonify(service.encoder.stats())
+
+
+@app.route("/admin/reload-rules", methods=["POST"])
+def reload_rules_endpoint():
+    try:
+        matcher = reload_rules()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"rules": len(matcher.rules)})
+
+
+@app.route("/admin/reload-faq", methods=["POST"])
+def reload_faq_endpoint():
+    if not service.is_ready():
+        return jsonify({"error": "model not loaded"}), 503
+    try:
+        stats = service.reload_faq()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(stats)
+
+
+@app.route("/stats/chat-log")
+def chat_log_stats():
+    return jsonify(service.chat_log.stats())
+
+
+@app.route("/stats/cache")
+def cache_stats():
+    return jsonify(service.response_cache.stats())
+
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5100, debug=False, use_reloader=False)
+    app.run(host="0.0.0.0", port=int(os.environ.get("CHATBOT_PORT", "5100")), debug=False, use_reloader=False)
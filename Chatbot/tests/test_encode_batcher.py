@@ -0,0 +1,53 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from encode_batcher import BatchingEncoder  # noqa: E402
+
+
+class ShortEncoder:
+    """Returns one row fewer than asked for on the first call, then behaves."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        rows = len(texts) - 1 if self.calls == 1 else len(texts)
+        return np.ones((rows, 4), dtype=np.float32)
+
+
+class FlatEncoder:
+    def encode(self, texts, **kwargs):
+        return np.ones(4, dtype=np.float32)
+
+
+class BatchingEncoderErrorTest(unittest.TestCase):
+    def test_short_result_fails_the_batch_and_keeps_the_worker(self):
+        batcher = BatchingEncoder(ShortEncoder(), max_batch_size=4, max_wait_ms=50)
+        try:
+            futures = [batcher.submit(f"q{i}") for i in range(3)]
+            for future in futures:
+                with self.assertRaises(ValueError):
+                    future.result(timeout=5)
+            # The worker survived: the next call is served
+            self.assertEqual(batcher.encode(["again"], timeout=5).shape, (1, 4))
+            self.assertEqual(batcher.stats()["errors"], 1)
+        finally:
+            batcher.close()
+
+    def test_one_dimensional_result_fails_the_batch(self):
+        batcher = BatchingEncoder(FlatEncoder(), max_batch_size=2, max_wait_ms=1)
+        try:
+            with self.assertRaises(ValueError):
+                batcher.encode(["a"], timeout=5)
+        finally:
+            batcher.close()
+
+
+if __name__ == "__main__":
+    unittest.main()